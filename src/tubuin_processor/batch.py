@@ -0,0 +1,167 @@
+"""
+Helpers for `tube batch`: discovering replay directories, deciding which
+replays are already up to date, and recording a per-replay status/timing summary.
+
+A replay is up to date when the summary of a previous batch recorded it as
+processed with the same input files (name, size and modification time) and
+the same pipeline settings, and the outputs it recorded still exist.
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from tubuin_processor.core.exceptions import ParserError
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILENAME = "batch_summary.json"
+
+
+class ReplayStatus(str, Enum):
+    OK = "ok"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+@dataclass
+class ReplayResult:
+    """The outcome of one replay in a batch, as written to the summary."""
+    replay_id: str
+    input_dir: str
+    status: ReplayStatus
+    seconds: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    input_signature: Optional[str] = None
+    settings_signature: Optional[str] = None
+    outputs: List[str] = field(default_factory=list)  # Files or directories written for the replay
+    finished_at: Optional[str] = None
+
+
+def discover_replay_dirs(patterns: Iterable[str], manifest: Optional[Path] = None) -> List[Path]:
+    """
+    Expands replay directory paths and glob patterns, plus those listed in a
+    manifest file (one per line; blank lines and `#` comments are ignored).
+    Relative manifest entries are resolved against the manifest's directory.
+    Returns existing directories, deduplicated, in the order given.
+    """
+    entries = [(pattern, Path.cwd()) for pattern in patterns]
+    if manifest is not None:
+        for line in manifest.read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                entries.append((line, manifest.parent))
+
+    replay_dirs: Dict[Path, None] = {}
+    for pattern, base in entries:
+        pattern = os.path.join(base, os.path.expanduser(pattern))
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            path = Path(match).resolve()
+            if path.is_dir():
+                replay_dirs[path] = None
+            elif not glob.has_magic(pattern):
+                logger.warning(f"Replay directory not found: {match}")
+    return list(replay_dirs)
+
+
+def assign_replay_ids(replay_dirs: List[Path]) -> Dict[str, Path]:
+    """Uses each directory's name as its replay ID; IDs must be unique."""
+    replay_ids: Dict[str, Path] = {}
+    for replay_dir in replay_dirs:
+        if replay_dir.name in replay_ids:
+            raise ParserError(f"Duplicate replay ID '{replay_dir.name}' for {replay_ids[replay_dir.name]} and {replay_dir}.")
+        replay_ids[replay_dir.name] = replay_dir
+    return replay_ids
+
+
+def _file_identity(name: str, stat: os.stat_result) -> bytes:
+    return f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode()
+
+
+def input_signature(replay_dir: Path) -> str:
+    """Fingerprints the files of a replay directory by name, size and modification time."""
+    digest = hashlib.blake2b(digest_size=16)
+    for entry in sorted(os.scandir(replay_dir), key=lambda e: e.name):
+        if entry.is_file():
+            digest.update(_file_identity(entry.name, entry.stat()))
+    return digest.hexdigest()
+
+
+def file_signature(path: Optional[Path]) -> str:
+    """Fingerprints a single optional input file, such as a custom unitdefs.json."""
+    if path is None:
+        return "default"
+    return hashlib.blake2b(_file_identity(str(path), path.stat()), digest_size=16).hexdigest()
+
+
+def settings_signature(settings: Any) -> str:
+    """Fingerprints the pipeline settings, and the code version, that affect a replay's outputs."""
+    return hashlib.blake2b(repr(settings).encode(), digest_size=16).hexdigest()
+
+
+def is_up_to_date(previous: Optional[Dict[str, Any]], input_sig: str, settings_sig: str) -> bool:
+    return (
+        previous is not None
+        and previous.get("status") in (ReplayStatus.OK, ReplayStatus.SKIPPED)
+        and previous.get("input_signature") == input_sig
+        and previous.get("settings_signature") == settings_sig
+        and bool(previous.get("outputs"))
+        and all(os.path.exists(path) for path in previous["outputs"])
+    )
+
+
+def load_summary(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Returns the per-replay records of a previous summary, or an empty dict."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("replays", {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable batch summary {path}: {e}")
+        return {}
+
+
+def write_summary(
+    path: Path,
+    results: Dict[str, ReplayResult],
+    elapsed_seconds: float,
+    other_records: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Atomically writes the batch summary and returns its totals. `other_records`
+    are records of replays outside this batch, kept so that later batches can
+    still skip them; they are not counted in the totals.
+    """
+    counts = {status.value: 0 for status in ReplayStatus}
+    for result in results.values():
+        counts[ReplayStatus(result.status).value] += 1
+    totals = {
+        "replays": len(results),
+        **counts,
+        "elapsed_seconds": round(elapsed_seconds, 3),
+        "replays_per_minute": round(counts[ReplayStatus.OK.value] / elapsed_seconds * 60, 2) if elapsed_seconds > 0 else 0.0,
+    }
+    records = dict(other_records or {})
+    records.update((replay_id, asdict(result)) for replay_id, result in results.items())
+    summary = {"totals": totals, "replays": records}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, path)
+    return totals
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
@@ -2,47 +2,93 @@
 Dynamically builds transformation configs by introspecting schemas in aspects_raw.py.
 Uses the `json_schema_extra` attribute for metadata.
 """
-from typing import Dict, Tuple, Type, Any
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Set, Tuple, Type, Any, get_args
 from enum import Enum
-from collections import defaultdict
 
 from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP
+from tubuin_processor.schemas.aspects import ASPECT_TO_CLEAN_SCHEMA_MAP
 from tubuin_processor.schemas.output_contracts import OUTPUT_CONTRACTS
 
-def build_transformation_configs() -> Tuple[Dict, Dict]:
+
+@dataclass(frozen=True, eq=False)
+class TransformPlan:
+    """
+    The pre-processing rules of one aspect, compiled per field. Both the row
+    path (`stream_transform_aspect`) and the frame path (`transform_aspect_frame`)
+    consume this plan, so every field carries its own dequantization scale.
+    """
+    aspect_name: str
+    scales: Dict[str, float] = field(default_factory=dict)  # raw field -> dequantization divisor
+    enums: Dict[str, Tuple[str, Type[Enum]]] = field(default_factory=dict)  # raw field -> (clean field, Enum)
+    enum_values: Dict[str, FrozenSet[Any]] = field(default_factory=dict)  # raw field -> valid raw values, if declared
+    lenient_enums: Set[str] = field(default_factory=set)  # raw fields (`enum_map`) whose invalid values become None
+
+
+def _get_extra_schema(field_info: Any) -> Optional[dict]:
+    """Returns a field's `json_schema_extra` as a dictionary, calling it if needed."""
+    extra_schema_data: Any = field_info.json_schema_extra
+    if callable(extra_schema_data):
+        extra_schema_data = extra_schema_data({})
+    return extra_schema_data if isinstance(extra_schema_data, dict) else None
+
+
+def _find_enum_class(annotation: Any) -> Optional[Type[Enum]]:
+    """Returns the Enum class of a (possibly Optional) annotation, if any."""
+    return next(
+        (t for t in (annotation, *get_args(annotation)) if isinstance(t, type) and issubclass(t, Enum)),
+        None,
+    )
+
+
+def build_transform_plans() -> Dict[str, TransformPlan]:
     """
-    Introspects Pydantic raw schemas to build transformation configs from `json_schema_extra`.
+    Introspects Pydantic raw schemas to build one `TransformPlan` per aspect.
+    `dequantize_by` sets a field's scale. Enums come from `enum_map`, or from
+    the clean schema's Enum annotation restricted to the `enum` value list.
+    An invalid value fails the row, except in `enum_map` fields, where it
+    becomes None.
     """
-    dequant_config = defaultdict(lambda: {"fields": []})
-    enum_config = defaultdict(dict)
+    plans = {}
     for aspect_name, schema_class in ASPECT_TO_RAW_SCHEMA_MAP.items():
+        clean_schema_class = ASPECT_TO_CLEAN_SCHEMA_MAP.get(aspect_name)
+        clean_fields = clean_schema_class.model_fields if clean_schema_class else {}
+        plan = TransformPlan(aspect_name)
         for field_name, field_info in schema_class.model_fields.items():
-            
-            extra_schema_data: Any = field_info.json_schema_extra
-
-            if extra_schema_data is None:
-                continue
-            
-            # If it's a callable, call it to get the dictionary
-            if callable(extra_schema_data):
-                extra_schema = extra_schema_data({})
-            else:
-                extra_schema = extra_schema_data
-                
-            if isinstance(extra_schema, dict):
-                if 'dequantize_by' in extra_schema:
-                    divisor = extra_schema['dequantize_by']
-                    dequant_config[aspect_name]['divisor'] = divisor
-                    dequant_config[aspect_name]['fields'].append(field_name)
-                    
-                if 'enum_map' in extra_schema:
-                    clean_field_name, enum_class = extra_schema['enum_map']
-                    enum_config[aspect_name][field_name] = (clean_field_name, enum_class)
-            
-    return dict(dequant_config), dict(enum_config)
+            extra_schema = _get_extra_schema(field_info) or {}
+
+            if 'dequantize_by' in extra_schema:
+                plan.scales[field_name] = float(extra_schema['dequantize_by'])
+
+            if 'enum_map' in extra_schema:
+                plan.enums[field_name] = tuple(extra_schema['enum_map'])
+                plan.lenient_enums.add(field_name)
+            elif field_name in clean_fields:
+                enum_class = _find_enum_class(clean_fields[field_name].annotation)
+                if enum_class is not None:
+                    plan.enums[field_name] = (field_name, enum_class)
+
+            if 'enum' in extra_schema and field_name in plan.enums:
+                plan.enum_values[field_name] = frozenset(extra_schema['enum'])
+        plans[aspect_name] = plan
+    return plans
+
+
+def build_transformation_configs() -> Tuple[Dict, Dict]:
+    """
+    Legacy dictionary views of `TRANSFORM_PLANS`, kept for configuration checks.
+    Dequantization is described per field under `divisors`.
+    """
+    dequant_config = {
+        name: {"fields": list(plan.scales), "divisors": dict(plan.scales)}
+        for name, plan in TRANSFORM_PLANS.items() if plan.scales
+    }
+    enum_config = {name: dict(plan.enums) for name, plan in TRANSFORM_PLANS.items() if plan.enums}
+    return dequant_config, enum_config
 
 # These configurations are now built from the json_schema_extra attribute.
+TRANSFORM_PLANS: Dict[str, TransformPlan] = build_transform_plans()
 DEQUANTIZATION_CONFIG, ASPECT_ENUM_MAPPINGS = build_transformation_configs()
 
 # --- Output Configs
-OUTPUT_TRANSFORMATION_CONFIG: dict = OUTPUT_CONTRACTS
\ No newline at end of file
+OUTPUT_TRANSFORMATION_CONFIG: dict = OUTPUT_CONTRACTS
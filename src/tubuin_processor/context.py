@@ -16,27 +16,16 @@ from tubuin_processor.schemas.unit_defs_schema import UnitDef
 
 logger = logging.getLogger(__name__)
 
+# Frames added to every replay's DataFrames by `build_execution_context`.
+CONTEXT_FRAME_NAMES = ("unit_defs", "defs_map")
 
-def build_execution_context(
-    unit_defs_path: Optional[Path],
-    defs_map_df: Optional[pl.DataFrame]
-) -> Dict[str, pl.DataFrame]:
-    """
-    Builds the initial context, including loading and validating the unit_defs DataFrame.
-
-    This function handles the logic of using a user-provided path or falling back
-    to the packaged default.
-
-    Args:
-        unit_defs_path: An optional path to a custom unitdefs.json file.
 
-    Returns:
-        A dictionary to be used as the initial state for the 'dataframes' collection,
-        containing the 'unit_defs' DataFrame.
+def load_unit_defs_frame(unit_defs_path: Optional[Path]) -> pl.DataFrame:
+    """
+    Loads and validates unit definitions into a DataFrame, using the packaged
+    default file when no path is given. Batch runs call this once and share the
+    result across replays.
     """
-    logger.info("--- [Pre-Step] Building Execution Context ---")
-    initial_context: Dict[str, pl.DataFrame] = {}
-
     final_unit_defs_path: Path
     if unit_defs_path:
         logger.info(f"Using custom unit definitions file from: {unit_defs_path}")
@@ -57,6 +46,35 @@ def build_execution_context(
         validated_defs[name] = model_instance
     unit_defs_df = pl.DataFrame([d.model_dump() for d in validated_defs.values()])
     logger.info(f"Loaded and validated {unit_defs_df.height} unit definitions.")
+    return unit_defs_df
+
+
+def build_execution_context(
+    unit_defs_path: Optional[Path],
+    defs_map_df: Optional[pl.DataFrame],
+    unit_defs_df: Optional[pl.DataFrame] = None
+) -> Dict[str, pl.DataFrame]:
+    """
+    Builds the initial context, including loading and validating the unit_defs DataFrame.
+
+    This function handles the logic of using a user-provided path or falling back
+    to the packaged default.
+
+    Args:
+        unit_defs_path: An optional path to a custom unitdefs.json file.
+        defs_map_df: The replay's defs.csv mapping, if one was found.
+        unit_defs_df: Already loaded unit definitions (see `load_unit_defs_frame`).
+            When given, `unit_defs_path` is not read again.
+
+    Returns:
+        A dictionary to be used as the initial state for the 'dataframes' collection,
+        containing the 'unit_defs' DataFrame.
+    """
+    logger.info("--- [Pre-Step] Building Execution Context ---")
+    initial_context: Dict[str, pl.DataFrame] = {}
+
+    if unit_defs_df is None:
+        unit_defs_df = load_unit_defs_frame(unit_defs_path)
     initial_context["unit_defs"] = unit_defs_df
     
     # 2. Add the provided defs_map DataFrame to the context
@@ -2,14 +2,19 @@
 Step 6: Data Aggregation and Stream Generation Orchestrator
 """
 
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional, Union
 import polars as pl
 import logging
+import time
 
-from .exceptions import AggregationError
+from .cache_manager import StatResultCache
+from .incremental import IncrementalStatResults
+from .exceptions import AggregationError, CacheWriteError
+from .stat_scheduler import StatScheduler, StatStatus, log_stat_report, _peak_rss_bytes
 
 # Import the dynamically built registries from the stats package
-from .stats import STATS_REGISTRY, UNAGGREGATED_STREAM_REGISTRY
+from .stats import STATS_REGISTRY, UNAGGREGATED_STREAM_REGISTRY, default_stat_names, with_dependencies
+from .stats.derived_tables import build_derived_tables, derived_tables_for
 
 logger = logging.getLogger(__name__)
 
@@ -20,44 +25,74 @@ def perform_aggregations(
     unaggregated_streams_to_compute: List[
         str
     ],  # <-- NEW: Argument to control which streams to generate
+    result_cache: Optional[Union[StatResultCache, IncrementalStatResults]] = None,
+    scheduler: Optional[StatScheduler] = None,
 ) -> Tuple[Dict[str, pl.DataFrame], Dict[str, pl.DataFrame]]:
     """
     Orchestrates the execution of requested statistics using the dynamic registry.
     If `stats_to_compute` is empty, all stats marked as `default_enabled` are run.
+    Stats run concurrently on the `scheduler` (a default one if not given),
+    after the stats they depend on; only requested stats are returned. The
+    derived tables the stats declare as inputs are built first.
+    With a `result_cache`, stats whose inputs and implementation are unchanged
+    are loaded instead of computed, and newly computed results are cached.
+    In incremental mode, `IncrementalStatResults` plays that role.
     """
     logger.info("Starting Step 6: Configurable Aggregation")
 
     if not stats_to_compute:
-        stats_to_compute = [
-            name for name, stat in STATS_REGISTRY.items() if stat.default_enabled
-        ]
+        stats_to_compute = default_stat_names()
         logger.warning(
             f"No specific stats requested. Computing default set: {stats_to_compute}"
         )
 
     logger.info(f"Computing stats: {stats_to_compute}")
 
+    for stat_name in stats_to_compute:
+        if stat_name not in STATS_REGISTRY:
+            logger.warning(
+                f"Requested stat '{stat_name}' is not in STATS_REGISTRY. Skipping."
+            )
+    stats = {name: STATS_REGISTRY[name] for name in with_dependencies(stats_to_compute) if name in STATS_REGISTRY}
+
+    cached_results: Dict[str, pl.DataFrame] = {}
+    if result_cache is not None:
+        cached_results = result_cache.load(stats)
+        logger.info(f"Loaded {len(cached_results)} stat results from cache.")
+
+    # Derived tables are built once, for the stats that still need computing.
+    table_names = derived_tables_for(stat.inputs for name, stat in stats.items() if name not in cached_results)
+    stat_inputs = {**dataframes_by_aspect, **build_derived_tables(table_names, dataframes_by_aspect)}
+
+    scheduler = scheduler or StatScheduler()
+    logger.info(f"Running {len(stats) - len(cached_results)} stats on up to {scheduler.workers} threads.")
+    start_time, peak_rss_before = time.perf_counter(), _peak_rss_bytes()
+    results, runs = scheduler.run(stats, stat_inputs, cached_results)
+    log_stat_report(runs, time.perf_counter() - start_time, peak_rss_before)
+
     computed_stats: Dict[str, pl.DataFrame] = {}
     for stat_name in stats_to_compute:
-        if stat_name in STATS_REGISTRY:
-            stat = STATS_REGISTRY[stat_name]
-            try:
-                result_df = stat.func(dataframes_by_aspect)
-                if result_df is not None and not result_df.is_empty():
-                    computed_stats[stat_name] = result_df
-                else:
-                    logger.warning(
-                        f"Stat '{stat_name}' produced an empty or null DataFrame."
-                    )
-            except Exception as e:
-                logger.error(
-                    f"Error calculating stat '{stat_name}': {e}", exc_info=True
-                )
+        if stat_name not in results:
+            continue
+        result_df = results[stat_name]
+        if result_df is not None and not result_df.is_empty():
+            computed_stats[stat_name] = result_df
         else:
             logger.warning(
-                f"Requested stat '{stat_name}' is not in STATS_REGISTRY. Skipping."
+                f"Stat '{stat_name}' produced an empty or null DataFrame."
             )
 
+    new_results = {
+        name: (stats[name], results[name])
+        for name, run in runs.items()
+        if run.status in (StatStatus.OK, StatStatus.COLLECTED) and results[name] is not None
+    }
+    if result_cache is not None:
+        try:
+            result_cache.save(new_results)
+        except CacheWriteError as e:
+            logger.warning(f"Could not cache stat results: {e}")
+
     logger.info(f"Generating unaggregated streams: {unaggregated_streams_to_compute}")
     computed_unaggregated_streams: Dict[str, pl.DataFrame] = {}
     for stream_name in unaggregated_streams_to_compute:
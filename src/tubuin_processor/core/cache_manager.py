@@ -1,78 +1,642 @@
-"""Step 3: Cache Qualified Data"""
-from typing import Dict, List, Optional
-import os
-import msgpack
+"""Step 3: Cache Decoded Aspects (and Step 6 Stat Results)
+
+Each aspect's post-transform DataFrame (the output of Steps 2-5) is cached as
+its own Arrow IPC file and memory-mapped on load, so cache hits skip decoding,
+validation and transformation entirely. The cache works in serial and parallel
+mode and with either engine, as both produce identical frames.
+
+Entries are content-addressed: a `CacheKey` combines a BLAKE2b hash of the
+aspect's `.mpk` bytes with a fingerprint of that aspect's raw and clean
+schemas, its `TransformPlan` and the code that shapes the frames. Identical
+inputs therefore share an entry regardless of replay ID, and a change to one
+aspect's schema only invalidates that aspect. Fingerprints are computed once
+per process, so a lookup costs one pass of BLAKE2b over the input.
+
+Layout: `<cache_dir>/aspects/<aspect_name>/<content_hash>.<fingerprint>.arrow`
+
+Frames decoded with a column projection are cached as
+`<content_hash>.<fingerprint>.<columns_hash>.arrow`. A lookup for a projection
+is also served by the full frame, and caching a full frame replaces the
+projected entries of the same input.
+
+Stat results are cached the same way by `StatResultCache`, keyed by the
+fingerprints of the stat's input frames and a fingerprint of the stat's
+parameters and of its module's source, including the package modules it
+imports, so adding or changing one stat only computes that stat: `<cache_dir>/stats/<stat_name>/<input_hash>.<fingerprint>.arrow`
+
+`<cache_dir>/index.json` records each entry's size, creation and last access
+time. After every write the cache is trimmed to its `CachePolicy`, first by
+age and then least recently used first. `tube cache` inspects, prunes and
+verifies the cache.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from functools import lru_cache, partial
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import ast
+import glob
 import hashlib
+import importlib.util
+import inspect
+import io
+import json
 import logging
-from tubuin_processor.schemas.aspects_raw import BaseAspectDataPointRaw, ASPECT_TO_RAW_SCHEMA_MAP
-from tubuin_processor.core.exceptions import CacheReadError, CacheWriteError, CacheValidationError, SchemaValidationError
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+import polars as pl
+
+from tubuin_processor.schemas.aspects import ASPECT_TO_CLEAN_SCHEMA_MAP
+from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP
+from tubuin_processor.config.dynamic_config_builder import TRANSFORM_PLANS
+from tubuin_processor.core import columnar_decoder, dataframe_creator, decoder, value_transformer
+from tubuin_processor.core.ingestion import AspectSource, open_aspect_source
+from tubuin_processor.core.exceptions import CacheReadError, CacheWriteError
+from tubuin_processor.core.stats import STATS_REGISTRY
+from tubuin_processor.core.stats.derived_tables import DERIVED_TABLES, DerivedTable, derived_tables_for, source_inputs
+from tubuin_processor.core.stats.types import Stat
 
 logger = logging.getLogger(__name__)
 
-def _get_pipeline_version_hash() -> str:
-    """Generates a hash based on critical pipeline modules to version the cache."""
-    hasher = hashlib.md5()
-    files_to_hash = [
-        'src/tubuin_processor/schemas/aspects_raw.py', 'src/tubuin_processor/schemas/aspects.py',
-        'src/tubuin_processor/config/enums.py', 'src/tubuin_processor/config/dynamic_config_builder.py',
-        'src/tubuin_processor/core/decoder.py', 'src/tubuin_processor/core/value_transformer.py'
-    ]
-    for filepath in files_to_hash:
-        try:
-            with open(filepath, 'rb') as f:
-                hasher.update(f.read())
-        except FileNotFoundError:
-            logger.warning(f"Could not find file {filepath} for cache versioning.")
-            hasher.update(filepath.encode())
+CACHE_FILE_SUFFIX = ".arrow"
+ASPECTS_SUBDIR = "aspects"
+STATS_SUBDIR = "stats"
+CACHE_SECTIONS = (ASPECTS_SUBDIR, STATS_SUBDIR)
+INDEX_FILENAME = "index.json"
+INDEX_LOCK_FILENAME = ".index.lock"
+LEGACY_CACHE_SUFFIX = "_qualified_data.mpkcache"
+# Temp files older than this cannot belong to a write in progress.
+ORPHANED_TEMP_FILE_SECONDS = 3600
+_INDEX_THREAD_LOCK = threading.Lock()
+# Modules whose logic determines the contents of every cached frame.
+_FRAME_SHAPING_MODULES = (decoder, value_transformer, columnar_decoder, dataframe_creator)
+
+
+@lru_cache(maxsize=None)
+def _get_pipeline_code_hash() -> str:
+    """Hashes the source of the modules that turn raw bytes into clean frames."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for module in _FRAME_SHAPING_MODULES:
+        with open(module.__file__, "rb") as f:
+            hasher.update(f.read())
     return hasher.hexdigest()
 
-def _get_cache_filepath(cache_dir: str, replay_id: str) -> str:
-    os.makedirs(cache_dir, exist_ok=True)
-    return os.path.join(cache_dir, f"{replay_id}_qualified_data.mpkcache")
-
-def save_to_cache(data_by_aspect: Dict[str, List[BaseAspectDataPointRaw]], cache_dir: str, replay_id: str):
-    cache_filepath = _get_cache_filepath(cache_dir, replay_id)
-    pipeline_version = _get_pipeline_version_hash()
-    serializable_data = {
-        name: [
-            item.model_dump for item in aspect_list
-            ] 
-        for name, aspect_list in data_by_aspect.items()
-    }
-    cache_payload = {'version': pipeline_version, 'data': serializable_data}
+
+@lru_cache(maxsize=None)
+def aspect_fingerprint(aspect_name: str) -> str:
+    """
+    Fingerprints everything that determines an aspect's cached frame: its raw
+    and clean schemas, its transform plan (including enum members) and the
+    pipeline code. Computed once per process.
+    """
+    hasher = hashlib.blake2b(digest_size=8)
+    hasher.update(_get_pipeline_code_hash().encode())
+    for schema_map in (ASPECT_TO_RAW_SCHEMA_MAP, ASPECT_TO_CLEAN_SCHEMA_MAP):
+        model_type = schema_map.get(aspect_name)
+        hasher.update(repr(model_type.model_fields if model_type else None).encode())
+    plan = TRANSFORM_PLANS.get(aspect_name)
+    if plan is not None:
+        hasher.update(repr(sorted(plan.scales.items())).encode())
+        for field_name, (clean_field, enum_class) in sorted(plan.enums.items()):
+            members = [(member.name, member.value) for member in enum_class]
+            hasher.update(repr((field_name, clean_field, enum_class.__name__, members)).encode())
+    return hasher.hexdigest()
+
+
+def content_hash(source: AspectSource) -> str:
+    """Hashes an aspect's raw bytes. Memory-mapped sources are hashed in place, without copying."""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open_aspect_source(source) as raw_data:
+        if isinstance(raw_data, mmap.mmap):
+            start = raw_data.tell()
+            with memoryview(raw_data) as view, view[start:start + len(source)] as window:
+                hasher.update(window)
+        elif hasattr(raw_data, "read"):
+            hasher.update(raw_data.read())
+        else:
+            hasher.update(raw_data)
+    return hasher.hexdigest()
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    """
+    Identifies the cached frame of one aspect's input bytes under the current
+    pipeline. `columns` is the projection the frame was decoded with, if any.
+    """
+    aspect_name: str
+    content_hash: str
+    fingerprint: str
+    columns: Optional[Tuple[str, ...]] = None
+
+    @classmethod
+    def for_source(cls, aspect_name: str, source: AspectSource, columns: Optional[Collection[str]] = None) -> "CacheKey":
+        return cls(aspect_name, content_hash(source), aspect_fingerprint(aspect_name), _sorted_columns(columns))
+
+    def projected(self, columns: Optional[Collection[str]]) -> "CacheKey":
+        return replace(self, columns=_sorted_columns(columns))
+
+    @property
+    def filename(self) -> str:
+        if self.columns is None:
+            return f"{self.content_hash}.{self.fingerprint}{CACHE_FILE_SUFFIX}"
+        columns_hash = hashlib.blake2b(",".join(self.columns).encode(), digest_size=4).hexdigest()
+        return f"{self.content_hash}.{self.fingerprint}.{columns_hash}{CACHE_FILE_SUFFIX}"
+
+
+def _sorted_columns(columns: Optional[Collection[str]]) -> Optional[Tuple[str, ...]]:
+    return None if columns is None else tuple(sorted(columns))
+
+
+def frame_fingerprint(df: pl.DataFrame) -> str:
+    """Hashes a small frame's contents, e.g. the unit definitions in a replay's execution context."""
+    buffer = io.BytesIO()
+    df.write_ipc(buffer, compression="uncompressed")
+    return hashlib.blake2b(buffer.getbuffer(), digest_size=16).hexdigest()
+
+
+def _package_imports(module_name: str) -> List[str]:
+    """The modules of this package that a module imports, e.g. `merging` for a stat using `merge_sums`."""
+    module = sys.modules[module_name]
+    package = module.__package__ or module_name
+    imported = set()
+    for node in ast.walk(ast.parse(inspect.getsource(module))):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = importlib.util.resolve_name("." * node.level + (node.module or ""), package)
+            imported.add(base)
+            imported.update(f"{base}.{alias.name}" for alias in node.names)
+    root = module_name.split(".", 1)[0]
+    return sorted(name for name in imported if name.split(".", 1)[0] == root and name in sys.modules)
+
+
+@lru_cache(maxsize=None)
+def _module_source_digest(module_name: str) -> str:
+    """Hashes a module's source together with the source of every package module it imports, transitively."""
+    hasher = hashlib.blake2b(digest_size=16)
+    seen, pending = set(), [module_name]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        pending.extend(_package_imports(name))
+    for name in sorted(seen):
+        hasher.update(name.encode())
+        hasher.update(inspect.getsource(sys.modules[name]).encode())
+    return hasher.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def stat_fingerprint(stat: Union[Stat, DerivedTable]) -> str:
+    """
+    Fingerprints a stat's (or derived table's) implementation: its module's
+    source, the source of the package modules it imports (transitively) and
+    the parameters bound to its function.
+    """
+    func, params = stat.func, ()
+    if isinstance(func, partial):
+        func, params = func.func, (func.args, sorted(func.keywords.items()))
+    hasher = hashlib.blake2b(digest_size=8)
+    hasher.update(_module_source_digest(func.__module__).encode())
+    hasher.update(repr((func.__qualname__, params)).encode())
+    return hasher.hexdigest()
+
+
+@dataclass(frozen=True)
+class StatCacheKey:
+    """
+    Identifies a stat's cached result for a given set of input frames.
+
+    A result is invalidated when any input frame changes, when the stat's
+    parameters change, or when the source of the stat's module or of any
+    `tubuin_processor` module it imports changes, directly or through other
+    package modules (e.g. `stats/merging.py`, `stats/derived_tables.py` or
+    `core/exceptions.py`); `tube cache prune --stale` removes such results.
+    Third-party code such as Polars is not tracked, so delete
+    `<cache_dir>/stats` after upgrading it.
+    """
+    stat_name: str
+    input_hash: str
+    fingerprint: str
+
+    @classmethod
+    def for_stat(cls, stat_name: str, stat: Stat, input_fingerprints: Dict[str, str]) -> "StatCacheKey":
+        input_hash = hashlib.blake2b(repr(sorted(input_fingerprints.items())).encode(), digest_size=16).hexdigest()
+        return cls(stat_name, input_hash, stat_fingerprint(stat))
+
+    @property
+    def filename(self) -> str:
+        return f"{self.input_hash}.{self.fingerprint}{CACHE_FILE_SUFFIX}"
+
+
+def _entry_id(key: Any) -> str:
+    """Index keys are paths relative to the cache dir, e.g. `aspects/unit_events/<hash>.<fp>.arrow`."""
+    if isinstance(key, StatCacheKey):
+        return f"{STATS_SUBDIR}/{key.stat_name}/{key.filename}"
+    return f"{ASPECTS_SUBDIR}/{key.aspect_name}/{key.filename}"
+
+
+def _entry_parts(entry_id: str) -> List[str]:
+    """Splits an entry's filename into its input hash, fingerprint and, for projected frames, columns hash."""
+    return entry_id.rsplit("/", 1)[-1].removesuffix(CACHE_FILE_SUFFIX).split(".")
+
+
+def _get_cache_filepath(cache_dir: str, key: Any) -> str:
+    return os.path.join(cache_dir, *_entry_id(key).split("/"))
+
+
+def _read_cached_frame(cache_filepath: str) -> Optional[pl.DataFrame]:
+    if not os.path.exists(cache_filepath):
+        return None
+    try:
+        return pl.read_ipc(cache_filepath, memory_map=True)
+    except (OSError, pl.exceptions.PolarsError) as e:
+        raise CacheReadError(f"Failed to read cache file {cache_filepath}") from e
+
+
+def _write_cached_frame(df: pl.DataFrame, cache_filepath: str) -> None:
+    """Writes a frame atomically (temp file + rename), so concurrent readers never see a partial entry."""
+    entry_dir = os.path.dirname(cache_filepath)
     try:
-        with open(cache_filepath, "wb") as f:
-            packed_data = msgpack.packb(cache_payload, use_bin_type=True)
-            assert(isinstance(packed_data, bytes))
-            f.write(packed_data)
-        logger.info(f"Data cached successfully with version: {pipeline_version[:7]}")
-    except (IOError, TypeError) as e:
+        os.makedirs(entry_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(cache_filepath)}-", suffix=".tmp", dir=entry_dir)
+        os.close(fd)
+        try:
+            df.write_ipc(tmp_path)
+            os.replace(tmp_path, cache_filepath)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except (OSError, pl.exceptions.PolarsError) as e:
         raise CacheWriteError(f"Failed to write to cache file {cache_filepath}") from e
 
-def load_from_cache(cache_dir: str, replay_id: str) -> Optional[Dict[str, List[BaseAspectDataPointRaw]]]:
-    cache_filepath = _get_cache_filepath(cache_dir, replay_id)
-    if not os.path.exists(cache_filepath): return None
 
-    current_pipeline_version = _get_pipeline_version_hash()
+def load_cached_aspect(cache_dir: str, key: CacheKey) -> Optional[pl.DataFrame]:
+    """Memory-maps an aspect's cached frame. Returns None if there is no entry for the key."""
+    return _read_cached_frame(_get_cache_filepath(cache_dir, key))
+
+
+# --- Index & eviction ---
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Limits enforced after every cache write. `None` means unlimited."""
+    max_bytes: Optional[int] = None
+    max_age_seconds: Optional[float] = None
+
+
+def _disk_record(cache_dir: str, entry_id: str) -> Dict[str, Any]:
+    """Builds an index record from a file on disk, using its modification time as last access."""
+    stat = os.stat(os.path.join(cache_dir, entry_id))
+    return {"name": entry_id.split("/")[1], "size": stat.st_size, "created": stat.st_mtime, "last_access": stat.st_mtime}
+
+
+def _scan_entries(cache_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Builds index records for every cache file on disk."""
+    entry_ids = [
+        os.path.relpath(path, cache_dir).replace(os.sep, "/")
+        for section in CACHE_SECTIONS
+        for path in glob.glob(os.path.join(glob.escape(cache_dir), section, "*", f"*{CACHE_FILE_SUFFIX}"))
+    ]
+    return {entry_id: _disk_record(cache_dir, entry_id) for entry_id in entry_ids}
+
+
+def _read_index(cache_dir: str) -> Dict[str, Dict[str, Any]]:
+    index_path = os.path.join(cache_dir, INDEX_FILENAME)
     try:
-        with open(cache_filepath, "rb") as f: cache_payload = msgpack.unpackb(f.read(), raw=False)
-    except (msgpack.UnpackException, IOError) as e:
-        raise CacheReadError(f"Failed to read or unpack cache file {cache_filepath}") from e
-
-    cached_version = cache_payload.get('version')
-    if cached_version != current_pipeline_version:
-        raise CacheValidationError(f"Cache version mismatch. Expected '{current_pipeline_version[:7]}', found '{str(cached_version)[:7]}'. Cache is stale.")
-
-    raw_data_dict = cache_payload.get('data', {})
-    reconstructed_data: Dict[str, List[BaseAspectDataPointRaw]] = {}
-    for name, list_of_dicts in raw_data_dict.items():
-        if name in ASPECT_TO_RAW_SCHEMA_MAP:
-            row_model_type = ASPECT_TO_RAW_SCHEMA_MAP[name]
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)["entries"]
+    except FileNotFoundError:
+        return _scan_entries(cache_dir)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Rebuilding unreadable cache index {index_path}: {e}")
+        return _scan_entries(cache_dir)
+
+
+def _write_index(cache_dir: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{INDEX_FILENAME}-", suffix=".tmp", dir=cache_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": 2, "entries": entries}, f)
+    os.replace(tmp_path, os.path.join(cache_dir, INDEX_FILENAME))
+
+
+@contextmanager
+def _locked_index(cache_dir: str) -> Iterator[Dict[str, Dict[str, Any]]]:
+    """
+    Yields the cache index for modification and writes it back atomically.
+    Concurrent threads and processes sharing the cache directory are serialized
+    by a lock file.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    with _INDEX_THREAD_LOCK, open(os.path.join(cache_dir, INDEX_LOCK_FILENAME), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        entries = _read_index(cache_dir)
+        yield entries
+        _write_index(cache_dir, entries)
+
+
+def _touch_entries(cache_dir: str, entry_ids: Iterable[str]) -> None:
+    """Records an access to each entry for LRU eviction."""
+    now = time.time()
+    with _locked_index(cache_dir) as entries:
+        for entry_id in entry_ids:
+            if entry_id not in entries:
+                # Written by a process that was interrupted before indexing it.
+                entries[entry_id] = _disk_record(cache_dir, entry_id)
+            entries[entry_id]["last_access"] = now
+
+
+def _is_superseded(entry_id: str, new_entry_id: str) -> bool:
+    """
+    Whether a new entry makes an existing one for the same input redundant:
+    entries with another fingerprint are stale, and a full frame covers
+    every projection of it.
+    """
+    if entry_id == new_entry_id or not entry_id.startswith(new_entry_id.split(".", 1)[0] + "."):
+        return False
+    new_parts = _entry_parts(new_entry_id)
+    return _entry_parts(entry_id)[1] != new_parts[1] or len(new_parts) == 2
+
+
+def _index_new_entries(cache_dir: str, entry_ids: List[str], policy: CachePolicy) -> None:
+    """
+    Records freshly written entries, removes the entries they supersede (see
+    `_is_superseded`) and then enforces the `policy`.
+    """
+    now = time.time()
+    with _locked_index(cache_dir) as entries:
+        for entry_id in entry_ids:
+            for stale_id in [e for e in entries if _is_superseded(e, entry_id)]:
+                _remove_entry(cache_dir, entries, stale_id)
+            size = os.path.getsize(os.path.join(cache_dir, entry_id))
+            entries[entry_id] = {"name": entry_id.split("/")[1], "size": size, "created": now, "last_access": now}
+        evicted = _evict(cache_dir, entries, policy, now)
+    if evicted:
+        logger.info(f"Evicted {len(evicted)} cache entries to stay within the cache limits.")
+
+
+def _remove_entry(cache_dir: str, entries: Dict[str, Dict[str, Any]], entry_id: str) -> int:
+    """Deletes an entry's file and index record, returning the bytes freed."""
+    record = entries.pop(entry_id, None)
+    try:
+        os.remove(os.path.join(cache_dir, entry_id))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove cache entry {entry_id}: {e}")
+    return record["size"] if record else 0
+
+
+def _evict(cache_dir: str, entries: Dict[str, Dict[str, Any]], policy: CachePolicy, now: float) -> List[str]:
+    """Removes entries idle for longer than the max age, then least recently used ones until under the max size."""
+    evicted = []
+    if policy.max_age_seconds is not None:
+        for entry_id, record in list(entries.items()):
+            if now - record["last_access"] > policy.max_age_seconds:
+                _remove_entry(cache_dir, entries, entry_id)
+                evicted.append(entry_id)
+    if policy.max_bytes is not None:
+        total_bytes = sum(record["size"] for record in entries.values())
+        for entry_id, record in sorted(entries.items(), key=lambda item: item[1]["last_access"]):
+            if total_bytes <= policy.max_bytes:
+                break
+            total_bytes -= _remove_entry(cache_dir, entries, entry_id)
+            evicted.append(entry_id)
+    return evicted
+
+
+def _remove_orphaned_temp_files(cache_dir: str, now: float) -> List[str]:
+    """Removes temp files left behind by interrupted writes."""
+    removed = []
+    patterns = [os.path.join(glob.escape(cache_dir), ".*.tmp")]
+    patterns += [os.path.join(glob.escape(cache_dir), section, "*", ".*.tmp") for section in CACHE_SECTIONS]
+    for path in (path for pattern in patterns for path in glob.glob(pattern)):
+        try:
+            if now - os.path.getmtime(path) > ORPHANED_TEMP_FILE_SECONDS:
+                os.remove(path)
+                removed.append(os.path.relpath(path, cache_dir).replace(os.sep, "/"))
+        except OSError:
+            pass
+    return removed
+
+
+def load_cached_aspects(cache_dir: str, keys: Dict[str, CacheKey]) -> Dict[str, pl.DataFrame]:
+    """
+    Loads every aspect with a cache entry for its key and records the access
+    for LRU eviction. Keys with a projection are served by the full frame
+    when it is cached. Unreadable entries count as misses.
+    """
+    hits: Dict[str, pl.DataFrame] = {}
+    used_keys: List[CacheKey] = []
+    for aspect_name, key in keys.items():
+        candidates = [key] if key.columns is None else [key.projected(None), key]
+        for candidate in candidates:
             try:
-                reconstructed_data[name] = [row_model_type.model_validate(d) for d in list_of_dicts]
-            except SchemaValidationError as e:
-                raise CacheValidationError(f"Failed to re-validate cached data for {name}") from e
-        else:
-            logger.warning(f"No raw schema for cached aspect '{name}'. Skipping.")
-    logger.info(f"Successfully loaded and validated data from cache with version: {cached_version[:7]}")
-    return reconstructed_data
\ No newline at end of file
+                df = load_cached_aspect(cache_dir, candidate)
+            except CacheReadError as e:
+                logger.warning(f"Could not use cache for '{aspect_name}': {e.__cause__}. Reprocessing it.")
+                continue
+            if df is not None:
+                hits[aspect_name] = df if key.columns is None else df.select(
+                    name for name in df.columns if name in key.columns
+                )
+                used_keys.append(candidate)
+                break
+
+    if used_keys:
+        _touch_entries(cache_dir, (_entry_id(key) for key in used_keys))
+    return hits
+
+
+def save_aspect_to_cache(df: pl.DataFrame, cache_dir: str, key: CacheKey) -> None:
+    """Writes an aspect's frame atomically. Does not update the index; see `save_aspects_to_cache`."""
+    _write_cached_frame(df, _get_cache_filepath(cache_dir, key))
+
+
+def save_aspects_to_cache(
+    dataframes: Dict[str, pl.DataFrame],
+    cache_dir: str,
+    keys: Dict[str, CacheKey],
+    policy: CachePolicy = CachePolicy(),
+) -> None:
+    """
+    Caches the given frames, records them in the index, removes entries for the
+    same inputs with other fingerprints and then enforces the `policy`.
+    """
+    if not dataframes:
+        return
+    for aspect_name, df in dataframes.items():
+        save_aspect_to_cache(df, cache_dir, keys[aspect_name])
+    _index_new_entries(cache_dir, [_entry_id(keys[aspect_name]) for aspect_name in dataframes], policy)
+    logger.info(f"Cached {len(dataframes)} aspects.")
+
+
+# --- Stat results (Step 6) ---
+
+@dataclass
+class StatResultCache:
+    """
+    Caches the results of one replay's stats. `input_fingerprints` identifies
+    every frame the stats can read (see `CacheKey` and `frame_fingerprint`);
+    a stat's key only covers the frames named in its `inputs`.
+    With `refresh`, cached results are ignored but still rewritten.
+    """
+    cache_dir: str
+    input_fingerprints: Dict[str, str]
+    policy: CachePolicy = CachePolicy()
+    refresh: bool = False
+
+    def key_for(self, stat_name: str, stat: Stat) -> StatCacheKey:
+        # Stats that declare their inputs are only invalidated by changes to those frames.
+        input_fingerprints = dict(self.input_fingerprints)
+        if stat.inputs is not None:
+            sources = {name for name, _ in source_inputs(stat.inputs)}
+            input_fingerprints = {name: fp for name, fp in input_fingerprints.items() if name in sources}
+            # Derived tables are identified by the frames they are built from and their implementation.
+            for table_name in derived_tables_for([stat.inputs]):
+                input_fingerprints[f"derived:{table_name}"] = stat_fingerprint(DERIVED_TABLES[table_name])
+        # Results of other stats are identified by those stats' own keys.
+        for dependency in stat.depends_on:
+            if dependency in STATS_REGISTRY:
+                input_fingerprints[f"stat:{dependency}"] = self.key_for(dependency, STATS_REGISTRY[dependency]).filename
+        return StatCacheKey.for_stat(stat_name, stat, input_fingerprints)
+
+    def load(self, stats: Dict[str, Stat]) -> Dict[str, pl.DataFrame]:
+        """Returns the cached result of each given stat that has one. Unreadable entries count as misses."""
+        if self.refresh:
+            return {}
+        hits: Dict[str, pl.DataFrame] = {}
+        for stat_name, stat in stats.items():
+            try:
+                df = _read_cached_frame(_get_cache_filepath(self.cache_dir, self.key_for(stat_name, stat)))
+            except CacheReadError as e:
+                logger.warning(f"Could not use cached result of stat '{stat_name}': {e.__cause__}. Recomputing it.")
+                continue
+            if df is not None:
+                hits[stat_name] = df
+        if hits:
+            _touch_entries(self.cache_dir, (_entry_id(self.key_for(name, stats[name])) for name in hits))
+        return hits
+
+    def save(self, results: Dict[str, Tuple[Stat, pl.DataFrame]]) -> None:
+        """Caches freshly computed `(stat, result)` pairs by stat name."""
+        if not results:
+            return
+        keys = [self.key_for(stat_name, stat) for stat_name, (stat, _) in results.items()]
+        for key, (_, df) in zip(keys, results.values()):
+            _write_cached_frame(df, _get_cache_filepath(self.cache_dir, key))
+        _index_new_entries(self.cache_dir, [_entry_id(key) for key in keys], self.policy)
+        logger.info(f"Cached the results of {len(results)} stats.")
+
+
+# --- Maintenance (`tube cache`) ---
+
+@dataclass
+class CacheEntryInfo:
+    entry_id: str
+    section: str  # "aspects" or "stats"
+    name: str  # The aspect or stat name
+    size: int
+    last_access: float
+    stale: bool  # Written under a schema/pipeline fingerprint that no longer matches
+
+
+def inspect_cache(cache_dir: str) -> List[CacheEntryInfo]:
+    """Lists the indexed entries, least recently used first."""
+    if not os.path.isdir(cache_dir):
+        return []
+    with _locked_index(cache_dir) as entries:
+        infos = [
+            CacheEntryInfo(entry_id, entry_id.split("/")[0], record["name"], record["size"], record["last_access"], _is_stale(entry_id))
+            for entry_id, record in entries.items()
+        ]
+    return sorted(infos, key=lambda info: info.last_access)
+
+
+def _is_stale(entry_id: str) -> bool:
+    """Whether an entry was written under a schema, pipeline or stat implementation that has since changed."""
+    section, name, _ = entry_id.split("/")
+    if section == ASPECTS_SUBDIR and name in ASPECT_TO_RAW_SCHEMA_MAP:
+        current_fingerprint = aspect_fingerprint(name)
+    elif section == STATS_SUBDIR and name in STATS_REGISTRY:
+        current_fingerprint = stat_fingerprint(STATS_REGISTRY[name])
+    else:
+        return True
+    parts = _entry_parts(entry_id)
+    return len(parts) < 2 or parts[1] != current_fingerprint
+
+
+def find_legacy_cache_files(cache_dir: str) -> List[str]:
+    """Lists per-replay `.mpkcache` files written by the former msgpack cache."""
+    return sorted(glob.glob(os.path.join(glob.escape(cache_dir), f"*{LEGACY_CACHE_SUFFIX}")))
+
+
+def prune_cache(cache_dir: str, policy: CachePolicy = CachePolicy(), remove_stale: bool = False) -> List[str]:
+    """
+    Enforces the `policy`, optionally removes stale entries, and always removes
+    orphaned temp files and legacy `.mpkcache` files. Returns what was removed.
+    """
+    removed = []
+    for path in find_legacy_cache_files(cache_dir):
+        os.remove(path)
+        removed.append(os.path.basename(path))
+    if not os.path.isdir(cache_dir):
+        return removed
+
+    now = time.time()
+    removed.extend(_remove_orphaned_temp_files(cache_dir, now))
+    with _locked_index(cache_dir) as entries:
+        if remove_stale:
+            for entry_id in list(entries):
+                if _is_stale(entry_id):
+                    _remove_entry(cache_dir, entries, entry_id)
+                    removed.append(entry_id)
+        removed.extend(_evict(cache_dir, entries, policy, now))
+    return removed
+
+
+def verify_cache(cache_dir: str, fix: bool = False) -> List[Tuple[str, str]]:
+    """
+    Checks that every cache file is indexed with its true size and fully
+    readable, and that every index record has a file. Returns `(entry, problem)`
+    pairs. With `fix`, unreadable files are removed and the index is reconciled
+    with the files on disk.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    problems: List[Tuple[str, str]] = []
+    with _locked_index(cache_dir) as entries:
+        on_disk = _scan_entries(cache_dir)
+        for entry_id in sorted(set(entries) - set(on_disk)):
+            problems.append((entry_id, "indexed but missing on disk"))
+            if fix:
+                entries.pop(entry_id)
+        for entry_id, disk_record in sorted(on_disk.items()):
+            record = entries.get(entry_id)
+            if record is None:
+                problems.append((entry_id, "not indexed"))
+                if fix:
+                    entries[entry_id] = disk_record
+            elif record["size"] != disk_record["size"]:
+                problems.append((entry_id, f"size mismatch (indexed {record['size']}, actual {disk_record['size']})"))
+                if fix:
+                    record["size"] = disk_record["size"]
+            try:
+                pl.read_ipc(os.path.join(cache_dir, entry_id), memory_map=False)
+            except (OSError, pl.exceptions.PolarsError) as e:
+                problems.append((entry_id, f"unreadable: {e}"))
+                if fix:
+                    _remove_entry(cache_dir, entries, entry_id)
+    return problems
@@ -0,0 +1,446 @@
+"""Step 2 (Columnar Engine): Decode aspect bytes straight into typed Polars columns.
+
+The row engine (`decoder.py` + `value_transformer.py` + `dataframe_creator.py`)
+builds and re-validates one Pydantic model per row. This engine instead unpacks
+every row once, transposes the rows into column buffers and validates each
+column in bulk against the field order and types of the raw schema, so no
+per-row Python model objects are ever created. Steps 4 and 5 are then applied
+frame-wise by `value_transformer.transform_aspect_frame`.
+
+The resulting frames are identical to the ones produced by the row engine.
+
+For very large aspects, `decode_aspect_in_batches` decodes a fixed number of
+rows at a time and spills batches to Arrow IPC files once a memory budget is
+exceeded, so peak memory stays bounded regardless of the aspect's size.
+
+Every decode function takes an optional `columns` projection (see
+`resolve_projection`): only the projected columns are transposed, validated,
+transformed and kept, so aspects read by a few stats cost a fraction of the
+CPU and memory of a full decode. msgpack rows are still unpacked whole.
+Values outside the projection are never validated.
+
+Worker processes hand their frames back as `IpcFrame` (Arrow IPC bytes) or
+`SpilledFrame` (an Arrow IPC file), so the parent only stitches frames together.
+"""
+from functools import lru_cache
+from itertools import islice, zip_longest
+from typing import Any, BinaryIO, Collection, Dict, Iterator, List, Optional, Sequence, Tuple, Union, get_args
+from dataclasses import dataclass
+import io
+import logging
+import os
+import tempfile
+
+import numpy as np
+import polars as pl
+from pydantic import TypeAdapter, ValidationError
+
+from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP
+from tubuin_processor.core.dataframe_creator import _pydantic_to_polars_schema
+from tubuin_processor.core.decoder import create_unpacker
+from tubuin_processor.core.value_transformer import transform_aspect_frame, _compile_frame_transform
+from tubuin_processor.core.exceptions import DecodingError, ParserError, SchemaValidationError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _ColumnSpec:
+    """Describes how one positional msgpack value maps onto a typed column."""
+    name: str
+    dtype: pl.DataType
+    python_type: Any
+    nullable: bool
+
+
+@lru_cache(maxsize=None)
+def _get_column_specs(aspect_name: str) -> Optional[Tuple[_ColumnSpec, ...]]:
+    """Derives the ordered column specs for an aspect from its raw Pydantic schema."""
+    row_model_type = ASPECT_TO_RAW_SCHEMA_MAP.get(aspect_name)
+    if not row_model_type:
+        return None
+    polars_schema = _pydantic_to_polars_schema(row_model_type)
+    specs = []
+    for name, field_info in row_model_type.model_fields.items():
+        annotation = field_info.annotation
+        type_args = get_args(annotation)
+        nullable = type(None) in type_args
+        python_type = next((t for t in type_args if t is not type(None)), annotation)
+        specs.append(_ColumnSpec(name, polars_schema[name], python_type, nullable))
+    return tuple(specs)
+
+
+def resolve_projection(aspect_name: str, columns: Optional[Collection[str]]) -> Optional[Tuple[str, ...]]:
+    """
+    Turns a set of requested clean columns into the projection the decode
+    functions take: the aspect's columns among them, in schema order. Returns
+    None, meaning every column, when nothing is requested or nothing would be
+    left out. Unknown names are ignored.
+    """
+    compiled = _compile_frame_transform(aspect_name)
+    if columns is None or compiled is None:
+        return None
+    projection = tuple(name for name in compiled.columns if name in columns)
+    if not projection or len(projection) == len(compiled.columns):
+        return None
+    return projection
+
+
+@lru_cache(maxsize=None)
+def _get_column_adapter(python_type: Any) -> TypeAdapter:
+    """A Pydantic adapter that validates a whole column with lax, row-engine semantics."""
+    return TypeAdapter(List[Optional[python_type]])
+
+
+def _fits_dtype(value: Any, dtype: pl.DataType) -> bool:
+    try:
+        pl.Series([value], dtype=dtype, strict=True)
+    except (TypeError, OverflowError, pl.exceptions.PolarsError):
+        return False
+    return True
+
+
+def _build_column(spec: _ColumnSpec, values: Sequence[Any]) -> Tuple[pl.Series, Dict[int, str]]:
+    """
+    Builds a typed Series for one column, returning it with a map of failing row
+    indices to error messages. The fast path lets Polars build the column
+    strictly; only when that fails is the column coerced through Pydantic, which
+    applies exactly the same rules as the raw schema (e.g. `2.0` -> `2`).
+    """
+    failures: Dict[int, str] = {}
+    try:
+        series = pl.Series(spec.name, values, dtype=spec.dtype, strict=True)
+    except (TypeError, OverflowError, pl.exceptions.PolarsError):
+        adapter = _get_column_adapter(spec.python_type)
+        values = list(values)
+        try:
+            coerced = adapter.validate_python(values)
+        except ValidationError as e:
+            for error in e.errors():
+                row = error["loc"][0]
+                failures.setdefault(row, f"{error['msg']} (got {values[row]!r})")
+            for row in failures:
+                values[row] = None
+            coerced = adapter.validate_python(values)
+        try:
+            series = pl.Series(spec.name, coerced, dtype=spec.dtype, strict=True)
+        except (TypeError, OverflowError, pl.exceptions.PolarsError):
+            # Valid Python values that do not fit the column dtype (e.g. an int >= 2**63).
+            for row, value in enumerate(coerced):
+                if value is not None and not _fits_dtype(value, spec.dtype):
+                    failures.setdefault(row, f"Input should fit in {spec.dtype} (got {values[row]!r})")
+                    coerced[row] = None
+            series = pl.Series(spec.name, coerced, dtype=spec.dtype, strict=True)
+
+    if not spec.nullable and series.has_nulls():
+        for row in series.is_null().arg_true().to_list():
+            failures.setdefault(row, "Field required, but value is missing or None")
+    return series, failures
+
+
+def _report_invalid_rows(
+    aspect_name: str,
+    failures_by_field: Dict[str, Dict[int, str]],
+    skip_on_error: bool,
+    row_offset: int,
+    error_type: type[ParserError],
+) -> np.ndarray:
+    """Raises on the first failing row, or logs one summary per field when skipping."""
+    first_row, first_field = min(
+        (min(rows), field) for field, rows in failures_by_field.items()
+    )
+    if not skip_on_error:
+        message = failures_by_field[first_field][first_row]
+        error = error_type(f"Field '{first_field}': {message}")
+        error.add_note(f"Error occurred on row {first_row + row_offset} for aspect '{aspect_name}'")
+        raise error
+    invalid_rows = set()
+    for field, rows in failures_by_field.items():
+        sample_row = min(rows)
+        logger.warning(
+            f"Validation error in {len(rows)} row(s) of field '{field}' for '{aspect_name}' "
+            f"(first at row {sample_row + row_offset}: {rows[sample_row]}). Skipping."
+        )
+        invalid_rows.update(rows)
+    return np.fromiter(invalid_rows, dtype=np.int64, count=len(invalid_rows))
+
+
+def rows_to_raw_frame(
+    aspect_name: str,
+    rows: List[Any],
+    skip_on_error: bool = False,
+    row_offset: int = 0,
+    fields: Optional[Collection[str]] = None,
+) -> Optional[pl.DataFrame]:
+    """
+    Transposes a list of decoded positional rows into a typed DataFrame that
+    matches the aspect's raw schema, validating arity and types column-wise.
+    `fields` limits the frame to those raw fields; the other values are
+    neither copied nor validated. `row_offset` is only used to report
+    absolute row numbers in messages.
+    """
+    specs = _get_column_specs(aspect_name)
+    if specs is None:
+        logger.warning(f"No raw Pydantic schema for aspect '{aspect_name}'. Skipping.")
+        return None
+
+    n_fields = len(specs)
+    n_rows = len(rows)
+    lengths = np.fromiter(
+        (len(r) if isinstance(r, (list, tuple)) else -1 for r in rows),
+        dtype=np.int64,
+        count=n_rows,
+    )
+    failures_by_field: Dict[str, Dict[int, str]] = {}
+
+    bad_shape = np.flatnonzero((lengths < 0) | (lengths > n_fields))
+    if bad_shape.size:
+        shape_failures = {}
+        for row in bad_shape.tolist():
+            shape_failures[row] = (
+                f"Row {row + row_offset} is not a list."
+                if lengths[row] < 0
+                else f"Received {lengths[row]} values, but schema defines {n_fields}."
+            )
+            rows[row] = ()
+        failures_by_field["<row>"] = shape_failures
+
+    positions = [i for i, spec in enumerate(specs) if fields is None or spec.name in fields]
+    # Blanked rows are shorter than `lengths` says, so they always take the padding path.
+    if n_rows and not bad_shape.size and lengths.min() == n_fields:
+        if len(positions) == n_fields:
+            columns = list(zip(*rows))
+        else:
+            # One pass per projected field is far cheaper than transposing every value.
+            columns = [[row[i] for row in rows] for i in positions]
+    else:
+        # Short rows are padded with None, mirroring `BaseAspectDataPointRaw.from_list`.
+        # If every row was blanked, all `n_fields` columns are padding.
+        columns = list(zip_longest(*rows))
+        columns.extend([(None,) * n_rows] * (n_fields - len(columns)))
+        columns = [columns[i] for i in positions]
+
+    series_list = []
+    for spec, values in zip((specs[i] for i in positions), columns):
+        series, failures = _build_column(spec, values)
+        if bad_shape.size:
+            # Blanked rows are already reported once, under "<row>".
+            failures = {row: message for row, message in failures.items() if row not in shape_failures}
+        if failures:
+            failures_by_field[spec.name] = failures
+        series_list.append(series)
+
+    raw_df = pl.DataFrame(series_list)
+    if failures_by_field:
+        invalid_rows = _report_invalid_rows(
+            aspect_name, failures_by_field, skip_on_error, row_offset, SchemaValidationError
+        )
+        keep_mask = np.ones(n_rows, dtype=bool)
+        keep_mask[invalid_rows] = False
+        raw_df = raw_df.filter(pl.Series(keep_mask))
+    return raw_df
+
+
+def _decode_rows(
+    aspect_name: str,
+    rows: List[Any],
+    skip_on_error: bool,
+    row_offset: int = 0,
+    columns: Optional[Tuple[str, ...]] = None,
+) -> pl.DataFrame:
+    """Turns decoded positional rows into a clean DataFrame (Steps 2, 4 and 5)."""
+    fields = None if columns is None else _compile_frame_transform(aspect_name, columns).raw_fields
+    raw_df = rows_to_raw_frame(aspect_name, rows, skip_on_error, row_offset, fields)
+    assert raw_df is not None
+    return transform_aspect_frame(aspect_name, raw_df, skip_on_error, row_offset, columns)
+
+
+def decode_aspect_to_frame(
+    aspect_name: str,
+    raw_bytes: Union[bytes, BinaryIO],
+    skip_on_error: bool = False,
+    row_offset: int = 0,
+    columns: Optional[Tuple[str, ...]] = None,
+) -> Optional[pl.DataFrame]:
+    """
+    Decodes a single aspect's raw bytes (or a file-like view of them) into its
+    clean DataFrame without creating per-row Pydantic models. Returns None for
+    aspects without a raw schema. `row_offset` is the absolute index of the
+    first row when decoding a shard, used in messages. `columns` is a
+    projection from `resolve_projection`.
+    """
+    if aspect_name not in ASPECT_TO_RAW_SCHEMA_MAP:
+        logger.warning(f"No raw Pydantic schema for aspect '{aspect_name}'. Skipping.")
+        return None
+
+    try:
+        rows = list(create_unpacker(aspect_name, raw_bytes, use_list=False))
+    except DecodingError:
+        raise
+    except Exception as e:
+        raise DecodingError(f"Failed to unpack msgpack rows for {aspect_name}") from e
+
+    clean_df = _decode_rows(aspect_name, rows, skip_on_error, row_offset, columns)
+    if clean_df.is_empty() and row_offset == 0:
+        logger.warning(f"No data for '{aspect_name}'. Creating empty DataFrame.")
+    logger.debug(f"Decoded {clean_df.height} records for '{aspect_name}' with the columnar engine.")
+    return clean_df
+
+
+def _categorical_columns(df: pl.DataFrame) -> List[str]:
+    return [name for name, dtype in df.schema.items() if dtype == pl.Categorical]
+
+
+def concat_aspect_frames(frames: List[pl.DataFrame]) -> pl.DataFrame:
+    """
+    Concatenates batches or shards of one aspect in order. Each part has its own
+    categorical encoding, so categorical columns are joined as strings and
+    re-categorized once instead of being re-encoded pairwise.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    categorical_columns = _categorical_columns(frames[0])
+    as_strings = [frame.with_columns(pl.col(categorical_columns).cast(pl.Utf8)) for frame in frames]
+    return pl.concat(as_strings, rechunk=False).with_columns(pl.col(categorical_columns).cast(pl.Categorical))
+
+
+# --- Batched decoding with bounded memory ---
+
+DEFAULT_BATCH_ROWS = 250_000
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    """Controls batched decoding. `max_memory_bytes` bounds the decoded data held in memory per aspect."""
+    batch_rows: int = DEFAULT_BATCH_ROWS
+    max_memory_bytes: Optional[int] = None
+    spill_dir: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SpilledFrame:
+    """
+    A decoded aspect that exceeded its memory budget and was written to an
+    Arrow IPC file. It is cheap to pass between processes; `load` memory-maps
+    the file, so its pages are read from disk on demand. Categorical columns
+    are stored as strings and re-categorized on load.
+    """
+    aspect_name: str
+    path: str
+    categorical_columns: Tuple[str, ...] = ()
+
+    def load(self) -> pl.DataFrame:
+        df = pl.read_ipc(self.path, memory_map=True)
+        return df.with_columns(pl.col(list(self.categorical_columns)).cast(pl.Categorical))
+
+
+# Worker results are small enough to compress quickly; lz4 shrinks them ~4x at negligible CPU cost.
+IPC_COMPRESSION = "lz4"
+
+
+@dataclass(frozen=True)
+class IpcFrame:
+    """
+    A decoded aspect (or shard) serialized to an in-memory Arrow IPC buffer for
+    the trip from a worker process back to the parent. Compressed columnar
+    buffers, with categoricals kept dictionary-encoded, are several times smaller
+    and far cheaper to (de)serialize than pickled row objects.
+    """
+    aspect_name: str
+    payload: bytes
+
+    @classmethod
+    def from_frame(cls, aspect_name: str, df: pl.DataFrame) -> "IpcFrame":
+        buffer = io.BytesIO()
+        df.write_ipc(buffer, compression=IPC_COMPRESSION)
+        return cls(aspect_name, buffer.getvalue())
+
+    def load(self) -> pl.DataFrame:
+        return pl.read_ipc(io.BytesIO(self.payload))
+
+
+def iter_aspect_batches(
+    aspect_name: str,
+    raw_bytes: Union[bytes, BinaryIO],
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    skip_on_error: bool = False,
+    row_offset: int = 0,
+    columns: Optional[Tuple[str, ...]] = None,
+) -> Iterator[pl.DataFrame]:
+    """
+    Decodes an aspect `batch_rows` rows at a time, yielding clean DataFrame
+    batches in order. At least one (possibly empty) batch is always yielded.
+    When given a file-like object, only the current batch is ever held in memory.
+    """
+    unpacker = create_unpacker(aspect_name, raw_bytes, use_list=False)
+    first_batch = True
+    while True:
+        try:
+            rows = list(islice(unpacker, batch_rows))
+        except Exception as e:
+            raise DecodingError(f"Failed to unpack msgpack rows for {aspect_name}") from e
+        if rows or first_batch:
+            yield _decode_rows(aspect_name, rows, skip_on_error, row_offset, columns)
+        if len(rows) < batch_rows:
+            return
+        row_offset += len(rows)
+        first_batch = False
+
+
+def _spill_batches(batches: List[pl.DataFrame], spill_dir: str, aspect_name: str) -> str:
+    """Writes batches to a new Arrow IPC file and returns its path."""
+    fd, path = tempfile.mkstemp(prefix=f"{aspect_name}-", suffix=".arrow", dir=spill_dir)
+    os.close(fd)
+    pl.concat(batches, rechunk=False).write_ipc(path)
+    return path
+
+
+def decode_aspect_in_batches(
+    aspect_name: str,
+    raw_bytes: Union[bytes, BinaryIO],
+    options: BatchOptions,
+    skip_on_error: bool = False,
+    row_offset: int = 0,
+    columns: Optional[Tuple[str, ...]] = None,
+) -> Union[pl.DataFrame, SpilledFrame, None]:
+    """
+    Decodes an aspect in batches of `options.batch_rows` rows. Batches are kept
+    in memory until they exceed `options.max_memory_bytes`; from then on they
+    are spilled to Arrow IPC files, which are finally merged into a single file
+    and returned as a `SpilledFrame`. Returns None for aspects without a raw schema.
+    """
+    if aspect_name not in ASPECT_TO_RAW_SCHEMA_MAP:
+        logger.warning(f"No raw Pydantic schema for aspect '{aspect_name}'. Skipping.")
+        return None
+
+    spill_dir = options.spill_dir or tempfile.gettempdir()
+    pending: List[pl.DataFrame] = []
+    pending_bytes = 0
+    spilled_parts: List[str] = []
+    categorical_columns: List[str] = []
+    for batch in iter_aspect_batches(aspect_name, raw_bytes, options.batch_rows, skip_on_error, row_offset, columns):
+        categorical_columns = _categorical_columns(batch)
+        batch = batch.with_columns(pl.col(categorical_columns).cast(pl.Utf8))
+        pending.append(batch)
+        pending_bytes += batch.estimated_size()
+        if options.max_memory_bytes is not None and pending_bytes > options.max_memory_bytes:
+            spilled_parts.append(_spill_batches(pending, spill_dir, aspect_name))
+            logger.debug(f"Spilled {pending_bytes / 1024**2:.1f} MB of '{aspect_name}' to {spilled_parts[-1]}.")
+            pending, pending_bytes = [], 0
+
+    if not spilled_parts:
+        clean_df = pl.concat(pending, rechunk=True).with_columns(pl.col(categorical_columns).cast(pl.Categorical))
+        if clean_df.is_empty() and row_offset == 0:
+            logger.warning(f"No data for '{aspect_name}'. Creating empty DataFrame.")
+        return clean_df
+
+    if pending:
+        spilled_parts.append(_spill_batches(pending, spill_dir, aspect_name))
+    fd, path = tempfile.mkstemp(prefix=f"{aspect_name}-", suffix=".arrow", dir=spill_dir)
+    os.close(fd)
+    pl.scan_ipc(spilled_parts, memory_map=True).sink_ipc(path)
+
+    for part in spilled_parts:
+        os.remove(part)
+    logger.info(f"Aspect '{aspect_name}' exceeded its memory budget and was spilled to {path}.")
+    return SpilledFrame(aspect_name, path, tuple(categorical_columns))
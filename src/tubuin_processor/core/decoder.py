@@ -1,5 +1,6 @@
 """Step 2: Translate to Canonicalized Dictionaries (Streaming)"""
-from typing import Any, Iterator
+from typing import Any, BinaryIO, Iterator, Union
+from enum import Enum
 import msgpack
 import logging
 from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP
@@ -7,21 +8,50 @@ from tubuin_processor.core.exceptions import DecodingError, SchemaValidationErro
 
 logger = logging.getLogger(__name__)
 
-def stream_decode_aspect(aspect_name: str, raw_bytes: bytes, skip_on_error: bool = False) -> Iterator[Any]:
-    """Decodes a single aspect's raw bytes in a streaming fashion."""
+
+class DecodeEngine(str, Enum):
+    """Selects how aspects are decoded into DataFrames (Steps 2-5)."""
+    ROW = "row"  # One Pydantic model per row (decoder -> value_transformer -> dataframe_creator)
+    COLUMNAR = "columnar"  # Bulk column decoding straight into Polars (columnar_decoder)
+
+
+# Read size used when unpacking from a file-like object such as a memory map.
+UNPACKER_READ_SIZE = 1024 * 1024
+
+
+def create_unpacker(aspect_name: str, raw_data: Union[bytes, BinaryIO], use_list: bool = True) -> msgpack.Unpacker:
+    """
+    Creates a msgpack Unpacker over raw bytes or a readable file-like object.
+    File-like objects (e.g. memory-mapped aspect files) are read incrementally
+    instead of being copied into the unpacker's buffer in one piece.
+    """
+    if hasattr(raw_data, "read"):
+        return msgpack.Unpacker(raw_data, raw=False, use_list=use_list, read_size=UNPACKER_READ_SIZE)
+    unpacker = msgpack.Unpacker(raw=False, use_list=use_list)
+    try:
+        unpacker.feed(raw_data)
+    except Exception as e:
+        raise DecodingError(f"Failed to feed bytes to msgpack unpacker for {aspect_name}") from e
+    return unpacker
+
+
+def stream_decode_aspect(
+    aspect_name: str, raw_bytes: Union[bytes, BinaryIO], skip_on_error: bool = False, row_offset: int = 0
+) -> Iterator[Any]:
+    """
+    Decodes a single aspect's raw bytes (or a file-like view of them) in a
+    streaming fashion. `row_offset` is the absolute index of the first row when
+    decoding a shard, used in messages.
+    """
     row_model_type = ASPECT_TO_RAW_SCHEMA_MAP.get(aspect_name)
     if not row_model_type:
         logger.warning(f"No raw Pydantic schema for aspect '{aspect_name}'. Skipping.")
         return
 
-    unpacker = msgpack.Unpacker(raw=False, use_list=True)
-    try:
-        unpacker.feed(raw_bytes)
-    except Exception as e:
-        raise DecodingError(f"Failed to feed bytes to msgpack unpacker for {aspect_name}") from e
+    unpacker = create_unpacker(aspect_name, raw_bytes, use_list=True)
 
-    i = 0
-    for i, row_data_list in enumerate(unpacker):
+    i = row_offset - 1
+    for i, row_data_list in enumerate(unpacker, start=row_offset):
         try:
             if not isinstance(row_data_list, list):
                 raise SchemaValidationError(f"Row {i} is not a list.")
@@ -32,4 +62,4 @@ def stream_decode_aspect(aspect_name: str, raw_bytes: bytes, skip_on_error: bool
                 continue
             e.add_note(f"Error occurred on row {i} for aspect '{aspect_name}'")
             raise e
-    logger.debug(f"Streamed and validated {i + 1} records for '{aspect_name}'.")
\ No newline at end of file
+    logger.debug(f"Streamed and validated {i + 1 - row_offset} records for '{aspect_name}'.")
\ No newline at end of file
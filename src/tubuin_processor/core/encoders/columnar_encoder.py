@@ -1,6 +1,6 @@
 # src\tubuin_processor\core\encoders\columnar_encoder.py
 
-from typing import List, Any
+from typing import Any, List, Optional
 
 import numpy as np
 import polars as pl
@@ -26,39 +26,66 @@ _NUMPY_DTYPE_MAP = {
     pl.Boolean: "uint8",
 }
 
+# Encodings a contract can select for columnar streams with an `encoding` key,
+# per column or in `table_options` for every column. "auto" picks
+# "dictionary" for low-cardinality columns, when that is smaller than "plain".
+COLUMN_ENCODINGS = ("plain", "dictionary", "delta", "frame_of_reference", "auto")
+
+# Columns with more distinct values tend to compress better plain than as
+# wider dictionary codes, so "auto" leaves them plain.
+AUTO_DICTIONARY_MAX_VALUES = 2**8
+
+_DICTIONARY_DTYPES = (
+    pl.Int8, pl.UInt8, pl.Int16, pl.UInt16, pl.Int32, pl.UInt32, pl.Int64, pl.UInt64, pl.Utf8,
+)
+
+# Dictionary codes use the narrowest of these that can index every value.
+_CODE_DTYPES = ((2**8, pl.UInt8), (2**16, pl.UInt16), (2**32, pl.UInt32))
+
+_INTEGER_DTYPES = _DICTIONARY_DTYPES[:-1]
+_UNSIGNED_DTYPES = (pl.UInt8, pl.UInt16, pl.UInt32, pl.UInt64)
+_SIGNED_DTYPES = (pl.Int8, pl.Int16, pl.Int32, pl.Int64)
+
+
+def _offsets_from_lengths(lengths: pl.Series) -> np.ndarray:
+    """uint32 offsets (one more than the number of lengths) of consecutive runs; null lengths count as 0."""
+    offsets = np.zeros(len(lengths) + 1, dtype="uint32")
+    np.cumsum(lengths.fill_null(0).to_numpy(), out=offsets[1:])
+    return offsets
+
+
+def _list_offsets_and_values(series: pl.Series) -> tuple[np.ndarray, pl.Series]:
+    """
+    Splits a List series into uint32 offsets (one more than the number of
+    lists) and its elements flattened in order. Null lists hold no elements,
+    like empty ones. Only non-empty lists are exploded, since `explode` turns
+    null and empty lists into a null element.
+    """
+    lengths = series.list.len()
+    return _offsets_from_lengths(lengths), series.filter(lengths > 0).explode()
+
 
 def _series_to_bytes_recursive(
     series: pl.Series, base_name: str
 ) -> tuple[dict[str, bytes], List[dict[str, Any]]]:  # Return type
     dtype = series.dtype
 
-    # ... (List(Struct), List<primitive>, Utf8/String blocks remain the same) ...
     if isinstance(dtype, pl.List) and isinstance(dtype.inner, pl.Struct):
         fields = dtype.inner.fields
-        list_offs = [0]
-        struct_count = 0
-        flat_vals: dict[str, List[Any]] = {f.name: [] for f in fields}
-        for list_item in series:
-            if list_item is not None:
-                for struct in list_item:
-                    for f_def in fields:
-                        flat_vals[f_def.name].append(
-                            struct.get(f_def.name) if struct else None
-                        )
-                    struct_count += 1
-            list_offs.append(struct_count)
+        list_offs, structs = _list_offsets_and_values(series)
+        # A null struct element contributes a null to every field.
+        field_frame = structs.alias("struct").to_frame().select(
+            pl.when(pl.col("struct").is_not_null())
+            .then(pl.col("struct").struct.field(f_def.name))
+            .alias(f_def.name)
+            for f_def in fields
+        )
         blobs: dict[str, bytes] = {}
         struct_schemas: List[dict[str, Any]] = []
-        blobs[f"{base_name}_list_offs"] = np.asarray(
-            list_offs, dtype="uint32"
-        ).tobytes()
-        for f_def in fields:
-            f_name = f_def.name
-            f_series = pl.Series(
-                name=f_name, values=flat_vals[f_name], dtype=f_def.dtype, strict=False
-            )
+        blobs[f"{base_name}_list_offs"] = list_offs.tobytes()
+        for f_series in field_frame:
             f_blobs, f_sch = _series_to_bytes_recursive(
-                f_series, f"{base_name}__{f_name}"
+                f_series, f"{base_name}__{f_series.name}"
             )
             blobs.update(f_blobs)
             struct_schemas.extend(f_sch)
@@ -73,35 +100,17 @@ def _series_to_bytes_recursive(
 
     if isinstance(dtype, pl.List) and dtype.inner in _NUMPY_DTYPE_MAP:
         inner_np = _NUMPY_DTYPE_MAP[dtype.inner]
-        offs = [0]
-        parts: List[bytes] = []
-        count = 0  # Ensure parts is list of bytes
-        is_flt = dtype.inner in (pl.Float32, pl.Float64)
-        for sub_list in series:
-            if sub_list is None:
-                parts.append(b"")
+        offs, items = _list_offsets_and_values(series)
+        if items.has_nulls():
+            if dtype.inner in (pl.Float32, pl.Float64):
+                items = items.fill_null(np.nan)
             else:
-                proc = []
-                for item in sub_list:
-                    if item is None:
-                        if is_flt:
-                            proc.append(np.nan)
-                        else:
-                            raise ValueError(
-                                f"'{base_name}': list has None in non-float inner {dtype.inner}."
-                            )
-                    else:
-                        proc.append(item)
-                if proc:
-                    arr = np.asarray(proc, dtype=inner_np)
-                    parts.append(arr.tobytes())
-                    count += len(arr)
-                else:
-                    parts.append(b"")
-            offs.append(count)
+                raise ValueError(
+                    f"'{base_name}': list has None in non-float inner {dtype.inner}."
+                )
         blobs_dict: dict[str, bytes] = {  # Explicit type
-            f"{base_name}_offs": np.asarray(offs, dtype="uint32").tobytes(),
-            f"{base_name}_data": b"".join(parts),
+            f"{base_name}_offs": offs.tobytes(),
+            f"{base_name}_data": items.to_numpy().astype(inner_np, copy=False).tobytes(),
         }
         schema_list: List[dict[str, Any]] = [  # Explicit type
             {
@@ -114,17 +123,13 @@ def _series_to_bytes_recursive(
         return blobs_dict, schema_list
 
     if dtype == pl.Utf8 or dtype == pl.String:
-        enc_parts: List[bytes] = [
-            s.encode("utf-8", "surrogatepass") if s is not None else b"" for s in series
-        ]  # Ensure list of bytes
-        offs = [0]
-        l = 0
-        for p in enc_parts:
-            l += len(p)
-            offs.append(l)
+        # Polars strings are valid UTF-8, so their bytes are taken as they are:
+        # null strings are empty, and the data is one native concatenation.
+        offs = _offsets_from_lengths(series.str.len_bytes())
+        data = series.str.join("").cast(pl.Binary).item()
         blobs_dict: dict[str, bytes] = {  # Explicit type
-            f"{base_name}_offs": np.asarray(offs, dtype="uint32").tobytes(),
-            f"{base_name}_data": b"".join(enc_parts),
+            f"{base_name}_offs": offs.tobytes(),
+            f"{base_name}_data": data,
         }
         schema_list: List[dict[str, Any]] = [  # Explicit type
             {
@@ -199,11 +204,132 @@ def _series_to_bytes_recursive(
         ) from e
 
 
+def _plain_byte_size(series: pl.Series) -> int:
+    """The size of a dictionary-encodable series' plain blobs."""
+    if series.dtype == pl.Utf8:
+        return int(series.str.len_bytes().sum() or 0) + 4 * (len(series) + 1)
+    return len(series) * np.dtype(_NUMPY_DTYPE_MAP[series.dtype]).itemsize
+
+
+def _dictionary_encode(
+    series: pl.Series, base_name: str, encoding: str
+) -> Optional[tuple[dict[str, bytes], List[dict[str, Any]]]]:
+    """
+    Encodes an integer or Utf8 column as its sorted distinct values plus, per
+    row, the narrowest unsigned code indexing them. Null strings are empty, as
+    in the plain encoding. Returns None when the column is left plain: its
+    dtype is unsupported, it has nulls it cannot encode, or the encoding is
+    "auto" and the column has too many distinct values or would not shrink.
+    """
+    if series.dtype not in _DICTIONARY_DTYPES:
+        if encoding == "dictionary":
+            logger.warning(f"Series '{base_name}' ({series.dtype}) cannot be dictionary-encoded. Encoding it plain.")
+        return None
+    if series.dtype == pl.Utf8:
+        series = series.fill_null("")
+    elif series.has_nulls():
+        return None
+
+    dictionary = series.unique().sort()
+    code_dtype = next(dtype for limit, dtype in _CODE_DTYPES if len(dictionary) <= limit)
+    if encoding == "auto":
+        codes_size = len(series) * np.dtype(_NUMPY_DTYPE_MAP[code_dtype]).itemsize
+        if len(dictionary) > AUTO_DICTIONARY_MAX_VALUES or codes_size + _plain_byte_size(dictionary) >= _plain_byte_size(series):
+            return None
+
+    codes = dictionary.search_sorted(series, side="left").cast(code_dtype)
+    blobs, dictionary_schema = _series_to_bytes_recursive(dictionary, f"{base_name}__dict")
+    blobs[f"{base_name}_codes"] = codes.to_numpy().tobytes()
+    return blobs, [
+        {
+            "name": base_name,
+            "dtype": "Utf8" if series.dtype == pl.Utf8 else str(series.dtype),
+            "encoding": "dictionary",
+            "data_key": f"{base_name}_codes",
+            "codes_dtype": str(code_dtype),
+            "dictionary": dictionary_schema[0],
+        }
+    ]
+
+
+def _narrowest_integer_dtype(low: int, high: int) -> pl.DataType:
+    """The narrowest integer dtype holding `low` to `high`, unsigned when `low` is not negative."""
+    dtypes = _UNSIGNED_DTYPES if low >= 0 else _SIGNED_DTYPES
+    for dtype in dtypes:
+        info = np.iinfo(_NUMPY_DTYPE_MAP[dtype])
+        if info.min <= low and high <= info.max:
+            return dtype
+    raise OverflowError(f"No integer dtype holds {low} to {high}.")
+
+
+def _reference_encode(
+    series: pl.Series, base_name: str, encoding: str
+) -> Optional[tuple[dict[str, bytes], List[dict[str, Any]]]]:
+    """
+    Encodes an integer column relative to a `base`, in the narrowest integer
+    dtype holding the results:
+    - "delta": `base` is the first value, and each row stores its difference
+      from the previous row (0 for the first). Decode with a running sum
+      plus `base`. Suits sorted columns such as frames.
+    - "frame_of_reference": `base` is the minimum, and each row stores its
+      offset from it. Suits columns whose values span a narrow range.
+    Returns None, leaving the column plain, for other dtypes, nulls, empty
+    columns and value ranges too wide for Int64 arithmetic.
+    """
+    if series.dtype not in _INTEGER_DTYPES:
+        logger.warning(f"Series '{base_name}' ({series.dtype}) cannot be {encoding}-encoded. Encoding it plain.")
+        return None
+    if series.is_empty() or series.has_nulls():
+        return None
+    low, high = int(series.min()), int(series.max())
+    if max(high, high - low) > np.iinfo("int64").max:
+        return None
+
+    values = series.cast(pl.Int64)
+    if encoding == "delta":
+        base = int(values[0])
+        residuals = values.diff().fill_null(0)
+    else:
+        base = low
+        residuals = values - low
+    storage_dtype = _narrowest_integer_dtype(int(residuals.min()), int(residuals.max()))
+    data_key = f"{base_name}_{'delta' if encoding == 'delta' else 'for'}"
+    return {data_key: residuals.cast(storage_dtype).to_numpy().tobytes()}, [
+        {
+            "name": base_name,
+            "dtype": str(series.dtype),
+            "encoding": encoding,
+            "data_key": data_key,
+            "storage_dtype": str(storage_dtype),
+            "base": base,
+        }
+    ]
+
+
+_ENCODERS = {
+    "dictionary": _dictionary_encode,
+    "auto": _dictionary_encode,
+    "delta": _reference_encode,
+    "frame_of_reference": _reference_encode,
+}
+
+
 def _series_to_bytes(
-    series: pl.Series,
+    series: pl.Series, encoding: str = "plain"
 ) -> tuple[dict[str, bytes], List[dict[str, Any]]]:
+    """Encodes a column with the encoding its contract selects (see `COLUMN_ENCODINGS`)."""
+    encoder = _ENCODERS.get(encoding)
+    if encoder is not None:
+        encoded = encoder(series, series.name, encoding)
+        if encoded is not None:
+            return encoded
     return _series_to_bytes_recursive(series, series.name)
 
+
+def _column_encoding(col_meta: dict[str, Any], table_meta: dict[str, Any]) -> str:
+    """The column's `encoding`, falling back to the table's, then "plain"."""
+    return col_meta.get("encoding", table_meta.get("encoding", "plain"))
+
 def _fill_nulls_per_contract(
     series: pl.Series,
     col_meta: dict[str, Any],
@@ -0,0 +1,302 @@
+"""
+Incremental processing of growing aspect files (`tube run --incremental`).
+
+Live games append rows to their aspect files while they run. In incremental
+mode, each replay keeps its decoded frames and stat results under
+`<cache_dir>/incremental/<replay_id>/`. A `state.json` records, per aspect,
+the byte offset and row count decoded so far. A run decodes only the whole
+rows appended since that offset and stores them as a new Arrow chunk next to
+the earlier ones. A partial row at the end of a file that is still being
+written is left for the next run.
+
+A file is only resumed if it still starts with the same bytes and still holds
+the same bytes just before the recorded offset (both checked by hash), and
+if its schema, projection and `--skip-on-error` setting are unchanged.
+Otherwise, e.g. when a new game reuses the path, it is decoded from scratch.
+
+Stats whose inputs are unchanged reuse their previous result. A stat with a
+`merge` function (see `Stat.merge`) is computed over the appended rows only
+and merged into its previous result. Every other stat whose inputs grew is
+recomputed over the full frames.
+
+A replay's incremental state must not be updated by two runs at once.
+"""
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import tempfile
+
+import polars as pl
+
+from tubuin_processor.core.cache_manager import (
+    _read_cached_frame,
+    _write_cached_frame,
+    aspect_fingerprint,
+    content_hash,
+    stat_fingerprint,
+)
+from tubuin_processor.core.columnar_decoder import concat_aspect_frames
+from tubuin_processor.core.exceptions import CacheReadError, CacheWriteError
+from tubuin_processor.core.ingestion import AspectSource
+from tubuin_processor.core.sharding import complete_rows_length, slice_source
+from tubuin_processor.core.stat_scheduler import compute_stat
+from tubuin_processor.core.stats import with_dependencies
+from tubuin_processor.core.stats.derived_tables import source_inputs
+from tubuin_processor.core.stats.types import Stat
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_SUBDIR = "incremental"
+STATE_FILENAME = "state.json"
+STATE_VERSION = 1
+# Bytes hashed at the start of a file, and before its resume offset, to check that it was only appended to.
+CHECK_BYTES = 64 * 1024
+# An aspect's chunks are compacted into one file once it has more than this many.
+MAX_CHUNKS = 16
+
+
+@dataclass
+class AspectProgress:
+    """How much of one aspect file has been decoded, and where the frame is stored."""
+    offset: int = 0  # Bytes of whole rows decoded so far
+    rows: int = 0  # Rows of the stored frame
+    generation: int = 0  # Incremented whenever the aspect is decoded from scratch
+    settings: str = ""  # Aspect fingerprint, projection and --skip-on-error of the stored frame
+    head_hash: str = ""  # Hash of the file's first CHECK_BYTES
+    tail_hash: str = ""  # Hash of the CHECK_BYTES before `offset`
+    chunks: List[str] = field(default_factory=list)  # Arrow files holding the frame, in order
+
+
+@dataclass
+class StatProgress:
+    """The inputs a stored stat result was computed from."""
+    fingerprint: str
+    aspect_rows: Dict[str, List[int]]  # Aspect name -> [generation, rows]
+    context: Dict[str, str]  # Context frame name -> fingerprint
+
+
+def _hash_range(source: AspectSource, start: int, end: int) -> str:
+    return content_hash(slice_source(source, start, end))
+
+
+def _check_hashes(source: AspectSource, offset: int) -> Tuple[str, str]:
+    return _hash_range(source, 0, min(CHECK_BYTES, offset)), _hash_range(source, max(0, offset - CHECK_BYTES), offset)
+
+
+class IncrementalReplay:
+    """The decoded aspects and stat results of one replay so far."""
+
+    def __init__(self, cache_dir: str, replay_id: str):
+        self.directory = os.path.join(cache_dir, INCREMENTAL_SUBDIR, replay_id)
+        self.aspects: Dict[str, AspectProgress] = {}
+        self.stats: Dict[str, StatProgress] = {}
+        # Per aspect being updated: its new progress, and whether it is decoded from scratch.
+        self._pending: Dict[str, Tuple[AspectProgress, bool]] = {}
+
+    @classmethod
+    def load(cls, cache_dir: str, replay_id: str) -> "IncrementalReplay":
+        """Loads a replay's state. A missing or unreadable state starts from scratch."""
+        replay = cls(cache_dir, replay_id)
+        try:
+            with open(os.path.join(replay.directory, STATE_FILENAME), encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                replay.aspects = {name: AspectProgress(**progress) for name, progress in state["aspects"].items()}
+                replay.stats = {name: StatProgress(**progress) for name, progress in state["stats"].items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable incremental state of replay '{replay_id}': {e}")
+        return replay
+
+    def save(self) -> None:
+        """Writes the state atomically, after the frames and results it refers to."""
+        state = {
+            "version": STATE_VERSION,
+            "aspects": {name: asdict(progress) for name, progress in self.aspects.items()},
+            "stats": {name: asdict(progress) for name, progress in self.stats.items()},
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{STATE_FILENAME}-", suffix=".tmp", dir=self.directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, os.path.join(self.directory, STATE_FILENAME))
+        except OSError as e:
+            raise CacheWriteError(f"Failed to write the incremental state in {self.directory}") from e
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _can_resume(self, progress: AspectProgress, source: AspectSource, settings: str) -> bool:
+        return (
+            progress.settings == settings
+            and len(source) >= progress.offset
+            and all(os.path.exists(self._path(chunk)) for chunk in progress.chunks)
+            and _check_hashes(source, progress.offset) == (progress.head_hash, progress.tail_hash)
+        )
+
+    def resume(
+        self,
+        raw_mpk_data: Dict[str, AspectSource],
+        projections: Dict[str, Tuple[str, ...]],
+        skip_on_error: bool,
+        restart: bool = False,
+    ) -> Dict[str, AspectSource]:
+        """
+        Works out which bytes of each aspect have not been decoded yet and
+        returns them, cut after the last whole row. Aspects without new rows
+        are left out. With `restart`, every aspect is decoded from scratch.
+        Pass the decoded frames to `append`.
+        """
+        to_decode: Dict[str, AspectSource] = {}
+        resumed = []
+        for name, source in raw_mpk_data.items():
+            settings = f"{aspect_fingerprint(name)}:{','.join(projections.get(name) or ('*',))}:{int(skip_on_error)}"
+            previous = self.aspects.get(name)
+            if previous is not None and not restart and self._can_resume(previous, source, settings):
+                progress, from_scratch = replace(previous, chunks=list(previous.chunks)), False
+                resumed.append(name)
+            else:
+                generation = previous.generation + 1 if previous is not None else 0
+                progress, from_scratch = AspectProgress(generation=generation, settings=settings), True
+            start = progress.offset
+            end = start + complete_rows_length(name, slice_source(source, start, len(source)))
+            if end > start:
+                to_decode[name] = slice_source(source, start, end)
+                progress.offset = end
+                progress.head_hash, progress.tail_hash = _check_hashes(source, end)
+            self._pending[name] = (progress, from_scratch)
+        logger.info(
+            f"Incremental mode: resuming {len(resumed)} of {len(raw_mpk_data)} aspects; "
+            f"{len(to_decode)} have rows to decode ({sum(len(s) for s in to_decode.values()) / 1024:.1f} KB)."
+        )
+        return to_decode
+
+    def append(self, decoded_dataframes: Dict[str, pl.DataFrame]) -> Dict[str, pl.DataFrame]:
+        """Stores the newly decoded rows of each aspect and returns every aspect's full frame."""
+        dataframes: Dict[str, pl.DataFrame] = {}
+        for name, (progress, from_scratch) in self._pending.items():
+            if from_scratch and name in self.aspects:
+                self._remove(self.aspects[name].chunks)
+            appended = decoded_dataframes.get(name)
+            if appended is not None and appended.height > 0:
+                progress.chunks.append(self._write_chunk(name, progress.generation, appended, first_row=progress.rows))
+            frames = [self._read_chunk(chunk) for chunk in progress.chunks]
+            if frames:
+                dataframes[name] = concat_aspect_frames(frames)
+                progress.rows = dataframes[name].height
+            if len(progress.chunks) > MAX_CHUNKS:
+                old_chunks, progress.chunks = progress.chunks, [self._write_chunk(name, progress.generation, dataframes[name], first_row=0)]
+                self._remove(old_chunks)
+            self.aspects[name] = progress
+        self._pending.clear()
+        return dataframes
+
+    def _write_chunk(self, name: str, generation: int, df: pl.DataFrame, first_row: int) -> str:
+        chunk = f"{name}.{generation}.{first_row}-{first_row + df.height}.arrow"
+        _write_cached_frame(df, self._path(chunk))
+        return chunk
+
+    def _read_chunk(self, chunk: str) -> pl.DataFrame:
+        df = _read_cached_frame(self._path(chunk))
+        if df is None:
+            raise CacheReadError(f"Incremental chunk {self._path(chunk)} is missing")
+        return df
+
+    def _remove(self, filenames: List[str]) -> None:
+        for filename in filenames:
+            try:
+                os.remove(self._path(filename))
+            except OSError:  # Already gone, or still memory-mapped on Windows
+                pass
+
+
+class IncrementalStatResults:
+    """
+    Serves a replay's previous stat results to `perform_aggregations`, in place
+    of a `StatResultCache`: unchanged results as they are, and results of
+    merging stats brought up to date with the appended rows. Saving records
+    which rows each result covers.
+    """
+
+    def __init__(self, replay: IncrementalReplay, dataframes: Dict[str, pl.DataFrame], context_fingerprints: Dict[str, str]):
+        self.replay = replay
+        self.dataframes = dataframes
+        self.context_fingerprints = context_fingerprints
+        self._stats: Dict[str, Stat] = {}
+        self._merged: Dict[str, pl.DataFrame] = {}
+
+    def _progress_for(self, stat_name: str) -> StatProgress:
+        """The inputs the stat's result covers if computed now, including those of the stats it depends on."""
+        names = [name for name in with_dependencies([stat_name]) if name in self._stats]
+        declared = [self._stats[name].inputs for name in names]
+        if any(inputs is None for inputs in declared):
+            read = set(self.replay.aspects) | set(self.context_fingerprints)
+        else:
+            read = {frame_name for inputs in declared for frame_name, _ in source_inputs(inputs)}
+        return StatProgress(
+            fingerprint=",".join(stat_fingerprint(self._stats[name]) for name in names),
+            aspect_rows={name: [progress.generation, progress.rows] for name, progress in self.replay.aspects.items() if name in read},
+            context={name: fp for name, fp in self.context_fingerprints.items() if name in read},
+        )
+
+    def _result_path(self, stat_name: str) -> str:
+        return os.path.join(self.replay.directory, "stats", f"{stat_name}.arrow")
+
+    def load(self, stats: Dict[str, Stat]) -> Dict[str, pl.DataFrame]:
+        """Returns the up-to-date result of each given stat that can be had without a full recomputation."""
+        self._stats = stats
+        hits: Dict[str, pl.DataFrame] = {}
+        for stat_name, stat in stats.items():
+            previous = self.replay.stats.get(stat_name)
+            current = self._progress_for(stat_name)
+            if previous is None or previous.fingerprint != current.fingerprint or previous.context != current.context:
+                continue
+            try:
+                previous_result = _read_cached_frame(self._result_path(stat_name))
+            except CacheReadError as e:
+                logger.warning(f"Could not use the previous result of stat '{stat_name}': {e.__cause__}. Recomputing it.")
+                continue
+            if previous_result is None:
+                continue
+            if previous.aspect_rows == current.aspect_rows:
+                hits[stat_name] = previous_result
+            elif stat.merge is not None and not stat.depends_on and _only_appended(previous, current):
+                merged = self._merge(stat_name, stat, previous, previous_result)
+                if merged is not None:
+                    hits[stat_name] = self._merged[stat_name] = merged
+        logger.info(f"Incremental mode: {len(hits) - len(self._merged)} stat results unchanged, {len(self._merged)} merged.")
+        return hits
+
+    def _merge(self, stat_name: str, stat: Stat, previous: StatProgress, previous_result: pl.DataFrame) -> Optional[pl.DataFrame]:
+        frames = {name: self.dataframes[name] for name in previous.context}
+        frames.update(
+            (name, self.dataframes[name].slice(rows)) for name, (_, rows) in previous.aspect_rows.items() if name in self.dataframes
+        )
+        try:
+            appended_result = compute_stat(stat, frames)
+            if appended_result is None or appended_result.is_empty():
+                return previous_result
+            return stat.merge(previous_result, appended_result)
+        except Exception as e:
+            logger.warning(f"Could not merge stat '{stat_name}' incrementally ({e}). Recomputing it.")
+            return None
+
+    def save(self, results: Dict[str, Tuple[Stat, pl.DataFrame]]) -> None:
+        """Stores freshly computed `(stat, result)` pairs, and the merged results, with the rows they cover."""
+        to_save = dict(self._merged)
+        to_save.update((name, df) for name, (_, df) in results.items())
+        for stat_name, df in to_save.items():
+            _write_cached_frame(df, self._result_path(stat_name))
+            self.replay.stats[stat_name] = self._progress_for(stat_name)
+
+
+def _only_appended(previous: StatProgress, current: StatProgress) -> bool:
+    """Whether every input of `current` holds the rows of `previous` plus rows appended since."""
+    return previous.aspect_rows.keys() == current.aspect_rows.keys() and all(
+        generation == current.aspect_rows[name][0] and rows <= current.aspect_rows[name][1]
+        for name, (generation, rows) in previous.aspect_rows.items()
+    )
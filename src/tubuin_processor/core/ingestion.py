@@ -1,7 +1,11 @@
+import io
+import mmap
 import os
 import logging
 import json
-from typing import Any, List, Dict, Optional
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Collection, Iterator, List, Dict, Optional, Union
 from tubuin_processor.core.exceptions import FileIngestionError
 from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP
 import polars as pl
@@ -9,30 +13,107 @@ import polars as pl
 logger = logging.getLogger(__name__)
 
 
-def load_mpk_files(directory_paths: List[str]) -> Dict[str, bytes]:
-    """Loads raw .mpk files, handling duplicates and logging errors."""
-    raw_files_content: Dict[str, bytes] = {}
-    logger.info(f"Starting file ingestion from {directory_paths}")
+@dataclass(frozen=True)
+class AspectFileRef:
+    """
+    A lightweight, picklable handle to an aspect's bytes on disk. It is passed
+    to worker processes instead of the bytes themselves; each worker maps the
+    file and lets the OS page data in on demand.
+    """
+    aspect_name: str
+    path: str
+    offset: int
+    length: int
+
+    def __len__(self) -> int:
+        return self.length
+
+    @contextmanager
+    def open_mapped(self) -> Iterator[BinaryIO]:
+        """Memory-maps the referenced byte range and yields it as a read-only file-like object."""
+        if self.length == 0:
+            # An empty range cannot be memory-mapped.
+            yield io.BytesIO(b"")
+            return
+        aligned_offset = self.offset - self.offset % mmap.ALLOCATIONGRANULARITY
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(
+                f.fileno(), self.length + self.offset - aligned_offset, access=mmap.ACCESS_READ, offset=aligned_offset
+            ) as mapped:
+                if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                mapped.seek(self.offset - aligned_offset)
+                yield mapped  # type: ignore[misc]
+        except (OSError, ValueError) as e:
+            raise FileIngestionError(f"Failed to memory-map {self.path} for aspect '{self.aspect_name}'") from e
+
+
+# Raw aspect data as handed to Steps 2-5: either the bytes themselves or a handle to them.
+AspectSource = Union[bytes, AspectFileRef]
+
+
+@contextmanager
+def open_aspect_source(source: AspectSource) -> Iterator[Union[bytes, BinaryIO]]:
+    """Yields bytes as-is, or memory-maps an `AspectFileRef` for the duration of the block."""
+    if isinstance(source, AspectFileRef):
+        with source.open_mapped() as mapped:
+            yield mapped
+    else:
+        yield source
+
+
+def _discover_mpk_files(directory_paths: List[str], aspects: Optional[Collection[str]] = None) -> Dict[str, str]:
+    """Maps aspect names to .mpk file paths, handling duplicates. Only `aspects` are kept if given."""
+    file_paths: Dict[str, str] = {}
     for dir_path in directory_paths:
         if not os.path.isdir(dir_path):
             logger.warning(f"Input directory not found or inaccessible: {dir_path}")
             continue
         for filename in os.listdir(dir_path):
             if filename.endswith(".mpk"):
-                file_path = os.path.join(dir_path, filename)
                 aspect_name = os.path.splitext(filename)[0]
-                if aspect_name in raw_files_content:
+                if aspects is not None and aspect_name not in aspects:
+                    logger.debug(f"Skipping '{filename}': not needed by the requested stats and streams.")
+                    continue
+                if aspect_name in file_paths:
                     logger.warning(
                         f"Duplicate aspect name '{aspect_name}' found. Overwriting previous file."
                     )
-                try:
-                    with open(file_path, "rb") as f:
-                        raw_files_content[aspect_name] = f.read()
-                except IOError as e:
-                    logger.error(f"Failed to read file {file_path}: {e}")
+                file_paths[aspect_name] = os.path.join(dir_path, filename)
+    return file_paths
+
+
+def load_mpk_files(directory_paths: List[str], aspects: Optional[Collection[str]] = None) -> Dict[str, bytes]:
+    """Loads raw .mpk files (only those of `aspects`, if given), handling duplicates and logging errors."""
+    raw_files_content: Dict[str, bytes] = {}
+    logger.info(f"Starting file ingestion from {directory_paths}")
+    for aspect_name, file_path in _discover_mpk_files(directory_paths, aspects).items():
+        try:
+            with open(file_path, "rb") as f:
+                raw_files_content[aspect_name] = f.read()
+        except IOError as e:
+            logger.error(f"Failed to read file {file_path}: {e}")
     return raw_files_content
 
 
+def index_mpk_files(directory_paths: List[str], aspects: Optional[Collection[str]] = None) -> Dict[str, AspectFileRef]:
+    """
+    Indexes raw .mpk files (only those of `aspects`, if given) without reading
+    them. Each aspect is returned as an `AspectFileRef` covering the whole file,
+    to be memory-mapped where decoded.
+    """
+    file_refs: Dict[str, AspectFileRef] = {}
+    logger.info(f"Starting memory-mapped file ingestion from {directory_paths}")
+    for aspect_name, file_path in _discover_mpk_files(directory_paths, aspects).items():
+        try:
+            file_refs[aspect_name] = AspectFileRef(
+                aspect_name, os.path.abspath(file_path), 0, os.path.getsize(file_path)
+            )
+        except OSError as e:
+            logger.error(f"Failed to stat file {file_path}: {e}")
+    return file_refs
+
+
 def load_unit_definitions(filepath: str) -> Dict[str, Any]:
     """
     Loads and parses the unit definitions from a specified JSON file.
@@ -3,15 +3,14 @@
 Module defining different strategies for writing the final output data using the
 Template Method design pattern for a clean, extensible architecture.
 """
-import io
 import json
 import os
-import struct
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Dict, Optional, Tuple, Type, Any
+from typing import Dict, List, Optional, Tuple, Type, Any
 from datetime import datetime, timezone
 
+import numpy as np
 import polars as pl
 import zstandard as zstd
 import msgpack
@@ -19,6 +18,7 @@ import gzip
 import logging
 
 from tubuin_processor.core.encoders.columnar_encoder import (
+    _column_encoding,
     _fill_nulls_per_contract,
     _series_to_bytes,
 )
@@ -58,12 +58,28 @@ def _get_struct_format_string(dtypes: list[pl.DataType]) -> str:
     return "".join(format_chars)
 
 
+def _pack_row_major(df: pl.DataFrame) -> Tuple[bytes, int]:
+    """
+    Packs a null-free DataFrame into little-endian rows without padding, laid
+    out as `struct.Struct(_get_struct_format_string(df.dtypes))` would pack
+    each row. Columns are copied into a NumPy structured array, so there is no
+    per-row Python work. Returns the bytes and the row stride.
+    """
+    format_string = _get_struct_format_string(df.dtypes)
+    # Positional field names, since column names need not be valid NumPy field names.
+    row_dtype = np.dtype([(f"f{i}", "<" + char) for i, char in enumerate(format_string[1:])])
+    rows = np.empty(df.height, dtype=row_dtype)
+    for i, series in enumerate(df):
+        rows[f"f{i}"] = series.to_numpy()
+    return rows.tobytes(), row_dtype.itemsize
+
+
 def _prepare_df_for_row_major_packing(
     df: pl.DataFrame, metadata: Dict, stream_name: str
 ) -> pl.DataFrame:
     """
     Checks a DataFrame for nulls and applies the null_encoding from the contract.
-    This ensures the DataFrame is safe for struct.pack().
+    This ensures the DataFrame is safe for row-major packing.
     """
     # If there are no nulls, no preparation is needed.
     nc_df = df.null_count()
@@ -93,6 +109,14 @@ def _prepare_df_for_row_major_packing(
 class OutputStrategy(ABC):
     """Abstract base class using the Template Method design pattern."""
 
+    # Written into the strategy's schema, if it has one; bumped when its layout changes.
+    schema_version: Optional[str] = None
+
+    @classmethod
+    def output_paths(cls, output_directory: str, replay_id: str) -> List[str]:
+        """The files or directories a successful write leaves for a replay."""
+        return [os.path.join(output_directory, replay_id)]
+
     def write(
         self,
         transformed_aggregated_data: Dict[str, Tuple[pl.DataFrame, Dict[str, Any]]],
@@ -144,6 +168,12 @@ class OutputStrategy(ABC):
 class HybridMessagePackZstStrategy(OutputStrategy):
     """Creates a single, self-contained .mpk.zst file."""
 
+    schema_version = "8.4-hybrid-mpk"
+
+    @classmethod
+    def output_paths(cls, output_directory: str, replay_id: str) -> List[str]:
+        return [os.path.join(output_directory, f"{replay_id}.mpk.zst")]
+
     def _get_column_schema(
         self, series_name: str, series_dtype: str, data_key: str, metadata: Dict
     ) -> Dict:
@@ -169,21 +199,9 @@ class HybridMessagePackZstStrategy(OutputStrategy):
                     df_prepared = _prepare_df_for_row_major_packing(
                         df, metadata, stream_name
                     )
-                    format_string = _get_struct_format_string(df_prepared.dtypes)
-                    packer = struct.Struct(format_string)
-
-                    with io.BytesIO() as buffer:
-                        for i, row in enumerate(df_prepared.iter_rows()):
-                            try:
-                                buffer.write(packer.pack(*row))
-                            except struct.error as e:
-                                logger.error(f"struct pack error: {e}")
-                                raise  # Re-raise the exception after printing
-
-                        stream_blobs = {}
-                        stream_blobs["default"] = buffer.getvalue()
-                        data_blobs[stream_name] = stream_blobs
-                        byte_size = len(data_blobs[stream_name]["default"])
+                    packed_bytes, row_byte_stride = _pack_row_major(df_prepared)
+                    data_blobs[stream_name] = {"default": packed_bytes}
+                    byte_size = len(packed_bytes)
 
                     row_major_cols_schema = [
                         self._get_column_schema(n, str(d), stream_name, metadata)
@@ -193,7 +211,7 @@ class HybridMessagePackZstStrategy(OutputStrategy):
                         "layout": "row-major-mixed",
                         "byte_size": byte_size,
                         "num_rows": len(df_prepared),
-                        "row_byte_stride": packer.size,
+                        "row_byte_stride": row_byte_stride,
                         "data_key": stream_name,
                         "columns": row_major_cols_schema,
                     }
@@ -212,7 +230,9 @@ class HybridMessagePackZstStrategy(OutputStrategy):
                         series, col_meta, table_meta, stream_name
                     )
 
-                    blobs, col_schema_entries = _series_to_bytes(series)
+                    blobs, col_schema_entries = _series_to_bytes(
+                        series, _column_encoding(col_meta, table_meta)
+                    )
 
                     # add every produced blob to the bundle and byte counter
                     for blob_key, blob_value in blobs.items():
@@ -291,7 +311,7 @@ class HybridMessagePackZstStrategy(OutputStrategy):
         master_object = {
             "schema": {
                 "replay_id": replay_id,
-                "schema_version": "8.2-hybrid-mpk",
+                "schema_version": self.schema_version,
                 "generated_at": datetime.now(timezone.utc).isoformat(),
                 "static_assets": static_asset_keys,
                 "streams": streams_schema,
@@ -312,6 +332,12 @@ class HybridMessagePackZstStrategy(OutputStrategy):
 class RowMajorBundleZstStrategy(OutputStrategy):
     """Creates a schema.json and one zstd-compressed binary file per row-major table."""
 
+    schema_version = "7.0-row-major-mixed"
+
+    @classmethod
+    def output_paths(cls, output_directory: str, replay_id: str) -> List[str]:
+        return [os.path.join(output_directory, replay_id, "schema.json")]
+
     def _execute_write(
         self,
         all_streams,
@@ -324,7 +350,7 @@ class RowMajorBundleZstStrategy(OutputStrategy):
         os.makedirs(replay_output_dir, exist_ok=True)
         schema = {
             "replay_id": replay_id,
-            "schema_version": "7.0-row-major-mixed",
+            "schema_version": self.schema_version,
             "generated_at": datetime.now(timezone.utc).isoformat(),
             "streams": {},
         }
@@ -337,13 +363,7 @@ class RowMajorBundleZstStrategy(OutputStrategy):
                 df_prepared = _prepare_df_for_row_major_packing(
                     df, metadata, stream_name
                 )
-
-                format_string = _get_struct_format_string(df.dtypes)
-                packer = struct.Struct(format_string)
-                with io.BytesIO() as buffer:
-                    for row in df_prepared.iter_rows():
-                        buffer.write(packer.pack(*row))
-                    packed_bytes = buffer.getvalue()
+                packed_bytes, row_byte_stride = _pack_row_major(df_prepared)
 
                 compressed_payload = zstd.ZstdCompressor().compress(packed_bytes)
                 filename = f"{stream_name}.rows.bin.zst"
@@ -354,7 +374,7 @@ class RowMajorBundleZstStrategy(OutputStrategy):
 
                 schema["streams"][stream_name] = {
                     "num_rows": len(df_prepared),
-                    "row_byte_stride": packer.size,
+                    "row_byte_stride": row_byte_stride,
                     "file": filename,
                     "layout": "row-major-mixed",
                     "columns": [
@@ -385,6 +405,12 @@ class RowMajorBundleZstStrategy(OutputStrategy):
 class ColumnarBundleZstStrategy(OutputStrategy):
     """Creates a schema.json and one zstd-compressed binary file per column."""
 
+    schema_version = "6.2-columnar"
+
+    @classmethod
+    def output_paths(cls, output_directory: str, replay_id: str) -> List[str]:
+        return [os.path.join(output_directory, replay_id, "schema.json")]
+
     def _execute_write(
         self,
         all_streams,
@@ -397,7 +423,7 @@ class ColumnarBundleZstStrategy(OutputStrategy):
         os.makedirs(replay_output_dir, exist_ok=True)
         schema = {
             "replay_id": replay_id,
-            "schema_version": "6.0-columnar",
+            "schema_version": self.schema_version,
             "generated_at": datetime.now(timezone.utc).isoformat(),
             "streams": {},
         }
@@ -419,7 +445,9 @@ class ColumnarBundleZstStrategy(OutputStrategy):
                     series, col_meta, table_meta, stream_name
                 )
 
-                blobs, col_schema_entries = _series_to_bytes(series)
+                blobs, col_schema_entries = _series_to_bytes(
+                    series, _column_encoding(col_meta, table_meta)
+                )
 
                 # write every produced blob (1 for numeric, 2 for Utf8)
                 for data_key, raw in blobs.items():
@@ -431,13 +459,15 @@ class ColumnarBundleZstStrategy(OutputStrategy):
                         f_out.write(compressed)
 
                     # add "file" field to the corresponding schema entry
-                    for entry in col_schema_entries:
-                        # match by key → add file name once
-                        if (
-                            entry.get("data_key") == data_key
-                            or entry.get("offsets_key") == data_key
-                        ):
-                            entry["file"] = filename
+                    for column_entry in col_schema_entries:
+                        # a dictionary-encoded column also names its dictionary's file
+                        for entry in (column_entry, column_entry.get("dictionary", {})):
+                            # match by key → add file name once
+                            if (
+                                entry.get("data_key") == data_key
+                                or entry.get("offsets_key") == data_key
+                            ):
+                                entry["file"] = filename
 
                 stream_cols_schema.extend(col_schema_entries)
 
@@ -509,6 +539,10 @@ class JsonLinesGzipStrategy(OutputStrategy):
 class MessagePackGzipStrategy(OutputStrategy):
     """Writes a single, gzipped MessagePack file (legacy format)."""
 
+    @classmethod
+    def output_paths(cls, output_directory: str, replay_id: str) -> List[str]:
+        return [os.path.join(output_directory, f"{replay_id}_master.mpk.gz")]
+
     def _execute_write(
         self,
         all_streams,
@@ -0,0 +1,131 @@
+"""
+Intra-aspect sharding: splits an aspect's msgpack stream at row boundaries so
+that a single large aspect can be decoded by several workers at once.
+
+Shard sizes are derived from the total input size and the number of workers,
+so that every worker receives a few similarly sized shards regardless of how
+the data is distributed across aspects.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import io
+import logging
+import os
+
+import msgpack
+
+from tubuin_processor.core.exceptions import DecodingError
+from tubuin_processor.core.ingestion import AspectFileRef, AspectSource, open_aspect_source
+
+logger = logging.getLogger(__name__)
+
+# Shards are never cut smaller than this; below it, per-task overhead dominates.
+MIN_SHARD_BYTES = 256 * 1024
+# Shards per worker; more than one lets fast workers pick up slack from slow ones.
+SHARDS_PER_WORKER = 2
+# Aspects no larger than this are decoded in the parent rather than shipped to a worker.
+INLINE_TASK_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class AspectShard:
+    """A contiguous run of whole msgpack rows of one aspect."""
+    aspect_name: str
+    index: int  # Position of the shard within its aspect
+    source: AspectSource
+    row_offset: int  # Absolute index of the shard's first row
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+
+def default_worker_count() -> int:
+    """The number of CPUs this process may use."""
+    count = os.process_cpu_count() if hasattr(os, "process_cpu_count") else os.cpu_count()
+    return count or 1
+
+
+def target_shard_bytes(total_bytes: int, workers: int) -> int:
+    """Picks a shard size that gives each worker about `SHARDS_PER_WORKER` shards."""
+    return max(MIN_SHARD_BYTES, -(-total_bytes // (max(workers, 1) * SHARDS_PER_WORKER)))
+
+
+def find_row_boundaries(aspect_name: str, source: AspectSource, shard_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Scans an aspect's msgpack stream without decoding values and returns
+    `(byte_offset, row_index)` pairs at which shards of roughly `shard_bytes`
+    bytes start. The first pair is always `(0, 0)`.
+    """
+    cuts = [(0, 0)]
+    total_bytes = len(source)
+    if total_bytes <= shard_bytes:
+        return cuts
+
+    with open_aspect_source(source) as raw_data:
+        stream = raw_data if hasattr(raw_data, "read") else io.BytesIO(raw_data)
+        unpacker = msgpack.Unpacker(stream, read_size=1024 * 1024)
+        next_cut = shard_bytes
+        rows = 0
+        try:
+            while True:
+                unpacker.skip()
+                rows += 1
+                position = unpacker.tell()
+                if position >= next_cut and position < total_bytes:
+                    cuts.append((position, rows))
+                    next_cut = position + shard_bytes
+        except msgpack.OutOfData:
+            pass
+        except Exception as e:
+            raise DecodingError(f"Failed to index msgpack rows for {aspect_name}") from e
+    return cuts
+
+
+def complete_rows_length(aspect_name: str, source: AspectSource) -> int:
+    """
+    The length in bytes of the whole msgpack rows at the start of a stream. A
+    file that is still being written may end in a partial row, which is left out.
+    """
+    with open_aspect_source(source) as raw_data:
+        stream = raw_data if hasattr(raw_data, "read") else io.BytesIO(raw_data)
+        unpacker = msgpack.Unpacker(stream, read_size=1024 * 1024)
+        length = 0
+        try:
+            while True:
+                unpacker.skip()
+                length = unpacker.tell()
+        except msgpack.OutOfData:
+            pass
+        except Exception as e:
+            raise DecodingError(f"Failed to index msgpack rows for {aspect_name}") from e
+    return length
+
+
+def slice_source(source: AspectSource, start: int, end: int) -> AspectSource:
+    """Narrows raw aspect data to a byte range, without copying memory-mapped files."""
+    if isinstance(source, AspectFileRef):
+        return AspectFileRef(source.aspect_name, source.path, source.offset + start, end - start)
+    return source[start:end]
+
+
+def shard_aspect(aspect_name: str, source: AspectSource, shard_bytes: int) -> List[AspectShard]:
+    """Splits an aspect into shards of whole rows, in order."""
+    cuts = find_row_boundaries(aspect_name, source, shard_bytes)
+    if len(cuts) == 1:
+        return [AspectShard(aspect_name, 0, source, 0)]
+    ends = [offset for offset, _ in cuts[1:]] + [len(source)]
+    return [
+        AspectShard(aspect_name, i, slice_source(source, start, end), row_offset)
+        for i, ((start, row_offset), end) in enumerate(zip(cuts, ends))
+    ]
+
+
+def plan_shards(raw_mpk_data: Dict[str, AspectSource], workers: int) -> Dict[str, List[AspectShard]]:
+    """Shards every aspect using a shard size adapted to the input size and worker count."""
+    if workers <= 1:
+        return {name: [AspectShard(name, 0, source, 0)] for name, source in raw_mpk_data.items()}
+    shard_bytes = target_shard_bytes(sum(len(source) for source in raw_mpk_data.values()), workers)
+    plan = {name: shard_aspect(name, source, shard_bytes) for name, source in raw_mpk_data.items()}
+    sharded = {name: len(shards) for name, shards in plan.items() if len(shards) > 1}
+    logger.debug(f"Shard size {shard_bytes / 1024:.0f} KB for {workers} workers. Split aspects: {sharded}")
+    return plan
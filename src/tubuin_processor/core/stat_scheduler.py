@@ -0,0 +1,253 @@
+"""
+Step 6: Concurrent, dependency-aware execution of stats.
+
+Stats are pure functions of the aspect DataFrames, so `StatScheduler` runs them
+on threads: Polars releases the GIL while it computes, so stats overlap
+without any frame being copied or pickled. A stat starts once every stat in its
+`depends_on` has finished, and receives their results in its input dict under
+their names. If a dependency fails, its dependents are skipped.
+
+Polars parallelizes each query on its own thread pool, so running many stats at
+once mostly adds contention. `max_workers` caps the number of stats in flight;
+it defaults to `DEFAULT_MAX_CONCURRENT_STATS` or the CPU count, whichever is lower.
+
+In `lazy` mode, every lazy stat (see `Stat.lazy`) without dependencies builds
+its plan over one shared set of LazyFrames, and the plans are collected
+together by `pl.collect_all`. Polars' common subplan elimination then runs the
+scans, filters and sorts the stats have in common only once. The shared plan
+is not subject to the timeout. If it fails, its stats are run one by one so
+that the error is attributed to the right stat.
+
+A stat that exceeds `timeout` seconds is reported as timed out and its
+dependents are skipped. Python threads cannot be interrupted, so the stat keeps
+running on a daemon thread, outside the concurrency cap, and its result is
+discarded.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+import logging
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+import polars as pl
+
+from tubuin_processor.core.sharding import default_worker_count
+from tubuin_processor.core.stats.types import Stat
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_STATS = 4
+
+
+class StatStatus(str, Enum):
+    OK = "ok"
+    COLLECTED = "collected"  # Computed as part of the shared lazy plan
+    CACHED = "cached"
+    FAILED = "failed"
+    TIMED_OUT = "timed_out"
+    SKIPPED = "skipped"  # A dependency did not produce a result
+
+
+# Statuses of stats whose result is available.
+_FINISHED = (StatStatus.OK, StatStatus.COLLECTED, StatStatus.CACHED)
+
+
+@dataclass
+class StatRun:
+    """How one stat of a replay was computed."""
+    name: str
+    status: StatStatus
+    seconds: float = 0.0
+    result_bytes: int = 0  # Estimated size of the result frame
+    error: Optional[str] = None
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """The peak resident memory of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass(frozen=True)
+class StatScheduler:
+    """Runs a replay's stats concurrently. `None` leaves a limit at its default."""
+    max_workers: Optional[int] = None
+    timeout: Optional[float] = None
+    lazy: bool = False
+
+    @property
+    def workers(self) -> int:
+        return self.max_workers or min(DEFAULT_MAX_CONCURRENT_STATS, default_worker_count())
+
+    def run(
+        self,
+        stats: Dict[str, Stat],
+        dataframes_by_aspect: Dict[str, pl.DataFrame],
+        precomputed: Optional[Dict[str, pl.DataFrame]] = None,
+    ) -> Tuple[Dict[str, Optional[pl.DataFrame]], Dict[str, StatRun]]:
+        """
+        Computes every stat in `stats` that is not `precomputed` (e.g. loaded
+        from the result cache), honoring `depends_on`. Returns the results of
+        the stats that finished (a stat may return None) and a `StatRun` for
+        every stat. Exceptions raised by a stat are logged, not propagated.
+        """
+        results: Dict[str, Optional[pl.DataFrame]] = dict(precomputed or {})
+        runs = {name: StatRun(name, StatStatus.CACHED, result_bytes=_frame_size(df)) for name, df in results.items()}
+        pending = {name: stat for name, stat in stats.items() if name not in results}
+        if self.lazy:
+            shared = {name: stat for name, stat in pending.items() if stat.lazy and not stat.depends_on}
+            for name, run in _collect_shared_plan(shared, dataframes_by_aspect, results).items():
+                runs[name] = run
+                del pending[name]
+        started: Dict[str, float] = {}
+        running: Dict[Future, str] = {}
+
+        while pending or running:
+            for name in list(pending):
+                if len(running) >= self.workers:
+                    break
+                stat = pending[name]
+                blocked_by = [dep for dep in stat.depends_on if dep in runs and runs[dep].status not in _FINISHED]
+                if blocked_by:
+                    del pending[name]
+                    runs[name] = StatRun(name, StatStatus.SKIPPED, error=f"dependency {blocked_by[0]!r} has no result")
+                    continue
+                if all(dep in results for dep in stat.depends_on):
+                    del pending[name]
+                    dependency_results = {dep: results[dep] if results[dep] is not None else pl.DataFrame() for dep in stat.depends_on}
+                    inputs = _stat_inputs(stat, {**dataframes_by_aspect, **dependency_results})
+                    started[name] = time.perf_counter()
+                    running[_start_thread(name, stat, inputs)] = name
+
+            if not running:
+                # Whatever is left waits on a stat that is missing, not requested or part of a cycle.
+                for name, stat in pending.items():
+                    missing = next(dep for dep in stat.depends_on if dep not in results)
+                    runs[name] = StatRun(name, StatStatus.SKIPPED, error=f"dependency {missing!r} was not computed")
+                break
+
+            timeout = None if self.timeout is None else max(0.0, min(started[n] for n in running.values()) + self.timeout - time.perf_counter())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+            for future in list(running):
+                name = running[future]
+                if future in done:
+                    del running[future]
+                    runs[name] = self._finish(name, future, now - started[name], results)
+                elif self.timeout is not None and now - started[name] >= self.timeout:
+                    # The thread cannot be stopped; its result will simply never be read.
+                    del running[future]
+                    runs[name] = StatRun(name, StatStatus.TIMED_OUT, now - started[name], error=f"exceeded {self.timeout:g}s")
+                    logger.error(f"Stat '{name}' timed out after {self.timeout:g}s. Its result will be discarded.")
+
+        for run in runs.values():
+            if run.status == StatStatus.SKIPPED:
+                logger.warning(f"Skipping stat '{run.name}': {run.error}.")
+        return results, runs
+
+    @staticmethod
+    def _finish(name: str, future: Future, seconds: float, results: Dict[str, Optional[pl.DataFrame]]) -> StatRun:
+        try:
+            result_df = future.result()
+        except Exception as e:
+            logger.error(f"Error calculating stat '{name}': {e}", exc_info=e)
+            return StatRun(name, StatStatus.FAILED, seconds, error=f"{type(e).__name__}: {e}")
+        results[name] = result_df
+        return StatRun(name, StatStatus.OK, seconds, _frame_size(result_df))
+
+
+def _stat_inputs(stat: Stat, frames: Dict[str, pl.DataFrame]) -> Dict[str, Any]:
+    """Lazy stats read LazyFrames; all others read the DataFrames themselves."""
+    return {name: df.lazy() for name, df in frames.items()} if stat.lazy else frames
+
+
+def _compute(stat: Stat, inputs: Dict[str, Any]) -> Optional[pl.DataFrame]:
+    result = stat.func(inputs)
+    return result.collect() if isinstance(result, pl.LazyFrame) else result
+
+
+def compute_stat(stat: Stat, frames: Dict[str, pl.DataFrame]) -> Optional[pl.DataFrame]:
+    """Computes one stat in the calling thread, collecting it if it is lazy."""
+    return _compute(stat, _stat_inputs(stat, frames))
+
+
+def _collect_shared_plan(
+    stats: Dict[str, Stat],
+    dataframes_by_aspect: Dict[str, pl.DataFrame],
+    results: Dict[str, Optional[pl.DataFrame]],
+) -> Dict[str, StatRun]:
+    """
+    Builds every given lazy stat's plan over the same LazyFrames and collects
+    them with one `pl.collect_all`, adding their results to `results`. Returns
+    a run for each collected stat; stats whose plan could not be built or
+    collected are left for the threads.
+    """
+    start_time = time.perf_counter()
+    sources = {name: df.lazy() for name, df in dataframes_by_aspect.items()}
+    plans: Dict[str, pl.LazyFrame] = {}
+    for name, stat in stats.items():
+        try:
+            plans[name] = stat.func(sources)
+        except Exception as e:
+            logger.debug(f"Could not build the lazy plan of stat '{name}': {e}")
+    if not plans:
+        return {}
+    try:
+        frames = pl.collect_all(plans.values())
+    except Exception as e:
+        logger.warning(f"The shared lazy plan failed ({e}). Running its {len(plans)} stats separately.")
+        return {}
+
+    seconds = time.perf_counter() - start_time
+    logger.info(f"Collected {len(plans)} lazy stats in one plan in {seconds:.2f}s.")
+    runs = {}
+    for name, df in zip(plans, frames):
+        results[name] = df
+        runs[name] = StatRun(name, StatStatus.COLLECTED, seconds, _frame_size(df))
+    return runs
+
+
+def _start_thread(name: str, stat: Stat, inputs: Dict[str, Any]) -> Future:
+    """Runs a stat on its own daemon thread, so a stat that never returns cannot block shutdown."""
+    future: Future = Future()
+
+    def compute() -> None:
+        try:
+            future.set_result(_compute(stat, inputs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=compute, name=f"stat-{name}", daemon=True).start()
+    return future
+
+
+def _frame_size(df: Optional[pl.DataFrame]) -> int:
+    return df.estimated_size() if df is not None else 0
+
+
+def log_stat_report(runs: Dict[str, StatRun], wall_seconds: float, peak_rss_before: Optional[int]) -> None:
+    """Logs each stat's status, time and result size, slowest first, and the growth of peak memory."""
+    computed = [run for run in runs.values() if run.status != StatStatus.CACHED]
+    for run in sorted(computed, key=lambda run: run.seconds, reverse=True):
+        detail = f"{run.result_bytes / 1024**2:.2f} MB" if run.status in _FINISHED else run.error
+        logger.info(f"  {run.name}: {run.status.value} in {run.seconds:.2f}s ({detail})")
+    # Collected stats all report the time of the plan they shared.
+    busy_seconds = sum(run.seconds for run in computed if run.status != StatStatus.COLLECTED)
+    busy_seconds += max((run.seconds for run in computed if run.status == StatStatus.COLLECTED), default=0.0)
+    message = f"Computed {len(computed)} stats in {wall_seconds:.2f}s ({busy_seconds:.2f}s of stat time)"
+    peak_rss_after = _peak_rss_bytes()
+    if peak_rss_before is not None and peak_rss_after is not None:
+        message += f"; peak memory grew by {(peak_rss_after - peak_rss_before) / 1024**2:.1f} MB"
+    logger.info(message + ".")
+
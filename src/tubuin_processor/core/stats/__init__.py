@@ -9,12 +9,13 @@ a STAT_DEFINITION variable of type Stat.
 import pkgutil
 import importlib
 import logging
-from typing import Dict, Callable
+from typing import Dict, Callable, Iterable, List, Optional, Set
 
 import polars as pl
 
 from tubuin_processor.schemas.aspects import ASPECT_TO_CLEAN_SCHEMA_MAP
-from .types import Stat
+from .types import Stat, StatInputs
+from .derived_tables import DERIVED_TABLES, source_inputs
 from .unaggregated import get_detailed_command_log
 
 logger = logging.getLogger(__name__)
@@ -67,6 +68,8 @@ logger.info(
 
 # For now, the unaggregated stream registry can remain simple and static here.
 UNAGGREGATED_STREAM_REGISTRY: Dict[str, Callable] = {}
+# The DataFrames and columns each unaggregated stream reads (see `Stat.inputs`).
+UNAGGREGATED_STREAM_INPUTS: Dict[str, StatInputs] = {}
 
 
 def _passthrough_stream_factory(
@@ -92,6 +95,7 @@ def _build_unaggregated_stream_registry():
     """
     # 1. Register the special, custom-processed 'command_log' stream.
     UNAGGREGATED_STREAM_REGISTRY["command_log"] = get_detailed_command_log
+    UNAGGREGATED_STREAM_INPUTS["command_log"] = {"commands_log": None}
 
     # 2. Dynamically create and register a pass-through function for every
     #    known clean data aspect defined in our schemas.
@@ -101,6 +105,7 @@ def _build_unaggregated_stream_registry():
             UNAGGREGATED_STREAM_REGISTRY[aspect_name] = _passthrough_stream_factory(
                 aspect_name
             )
+            UNAGGREGATED_STREAM_INPUTS[aspect_name] = {aspect_name: None}
 
 
 # Run registry builder at import time
@@ -108,3 +113,49 @@ _build_unaggregated_stream_registry()
 logger.info(
     f"Dynamically registered {len(UNAGGREGATED_STREAM_REGISTRY)} unaggregated streams: {list(UNAGGREGATED_STREAM_REGISTRY.keys())}"
 )
+
+
+def default_stat_names() -> List[str]:
+    """The stats computed when none are requested."""
+    return [name for name, stat in STATS_REGISTRY.items() if stat.default_enabled]
+
+
+def with_dependencies(stat_names: Iterable[str]) -> List[str]:
+    """
+    Adds the stats the given ones depend on, directly or transitively, after
+    the requested ones. Unknown names are kept as given.
+    """
+    resolved: List[str] = []
+    pending = list(stat_names)
+    while pending:
+        name = pending.pop(0)
+        if name in resolved:
+            continue
+        resolved.append(name)
+        if name in STATS_REGISTRY:
+            pending.extend(STATS_REGISTRY[name].depends_on)
+    return resolved
+
+
+def required_inputs(
+    stat_names: Iterable[str], stream_names: Iterable[str]
+) -> Optional[Dict[str, Optional[Set[str]]]]:
+    """
+    Merges the declared inputs of the given stats (and the stats they depend
+    on) and streams into the columns needed per DataFrame (None meaning all
+    columns). Derived tables count as the inputs they are built from. Returns None if any of them has undeclared inputs, in which case
+    everything is needed.
+    """
+    declared = [STATS_REGISTRY[name].inputs for name in with_dependencies(stat_names) if name in STATS_REGISTRY]
+    declared += [UNAGGREGATED_STREAM_INPUTS.get(name) for name in stream_names if name in UNAGGREGATED_STREAM_REGISTRY]
+    if any(inputs is None for inputs in declared):
+        return None
+
+    required: Dict[str, Optional[Set[str]]] = {}
+    for inputs in declared:
+        for frame_name, columns in source_inputs(inputs):
+            if columns is None or (frame_name in required and required[frame_name] is None):
+                required[frame_name] = None
+            else:
+                required.setdefault(frame_name, set()).update(columns)
+    return required
@@ -17,4 +17,5 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Description.",
     default_enabled=True,
+    inputs={},
 )
\ No newline at end of file
@@ -8,34 +8,28 @@ from typing import Dict
 from .types import Stat
 
 
-def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+def calculate(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
     """
     Scores units by how far and fast they move from their start position.
     Higher scores indicate more aggressive, early-game movement.
     """
-    pos_df = dataframes.get("unit_positions")
-    if pos_df is None or pos_df.is_empty():
-        return pl.DataFrame(
+    pos_df = dataframes.get("unit_positions_by_unit")
+    if pos_df is None:
+        return pl.LazyFrame(
             schema={"unit_id": pl.Int64, "aggression_score": pl.Float64}
         )
 
     # Assume a constant frame rate for time calculation
     FRAME_RATE = 30.0
 
-    # 1. Find the starting frame and position for each unit
-    start_positions = (
-        pos_df.sort("frame")
-        .group_by("unit_id")
-        .agg(
-            pl.first("frame").alias("start_frame"),
-            pl.first("x").alias("start_x"),
-            pl.first("y").alias("start_y"),
-        )
+    # 1-2. Attach each unit's starting frame and position. Positions are sorted
+    # by unit, then frame, so the start is the first row of each unit's track.
+    aggression_data = pos_df.with_columns(
+        pl.col("frame").first().over("unit_id").alias("start_frame"),
+        pl.col("x").first().over("unit_id").alias("start_x"),
+        pl.col("y").first().over("unit_id").alias("start_y"),
     )
 
-    # 2. Join starting positions back to the main positions log
-    aggression_data = pos_df.join(start_positions, on="unit_id")
-
     # 3. Calculate distance from start and "aggression impulse" (distance/time)
     # The aggression impulse weights early movement more heavily.
     aggression_data = aggression_data.with_columns(
@@ -71,4 +65,6 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Scores units by distance-over-time from their start position.",
     default_enabled=True,
+    inputs={"unit_positions_by_unit": ("frame", "unit_id", "x", "y")},
+    lazy=True,
 )
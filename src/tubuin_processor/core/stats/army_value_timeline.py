@@ -12,14 +12,15 @@ FRAME_RATE = 30  # game ticks per second
 INTERVAL_SECONDS = 15  # sampling interval
 
 
-def force_int_column(df: pl.DataFrame, col: str) -> pl.DataFrame:
+def force_int_column(df: pl.LazyFrame, col: str) -> pl.LazyFrame:
     """
     If a column is a struct, unnest it. Always ensures the final column is Int64.
     """
-    if col not in df.columns:
+    schema = df.collect_schema()
+    if col not in schema:
         return df
 
-    if isinstance(df[col].dtype, pl.Struct):
+    if isinstance(schema[col], pl.Struct):
         # Unnest only the target column. Passing a list is safer.
         df = df.unnest([col])
 
@@ -30,11 +31,12 @@ def force_int_column(df: pl.DataFrame, col: str) -> pl.DataFrame:
 # ──────────────────────────────────────────────────────────────────────────────
 # Main stat function
 # ──────────────────────────────────────────────────────────────────────────────
-def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+def calculate(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
     logger.info("Calculating stat: Army Value Timeline")
 
     # 1. Inputs
     unit_events_df = dataframes["unit_events"]
+    lifespans_df = dataframes["unit_lifespans"]
     unit_defs_df = dataframes["unit_defs"]
     defs_map_df = dataframes["defs_map"]
 
@@ -46,29 +48,23 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
     clean_defs_map = defs_map_df.select(["unit_def_id", "unit_name"])
     clean_unit_defs = unit_defs_df.select(["unit_name", "metalcost"])
 
-    # 4. Max frame
-    frame_col = unit_events_df["frame"].cast(pl.Int64)
-    max_frame_value = frame_col.max()
-    if max_frame_value is None:
-        max_frame = 0
-    elif isinstance(max_frame_value, (int, float)):
-        max_frame = int(max_frame_value)
-    else:
-        max_frame = 0
-
-    # 5. Lifespans
-    finished = (
-        unit_events_df.filter(pl.col("event_type") == "FINISHED")
-        .select(["frame", "unit_id", "unit_def_id", "unit_team_id"])
-        .rename({"frame": "creation_frame"})
+    # 4. Max frame (0 without events), as a one-row frame joined where needed
+    max_frame = unit_events_df.select(
+        pl.col("frame").cast(pl.Int64).max().fill_null(0).alias("max_frame")
     )
-    destroyed = (
-        unit_events_df.filter(pl.col("event_type") == "DESTROYED")
-        .select(["frame", "unit_id"])
-        .rename({"frame": "death_frame"})
-    )
-    unit_lifespans = finished.join(destroyed, on="unit_id", how="left").with_columns(
-        pl.col("death_frame").fill_null(max_frame + 1)
+
+    # 5. Lifespans of finished units; survivors die after the last frame
+    unit_lifespans = (
+        lifespans_df.filter(pl.col("finished_frame").is_not_null())
+        .select(
+            pl.col("finished_frame").alias("creation_frame"),
+            "unit_id",
+            "unit_def_id",
+            "unit_team_id",
+            "death_frame",
+        )
+        .join(max_frame, how="cross")
+        .with_columns(pl.col("death_frame").fill_null(pl.col("max_frame") + 1))
     )
 
     unit_lifespans = force_int_column(unit_lifespans, "death_frame")
@@ -84,12 +80,6 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
 
     unit_lifespans_with_cost = force_int_column(unit_lifespans_with_cost, "death_frame")
 
-    # early exit
-    if unit_lifespans_with_cost.is_empty():
-        return pl.DataFrame(
-            schema={"team_id": pl.Int64, "frame": pl.Int64, "army_value": pl.Float64}
-        )
-
     # 7. Creation & destruction deltas
     creations_delta = unit_lifespans_with_cost.select(
         pl.col("creation_frame").alias("frame"),
@@ -97,7 +87,7 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
         pl.col("metalcost").alias("value_change"),
     )
 
-    tmp = unit_lifespans_with_cost.filter(pl.col("death_frame") <= max_frame)
+    tmp = unit_lifespans_with_cost.filter(pl.col("death_frame") <= pl.col("max_frame"))
 
     destructions_delta = tmp.select(
         pl.col("death_frame").alias("frame"),
@@ -119,21 +109,15 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
 
     # 8. Build timeline
     interval_frames = INTERVAL_SECONDS * FRAME_RATE
-    base_tl = pl.DataFrame(
-        {
-            "frame": pl.int_range(
-                0, max_frame, interval_frames, eager=True, dtype=pl.Int64
-            )
-        }
+    base_tl = max_frame.select(
+        pl.int_range(0, pl.col("max_frame"), interval_frames, dtype=pl.Int64).alias("frame")
     )
-    last_tl = pl.DataFrame({"frame": [max_frame]})
+    last_tl = max_frame.select(pl.col("max_frame").alias("frame"))
     timeline_df = pl.concat([base_tl, last_tl]).unique(subset=["frame"]).sort("frame")
 
     # 9. Cross-join with teams
-    all_teams = army_value_log["team_id"].unique(maintain_order=True)
-    expanded_tl = timeline_df.join(
-        pl.DataFrame({"team_id": all_teams}), how="cross"
-    ).sort("frame")
+    all_teams = army_value_log.select(pl.col("team_id").unique(maintain_order=True))
+    expanded_tl = timeline_df.join(all_teams, how="cross").sort("frame")
 
     # 0) as-of join – still delivers Float64
     joined = expanded_tl.join_asof(
@@ -169,4 +153,11 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Calculates the total army value for each team at fixed time intervals.",
     default_enabled=True,
+    inputs={
+        "unit_events": ("frame",),
+        "unit_lifespans": ("unit_id", "unit_def_id", "unit_team_id", "finished_frame", "death_frame"),
+        "unit_defs": ("unit_name", "metalcost"),
+        "defs_map": ("unit_def_id", "unit_name"),
+    },
+    lazy=True,
 )
@@ -60,4 +60,5 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Calculates player APM and their focus on combat vs. economy per minute.",
     default_enabled=True,
+    inputs={"commands_log": ("frame", "teamId", "cmd_name")},
 )
\ No newline at end of file
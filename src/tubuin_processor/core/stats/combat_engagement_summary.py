@@ -132,6 +132,10 @@ def calculate(
 
 # --- Definitions for the registry ---
 # We use functools.partial to create specialized versions of our function.
+INPUTS = {
+    "damage_log": ("frame", "attacker_unit_id", "attacker_team_id", "victim_pos_x", "victim_pos_y", "damage"),
+}
+
 STAT_DEFINITION_DEFAULT = Stat(
     func=partial(
         calculate,
@@ -141,6 +145,7 @@ STAT_DEFINITION_DEFAULT = Stat(
     ),
     description="Clusters damage events to identify discrete combat engagements based on time and space.",
     default_enabled=True,
+    inputs=INPUTS,
 )
 
 STAT_DEFINITION_GLOBAL = Stat(
@@ -151,6 +156,7 @@ STAT_DEFINITION_GLOBAL = Stat(
         spatial_threshold=0,
     ),
     description="Identifies engagements based on global time gaps only (map-wide 'wartime').",
+    inputs=INPUTS,
 )
 
 STAT_DEFINITION_PER_UNIT = Stat(
@@ -161,4 +167,5 @@ STAT_DEFINITION_PER_UNIT = Stat(
         spatial_threshold=0,
     ),
     description="Identifies an individual unit's separate combat encounters.",
+    inputs=INPUTS,
 )
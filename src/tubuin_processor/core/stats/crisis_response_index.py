@@ -17,7 +17,7 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
     """
     damage_log_df = dataframes.get("damage_log")
     commands_log_df = dataframes.get("commands_log")
-    unit_events_df = dataframes.get("unit_events")
+    unit_lifespans_df = dataframes.get("unit_lifespans")
 
     # --- Section 1: Setup and Input Validation ---
 
@@ -47,10 +47,10 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
 
     if any(
         df is None or df.is_empty()
-        for df in [damage_log_df, commands_log_df, unit_events_df]
+        for df in [damage_log_df, commands_log_df, unit_lifespans_df]
     ):
         logger.warning(
-            "Stat 'crisis_response_index' requires damage_log, commands_log, and unit_events. One or more are missing or empty."
+            "Stat 'crisis_response_index' requires damage_log, commands_log, and unit_lifespans. One or more are missing or empty."
         )
         return pl.DataFrame(schema=FINAL_SCHEMA)
 
@@ -92,11 +92,9 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
 
     # Component C: Identify all destroyed units and their time of destruction
     destroyed_assets_ldf = (
-        unit_events_df.lazy()
-        .filter(pl.col("event_type") == "DESTROYED")
-        .select(["unit_id", "frame"])
-        .rename({"frame": "destruction_frame"})
-        .unique(subset=["unit_id"], keep="first")  # A unit can only be destroyed once
+        unit_lifespans_df.lazy()
+        .filter(pl.col("death_frame").is_not_null())
+        .select(["unit_id", pl.col("death_frame").alias("destruction_frame")])
     )
 
     # --- Section 3: Construct the Full Lazy Pipeline ---
@@ -152,4 +150,9 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="[Advanced] Measures player reaction time when core assets are attacked.",
     default_enabled=True,
+    inputs={
+        "damage_log": ("frame", "victim_unit_id", "victim_team_id"),
+        "commands_log": ("frame", "teamId", "cmd_name"),
+        "unit_lifespans": ("unit_id", "death_frame"),
+    },
 )
\ No newline at end of file
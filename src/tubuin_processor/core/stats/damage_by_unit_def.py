@@ -5,6 +5,7 @@ Calculates total damage dealt per unit definition ID.
 import polars as pl
 from typing import Dict
 
+from .merging import merge_sums
 from .types import Stat
 
 
@@ -29,4 +30,6 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Calculates total damage dealt per unit definition ID.",
     default_enabled=True,
+    inputs={"damage_log": ("attacker_def_id", "damage")},
+    merge=merge_sums(["unit_def_id"], sort_by="total_damage_dealt", descending=True),
 )
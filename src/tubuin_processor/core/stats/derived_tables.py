@@ -0,0 +1,144 @@
+# src\tubuin_processor\core\stats\derived_tables.py
+"""
+Defines the derived tables: canonical intermediates that several stats build
+from the same raw event logs, computed once per replay by the aggregator.
+
+A stat reads a derived table by naming it in its `inputs`, like an aspect. The
+aggregator then builds the table from its own declared inputs before any stat
+runs, and adds it to the stats' input dict under its name. Only the tables that
+the stats about to run declare are built.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+import logging
+import time
+
+import polars as pl
+
+from tubuin_processor.core.dataframe_creator import _pydantic_to_polars_schema
+from tubuin_processor.schemas.aspects import ASPECT_TO_CLEAN_SCHEMA_MAP
+from .types import StatInputs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DerivedTable:
+    """
+    A table built from aspects (and context frames) by a lazy `func`. `inputs`
+    declares what it reads, as in `Stat.inputs`; `schema` is the table's own
+    schema, also used when its inputs are missing.
+    """
+    func: Callable[[Dict[str, pl.LazyFrame]], pl.LazyFrame]
+    description: str
+    inputs: StatInputs = field(compare=False)
+    schema: Mapping[str, pl.DataType] = field(compare=False)
+
+
+def _first_frame_of(event_type: str) -> pl.Expr:
+    return pl.col("frame").filter(pl.col("event_type") == event_type).first()
+
+
+def _unit_lifespans(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
+    """One row per unit, with the frames it was created, finished and destroyed in (null if never)."""
+    is_built = pl.col("event_type").is_in(["FINISHED", "CREATED"])
+    # Units can change hands, so the unit's team is the one it was finished (or created) for.
+    owner_columns = [
+        pl.coalesce(
+            pl.col(column).filter(pl.col("event_type") == "FINISHED").first(),
+            pl.col(column).filter(is_built).first(),
+            pl.col(column).first(),
+        ).alias(column)
+        for column in ("unit_def_id", "unit_team_id")
+    ]
+    return (
+        dataframes["unit_events"]
+        .with_columns(pl.col("frame").cast(pl.Int64))
+        .sort("frame", maintain_order=True)
+        .group_by("unit_id")
+        .agg(
+            *owner_columns,
+            _first_frame_of("CREATED").alias("created_frame"),
+            _first_frame_of("FINISHED").alias("finished_frame"),
+            _first_frame_of("DESTROYED").alias("death_frame"),
+        )
+        .sort("unit_id")
+    )
+
+
+def _unit_positions_by_unit(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
+    """`unit_positions` sorted by unit, then frame, so each unit's track is contiguous and in order."""
+    return dataframes["unit_positions"].sort(["unit_id", "frame"], maintain_order=True)
+
+
+DERIVED_TABLES: Dict[str, DerivedTable] = {
+    "unit_lifespans": DerivedTable(
+        func=_unit_lifespans,
+        description="Each unit's team, unit def and creation, finish and death frames.",
+        inputs={"unit_events": ("frame", "unit_id", "unit_def_id", "unit_team_id", "event_type")},
+        schema={
+            "unit_id": pl.Int64,
+            "unit_def_id": pl.Int64,
+            "unit_team_id": pl.Int64,
+            "created_frame": pl.Int64,
+            "finished_frame": pl.Int64,
+            "death_frame": pl.Int64,
+        },
+    ),
+    "unit_positions_by_unit": DerivedTable(
+        func=_unit_positions_by_unit,
+        description="Unit positions sorted by unit_id, then frame.",
+        inputs={"unit_positions": None},
+        schema=_pydantic_to_polars_schema(ASPECT_TO_CLEAN_SCHEMA_MAP["unit_positions"]),
+    ),
+}
+
+
+def source_inputs(inputs: StatInputs) -> List[Tuple[str, Optional[Tuple[str, ...]]]]:
+    """Lists the declared `(frame, columns)` inputs with each derived table replaced by the inputs it is built from."""
+    sources: List[Tuple[str, Optional[Tuple[str, ...]]]] = []
+    for frame_name, columns in inputs.items():
+        if frame_name in DERIVED_TABLES:
+            sources.extend(DERIVED_TABLES[frame_name].inputs.items())
+        else:
+            sources.append((frame_name, columns))
+    return sources
+
+
+def derived_tables_for(declared_inputs: Iterable[Optional[StatInputs]]) -> List[str]:
+    """The derived tables named in any of the given inputs, in registry order."""
+    named = {frame_name for inputs in declared_inputs for frame_name in (inputs or {})}
+    return [name for name in DERIVED_TABLES if name in named]
+
+
+def build_derived_tables(
+    table_names: Iterable[str], dataframes_by_aspect: Dict[str, pl.DataFrame]
+) -> Dict[str, pl.DataFrame]:
+    """
+    Builds the given derived tables, collecting their plans together so that
+    shared inputs are scanned once. A table whose inputs are missing is empty.
+    Tables that fail to build are logged and left out.
+    """
+    start_time = time.perf_counter()
+    tables: Dict[str, pl.DataFrame] = {}
+    plans: Dict[str, pl.LazyFrame] = {}
+    for name in table_names:
+        table = DERIVED_TABLES[name]
+        if any(frame_name not in dataframes_by_aspect for frame_name in table.inputs):
+            tables[name] = pl.DataFrame(schema=dict(table.schema))
+            continue
+        plans[name] = table.func({frame_name: dataframes_by_aspect[frame_name].lazy() for frame_name in table.inputs})
+    if not plans:
+        return tables
+
+    try:
+        tables.update(zip(plans, pl.collect_all(plans.values())))
+    except Exception as e:
+        logger.warning(f"Building derived tables together failed ({e}). Building them separately.")
+        for name, plan in plans.items():
+            try:
+                tables[name] = plan.collect()
+            except Exception as e:
+                logger.error(f"Error building derived table '{name}': {e}", exc_info=e)
+    logger.info(f"Built derived tables {list(tables)} in {time.perf_counter() - start_time:.2f}s.")
+    return tables
@@ -4,13 +4,14 @@ Tracks the number of units of each type produced per player, per minute.
 import polars as pl
 from typing import Dict
 
+from .merging import merge_sums
 from .types import Stat
 
-def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+def calculate(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
     FRAME_RATE = 30.0
     df = dataframes.get("unit_events")
-    if df is None or df.is_empty():
-        return pl.DataFrame()
+    if df is None:
+        return pl.LazyFrame()
 
     # 1) Annotate minute and select the three key cols
     created = (
@@ -21,9 +22,6 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
         .select(["unit_team_id", "minute", "unit_def_id"])
     )
 
-    if created.is_empty():
-        return pl.DataFrame()
-
     # 2) Count per unit type. This `agg` DataFrame is now our source of truth.
     #    It only contains rows for (player, minute, unit_type) combinations that
     #    actually occurred.
@@ -47,9 +45,28 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
         .sort(["player_id", "minute"])
     )
 
+
+_merge_counts = merge_sums(["player_id", "minute", "unit_def_id"], sort_by=["player_id", "minute", "unit_def_id"])
+
+
+def merge(previous: pl.DataFrame, appended: pl.DataFrame) -> pl.DataFrame:
+    """Adds up the per-minute counts of both results, unit type by unit type."""
+    counts = [df.explode("unit_stats").unnest("unit_stats") for df in (previous, appended)]
+    return (
+        _merge_counts(*counts)
+        .select(["player_id", "minute", pl.struct(["unit_def_id", "units_produced"]).alias("unit_stat")])
+        .group_by(["player_id", "minute"])
+        .agg(pl.col("unit_stat").alias("unit_stats"))
+        .sort(["player_id", "minute"])
+    )
+
+
 # The STAT_DEFINITION variable is dynamically loaded by the aggregator.
 STAT_DEFINITION = Stat(
     func=calculate,
     description="Tracks the number of units of each type produced per player, per minute.",
     default_enabled=True,
+    inputs={"unit_events": ("frame", "event_type", "unit_team_id", "unit_def_id")},
+    lazy=True,
+    merge=merge,
 )
\ No newline at end of file
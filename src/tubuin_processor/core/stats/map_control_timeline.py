@@ -8,11 +8,11 @@ from typing import Dict
 from .types import Stat
 
 
-def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+def calculate(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
     """Tracks each player's map control (via bounding box) and unit dispersion per minute."""
     pos_df = dataframes.get("unit_positions")
-    if pos_df is None or pos_df.is_empty():
-        return pl.DataFrame(
+    if pos_df is None:
+        return pl.LazyFrame(
             schema={
                 "player_id": pl.Int64,
                 "minute": pl.Int32,
@@ -43,4 +43,6 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Tracks each player's map control (via bounding box) and unit dispersion per minute",
     default_enabled=True,
+    inputs={"unit_positions": ("frame", "team_id", "x", "y")},
+    lazy=True,
 )
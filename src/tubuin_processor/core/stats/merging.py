@@ -0,0 +1,30 @@
+# src\tubuin_processor\core\stats\merging.py
+"""
+Builds `Stat.merge` functions, which combine a stat's result over earlier rows
+with its result over rows appended since (see `core/incremental.py`).
+"""
+from typing import Callable, Sequence, Union
+
+import polars as pl
+
+MergeFunction = Callable[[pl.DataFrame, pl.DataFrame], pl.DataFrame]
+
+
+def merge_sums(keys: Sequence[str], sort_by: Union[str, Sequence[str]], descending: bool = False) -> MergeFunction:
+    """
+    Merges results that sum their value columns per `keys`, e.g. totals per
+    team or counts per minute bin: rows of the same group are added up.
+    Floating-point sums may differ from a full recomputation by rounding.
+    """
+    def merge(previous: pl.DataFrame, appended: pl.DataFrame) -> pl.DataFrame:
+        values = [name for name in previous.columns if name not in keys]
+        return (
+            pl.concat([previous, appended.select(previous.columns)])
+            .group_by(keys)
+            .agg(pl.col(values).sum())
+            .select(previous.columns)
+            .cast(dict(previous.schema))
+            .sort(sort_by, descending=descending)
+        )
+
+    return merge
@@ -8,10 +8,10 @@ from typing import Dict
 from .types import Stat
 
 
-def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+def calculate(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
     team_stats_df = dataframes.get("team_stats")
-    if team_stats_df is None or team_stats_df.is_empty():
-        return pl.DataFrame(
+    if team_stats_df is None:
+        return pl.LazyFrame(
             schema={"player_id": pl.Int64, "net_metal_contribution": pl.Float64}
         )
 
@@ -41,4 +41,6 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Summarizes each player's resource sharing, identifying net donors and receivers.",
     default_enabled=True,
+    inputs={"team_stats": ("team_id", "metal_sent", "metal_received", "energy_sent", "energy_received")},
+    lazy=True,
 )
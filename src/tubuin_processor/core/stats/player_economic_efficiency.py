@@ -6,11 +6,11 @@ from typing import Dict
 
 from .types import Stat
 
-def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+def calculate(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
     """Calculates end-of-game damage output per unit of resource spent for each player."""
     team_stats_df = dataframes.get("team_stats")
-    if team_stats_df is None or team_stats_df.is_empty():
-        return pl.DataFrame(schema={'player_id': pl.Int64, 'damage_per_resource_unit': pl.Float64})
+    if team_stats_df is None:
+        return pl.LazyFrame(schema={'player_id': pl.Int64, 'damage_per_resource_unit': pl.Float64})
 
     end_of_game_stats = team_stats_df.group_by("team_id").agg(
         pl.max("metal_used").alias("total_metal_spent"),
@@ -32,5 +32,7 @@ def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
 STAT_DEFINITION = Stat(
     func=calculate,
     description="Calculates end-of-game damage output per unit of resource spent for each player.",
-    default_enabled=True
+    default_enabled=True,
+    inputs={"team_stats": ("team_id", "metal_used", "energy_used", "damage_dealt")},
+    lazy=True,
 )
\ No newline at end of file
@@ -4,13 +4,14 @@ Calculates total metal/energy production and usage per team (single player).
 import polars as pl
 from typing import Dict
 
+from .merging import merge_sums
 from .types import Stat
 
-def calculate(dataframes: Dict[str, pl.DataFrame]) -> pl.DataFrame:
+def calculate(dataframes: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
     """Calculates total metal/energy production and usage per player."""
     team_stats_df = dataframes.get("team_stats")
-    if team_stats_df is None or team_stats_df.is_empty():
-        return pl.DataFrame(
+    if team_stats_df is None:
+        return pl.LazyFrame(
             schema={"team_id": pl.Int64, "total_metal_produced": pl.Float64}
         )
     return (
@@ -30,4 +31,7 @@ STAT_DEFINITION = Stat(
     func=calculate,
     description="Calculates total metal/energy production and usage per team (single player).",
     default_enabled=True,
+    inputs={"team_stats": ("team_id", "metal_produced", "metal_used", "energy_produced", "energy_used")},
+    lazy=True,
+    merge=merge_sums(["team_id"], sort_by="team_id"),
 )
\ No newline at end of file
@@ -3,16 +3,40 @@
 This module defines shared types and data structures used across the stats package,
 preventing circular dependencies.
 """
-from dataclasses import dataclass
-from typing import Dict, Callable
+from dataclasses import dataclass, field
+from typing import Dict, Callable, Mapping, Optional, Tuple, Union
 import polars as pl
 
+# Maps each DataFrame a stat or stream reads (an aspect such as 'team_stats', a
+# context frame such as 'unit_defs', or a derived table such as 'unit_lifespans')
+# to the columns it reads, or None for all columns.
+StatInputs = Mapping[str, Optional[Tuple[str, ...]]]
+
 @dataclass(frozen=True)
 class Stat:
     """
     Defines a computable statistic, including its implementation, description,
     and default execution status.
+
+    `inputs` declares the DataFrames and columns the stat reads, so that only
+    those aspects are decoded. `None` means undeclared: every aspect is decoded.
+
+    `depends_on` names other stats whose results this stat reads. It runs after
+    them and finds each result in its input dict under the stat's name.
+
+    A `lazy` stat receives `pl.LazyFrame`s and returns a `pl.LazyFrame` plan.
+    The aggregator collects it, either alone or, in lazy mode, together with
+    every other lazy stat so that their shared scans and filters run once.
+
+    `merge` makes a stat incremental: given its result over earlier rows and
+    its result over rows appended since, it returns the result over all of
+    them (e.g. by re-summing per-minute bins). Only stats whose inputs are
+    aspects (and context frames) and that have no `depends_on` can merge.
     """
-    func: Callable[[Dict[str, pl.DataFrame]], pl.DataFrame]
+    func: Callable[[Dict[str, pl.DataFrame]], Union[pl.DataFrame, pl.LazyFrame]]
     description: str
-    default_enabled: bool = False
\ No newline at end of file
+    default_enabled: bool = False
+    inputs: Optional[StatInputs] = field(default=None, compare=False)
+    depends_on: Tuple[str, ...] = ()
+    lazy: bool = False
+    merge: Optional[Callable[[pl.DataFrame, pl.DataFrame], pl.DataFrame]] = field(default=None, compare=False)
@@ -291,5 +291,8 @@ def _calculate_accumulated_unit_economic_contribution_with_lifetime(dataframes:
 STAT_DEFINITION = Stat(
     func=_calculate_accumulated_unit_economic_contribution_with_lifetime,
     description="Calculates total net metal/energy contribution and total lifetime for each unit type per player.",
-    default_enabled=False
+    default_enabled=False,
+    inputs={
+        "unit_economy": ("frame", "unit_id", "unit_def_id", "team_id", "metal_make", "metal_use", "energy_make", "energy_use"),
+    },
 )
\ No newline at end of file
@@ -274,4 +274,8 @@ STAT_DEFINITION = Stat(
         "unit-seconds of lifetime (5-second bins)."
     ),
     default_enabled=True,
+    inputs={
+        "unit_economy": ("frame", "unit_id", "unit_def_id", "team_id", "metal_make", "metal_use", "energy_make", "energy_use"),
+        "unit_events": ("frame", "event_type", "unit_id", "unit_def_id", "unit_team_id"),
+    },
 )
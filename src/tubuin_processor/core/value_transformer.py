@@ -1,51 +1,61 @@
 """Step 4: Data Value Transformation (Dequantization & Enum Mapping)"""
-from typing import Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple, get_args
 import logging
+import polars as pl
 from pydantic import ValidationError, BaseModel  # Import BaseModel directly
 
 from tubuin_processor.schemas.aspects_raw import BaseAspectDataPointRaw
 from tubuin_processor.schemas.aspects import ASPECT_TO_CLEAN_SCHEMA_MAP # No longer imports BaseAspectDataPoint
-from tubuin_processor.config.dynamic_config_builder import DEQUANTIZATION_CONFIG, ASPECT_ENUM_MAPPINGS
-from tubuin_processor.core.exceptions import TransformationError
+from tubuin_processor.config.dynamic_config_builder import TRANSFORM_PLANS, TransformPlan
+from tubuin_processor.core.exceptions import ParserError, TransformationError
+from tubuin_processor.core.dataframe_creator import _pydantic_to_polars_schema
 
 logger = logging.getLogger(__name__)
 
 def stream_transform_aspect(
     aspect_name: str, 
     raw_model_stream: Iterator[BaseAspectDataPointRaw], 
-    skip_on_error: bool = False
+    skip_on_error: bool = False,
+    row_offset: int = 0,
 ) -> Iterator[BaseModel]:  # <--- CORRECTED RETURN TYPE
-    """Applies transformations to a stream of raw Pydantic models."""
+    """
+    Applies transformations to a stream of raw Pydantic models. `row_offset`
+    is only used to report absolute row numbers in messages.
+    """
     clean_schema_type = ASPECT_TO_CLEAN_SCHEMA_MAP.get(aspect_name)
     if not clean_schema_type:
         logger.warning(f"No clean schema mapping for '{aspect_name}'. Skipping.")
         return
     
-    dequant_rules = DEQUANTIZATION_CONFIG.get(aspect_name, {})
-    enum_rules = ASPECT_ENUM_MAPPINGS.get(aspect_name, {})
+    plan = TRANSFORM_PLANS.get(aspect_name) or TransformPlan(aspect_name)
     
-    for i, raw_model in enumerate(raw_model_stream):
+    for i, raw_model in enumerate(raw_model_stream, start=row_offset):
         transformed_dict = {}
         try:
             transformed_dict = raw_model.model_dump()
             
-            if divisor := dequant_rules.get("divisor"):
-                for field in dequant_rules.get("fields", []):
-                    if field in transformed_dict and transformed_dict[field] is not None:
-                        transformed_dict[field] /= divisor
+            for field, divisor in plan.scales.items():
+                if transformed_dict.get(field) is not None:
+                    transformed_dict[field] /= divisor
             
-            for raw_field, (clean_field, enum_class) in enum_rules.items():
+            for raw_field, (clean_field, enum_class) in plan.enums.items():
                 if raw_field in transformed_dict:
                     raw_val = transformed_dict.pop(raw_field) if raw_field != clean_field else transformed_dict[raw_field]
                     if raw_val is not None:
                         try:
+                            if raw_field in plan.enum_values and raw_val not in plan.enum_values[raw_field]:
+                                raise ValueError(f"{raw_val!r} is not a declared value of {raw_field}")
                             transformed_dict[clean_field] = enum_class(raw_val)  # Enum class is instantiated directly from the raw integer value.
                         except ValueError:
+                            if raw_field not in plan.lenient_enums:
+                                raise
                             logger.warning(f"Invalid enum value '{raw_val}' for {raw_field} in {aspect_name} (row {i}). Setting to None.")
                             transformed_dict[clean_field] = None
             
             yield clean_schema_type.model_validate(transformed_dict)
-        except (ValidationError, TypeError) as e:
+        except (ValidationError, ValueError, TypeError) as e:
             error_message = (
                 f"Transformation/validation failed for aspect '{aspect_name}' (row {i}).\n"
                 f"  - Original Raw Data: {raw_model.model_dump_json()}\n"
@@ -57,4 +67,126 @@ def stream_transform_aspect(
                 logger.warning(f"{error_message}\n  --> Skipping row as per configuration.")
                 continue
             else:
-                raise TransformationError(error_message) from e
\ No newline at end of file
+                raise TransformationError(error_message) from e
+
+# --- Frame-level transformation (columnar engine) ---
+
+@dataclass(frozen=True)
+class _CompiledFrameTransform:
+    """A single per-aspect `select` performing Steps 4 and 5 on a raw DataFrame."""
+    expressions: Tuple[pl.Expr, ...]
+    invalid_flags: Tuple[pl.Expr, ...]  # One boolean column per enum field, named `_INVALID_PREFIX + clean_field`
+    enum_fields: Tuple[Tuple[str, str], ...]  # (raw_field, clean_field)
+    failing_enum_fields: Tuple[str, ...]  # Clean enum fields where an invalid value fails the row
+    columns: Tuple[str, ...]  # Clean fields produced, in schema order
+    raw_fields: Tuple[str, ...]  # Raw fields read
+
+
+_INVALID_PREFIX = "__invalid__"
+
+
+@lru_cache(maxsize=None)
+def _compile_frame_transform(
+    aspect_name: str, columns: Optional[Tuple[str, ...]] = None
+) -> Optional[_CompiledFrameTransform]:
+    """
+    Compiles an aspect's `TransformPlan` into Polars expressions. Each
+    dequantized field is divided by its own scale; enum values outside the
+    enum (or its declared `enum` values) map to null and, as on the row path,
+    fail the row unless the field is a lenient, optional one. `columns`
+    restricts the transform to a projection of the clean fields.
+    """
+    clean_schema_type = ASPECT_TO_CLEAN_SCHEMA_MAP.get(aspect_name)
+    plan = TRANSFORM_PLANS.get(aspect_name)
+    if not clean_schema_type or plan is None:
+        return None
+
+    polars_schema = _pydantic_to_polars_schema(clean_schema_type)
+    clean_to_raw = {clean_field: raw_field for raw_field, (clean_field, _) in plan.enums.items()}
+
+    expressions, invalid_flags, enum_fields, failing_enum_fields = [], [], [], []
+    clean_fields, raw_fields = [], []
+    for clean_field, field_info in clean_schema_type.model_fields.items():
+        if clean_field not in polars_schema or (columns is not None and clean_field not in columns):
+            continue
+        raw_field = clean_to_raw.get(clean_field, clean_field)
+        clean_fields.append(clean_field)
+        raw_fields.append(raw_field)
+
+        if raw_field in plan.enums:
+            enum_class = plan.enums[raw_field][1]
+            valid_values = plan.enum_values.get(raw_field)
+            mapping = {
+                member.value: member.name for member in enum_class
+                if valid_values is None or member.value in valid_values
+            }
+            expression = pl.col(raw_field).replace_strict(mapping, default=None, return_dtype=pl.Utf8)
+            invalid_flags.append(
+                (pl.col(raw_field).is_not_null() & expression.is_null()).alias(_INVALID_PREFIX + clean_field)
+            )
+            enum_fields.append((raw_field, clean_field))
+            if raw_field not in plan.lenient_enums or type(None) not in get_args(field_info.annotation):
+                failing_enum_fields.append(clean_field)
+        elif raw_field in plan.scales:
+            # Division (not multiplication by 1/scale) keeps results bit-identical to the row path.
+            expression = pl.col(raw_field).cast(pl.Float64) / plan.scales[raw_field]
+        else:
+            expression = pl.col(raw_field)
+        expressions.append(expression.cast(polars_schema[clean_field]).alias(clean_field))
+
+    return _CompiledFrameTransform(
+        tuple(expressions), tuple(invalid_flags), tuple(enum_fields), tuple(failing_enum_fields),
+        tuple(clean_fields), tuple(raw_fields),
+    )
+
+
+def transform_aspect_frame(
+    aspect_name: str,
+    raw_df: pl.DataFrame,
+    skip_on_error: bool = False,
+    row_offset: int = 0,
+    columns: Optional[Tuple[str, ...]] = None,
+) -> pl.DataFrame:
+    """
+    Applies Steps 4 and 5 to a whole raw DataFrame in a single `select`:
+    dequantized fields are divided column-wise and enum fields are mapped to
+    categorical member names. Rows with an invalid enum value raise a
+    `TransformationError`, or are dropped when `skip_on_error` is set, matching
+    `stream_transform_aspect`. Only in optional `enum_map` fields do invalid
+    values become null instead, reported once per column.
+    `row_offset` is only used to report absolute row numbers in messages.
+    With a `columns` projection, `raw_df` only needs the raw fields of those
+    columns, and only they are transformed and checked.
+    """
+    compiled = _compile_frame_transform(aspect_name, columns)
+    if compiled is None:
+        raise ParserError(f"Cannot transform DataFrame: No clean Pydantic schema for '{aspect_name}'.")
+
+    clean_df = raw_df.select(*compiled.expressions, *compiled.invalid_flags)
+    if not compiled.invalid_flags:
+        return clean_df
+
+    flag_columns = [_INVALID_PREFIX + clean_field for _, clean_field in compiled.enum_fields]
+    invalid_counts = clean_df.select(pl.col(flag_columns).sum()).row(0, named=True)
+    for raw_field, clean_field in compiled.enum_fields:
+        if clean_field in compiled.failing_enum_fields:
+            continue
+        if count := invalid_counts[_INVALID_PREFIX + clean_field]:
+            first_row = clean_df[_INVALID_PREFIX + clean_field].arg_max()
+            logger.warning(
+                f"{count} invalid enum value(s) for {raw_field} in {aspect_name} "
+                f"(first at row {first_row + row_offset}: '{raw_df[raw_field][first_row]}'). Setting to None."
+            )
+
+    failing_flags = [_INVALID_PREFIX + f for f in compiled.failing_enum_fields if invalid_counts[_INVALID_PREFIX + f]]
+    if failing_flags:
+        is_invalid_row = pl.any_horizontal(failing_flags)
+        if not skip_on_error:
+            first_row = clean_df.select(is_invalid_row.arg_max()).item()
+            raise TransformationError(
+                f"Transformation/validation failed for aspect '{aspect_name}' (row {first_row + row_offset}): "
+                f"enum field(s) {[f.removeprefix(_INVALID_PREFIX) for f in failing_flags]} have invalid values."
+            )
+        clean_df = clean_df.filter(~is_invalid_row)
+        logger.warning(f"Skipping {raw_df.height - clean_df.height} row(s) of '{aspect_name}' with invalid enum values.")
+    return clean_df.drop(flag_columns)
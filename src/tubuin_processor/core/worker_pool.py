@@ -0,0 +1,173 @@
+"""
+Worker processes for Steps 2-5 and the long-lived pool that runs them.
+
+Spawned workers must import Polars, Pydantic and every schema module before
+they can decode anything, and each aspect's column specs and frame transform
+are compiled on first use. `WorkerPool` pays that cost once per worker: its
+initializer imports and compiles everything up front, and the pool can be
+reused across many replays (e.g. by `tube batch`). `max_tasks_per_child`
+recycles workers periodically to return memory fragmented by large aspects.
+
+Recycling is done by retiring the whole executor after `workers *
+max_tasks_per_child` tasks rather than through `ProcessPoolExecutor`'s own
+`max_tasks_per_child`, which can deadlock when replacing exited workers
+(CPython gh-115634). Tasks already submitted to a retired executor still run
+to completion.
+
+The worker functions live here rather than in `main.py` so that spawned
+workers do not import the CLI, the aggregator or the stats registry.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+import logging
+import multiprocessing
+import threading
+
+import polars as pl
+
+from tubuin_processor.core.columnar_decoder import (
+    BatchOptions,
+    IpcFrame,
+    decode_aspect_in_batches,
+    decode_aspect_to_frame,
+    _get_column_specs,
+)
+from tubuin_processor.core.dataframe_creator import create_polars_dataframe_for_aspect
+from tubuin_processor.core.decoder import DecodeEngine, stream_decode_aspect
+from tubuin_processor.core.ingestion import AspectSource, open_aspect_source
+from tubuin_processor.core.sharding import AspectShard, default_worker_count
+from tubuin_processor.core.value_transformer import stream_transform_aspect, _compile_frame_transform
+from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP
+
+logger = logging.getLogger(__name__)
+
+
+# --- Worker functions ---
+
+def decode_aspect_rows(aspect_name: str, source: AspectSource, skip_on_error: bool, row_offset: int = 0) -> pl.DataFrame:
+    """Row engine: Decodes, transforms and builds the DataFrame of a single aspect (or shard)."""
+    with open_aspect_source(source) as raw_data:
+        raw_stream = stream_decode_aspect(aspect_name, raw_data, skip_on_error, row_offset)
+        transformed_stream = stream_transform_aspect(aspect_name, raw_stream, skip_on_error, row_offset)
+        return create_polars_dataframe_for_aspect(aspect_name, list(transformed_stream))
+
+
+def decode_aspect_columnar(
+    aspect_name: str,
+    source: AspectSource,
+    skip_on_error: bool,
+    batch_options: Optional[BatchOptions] = None,
+    row_offset: int = 0,
+    columns: Optional[Tuple[str, ...]] = None,
+):
+    """Columnar engine: Decodes an aspect (or a `columns` projection of it) straight into a DataFrame."""
+    with open_aspect_source(source) as raw_data:
+        if batch_options is None:
+            return decode_aspect_to_frame(aspect_name, raw_data, skip_on_error, row_offset, columns)
+        # Spilled aspects come back as a file reference instead of a pickled DataFrame.
+        return decode_aspect_in_batches(aspect_name, raw_data, batch_options, skip_on_error, row_offset, columns)
+
+
+def decode_shard(
+    shard: AspectShard,
+    skip_on_error: bool,
+    engine: DecodeEngine,
+    batch_options: Optional[BatchOptions],
+    columns: Optional[Tuple[str, ...]] = None,
+):
+    """
+    Decodes one shard into a clean DataFrame (or a SpilledFrame) with either
+    engine. Only the columnar engine applies the `columns` projection.
+    """
+    if engine == DecodeEngine.COLUMNAR:
+        result = decode_aspect_columnar(shard.aspect_name, shard.source, skip_on_error, batch_options, shard.row_offset, columns)
+    else:
+        result = decode_aspect_rows(shard.aspect_name, shard.source, skip_on_error, shard.row_offset)
+    return shard.aspect_name, shard.index, result
+
+
+def decode_shard_in_worker(
+    shard: AspectShard,
+    skip_on_error: bool,
+    engine: DecodeEngine,
+    batch_options: Optional[BatchOptions],
+    columns: Optional[Tuple[str, ...]] = None,
+):
+    """Worker entry point for one shard: Returns its DataFrame as Arrow IPC bytes instead of pickled objects."""
+    name, index, result = decode_shard(shard, skip_on_error, engine, batch_options, columns)
+    if isinstance(result, pl.DataFrame):
+        result = IpcFrame.from_frame(name, result)
+    return name, index, result
+
+
+# --- Pool ---
+
+def _warm_worker() -> None:
+    """Pool initializer: compiles every aspect's column specs and frame transform once per worker."""
+    for aspect_name in ASPECT_TO_RAW_SCHEMA_MAP:
+        _get_column_specs(aspect_name)
+        _compile_frame_transform(aspect_name)
+
+
+def _ping() -> int:
+    return multiprocessing.current_process().pid
+
+
+class WorkerPool:
+    """
+    A reusable pool of warm, spawned worker processes.
+
+    Worker processes are only started on the first `submit` (or by `start`), so
+    runs that decode everything in the parent never pay for them. `submit` is
+    thread-safe, so concurrently processed replays can share one pool. Use as a
+    context manager, or call `shutdown` when done.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_tasks_per_child: Optional[int] = None):
+        self.workers = workers or default_worker_count()
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks_submitted = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Polars' thread pool is not fork-safe, so workers that build DataFrames are spawned.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+            self._tasks_submitted = 0
+            logger.debug(f"Started worker pool with {self.workers} workers (max tasks per child: {self.max_tasks_per_child}).")
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            future = self.executor.submit(fn, *args)
+            self._tasks_submitted += 1
+            if self.max_tasks_per_child is not None and self._tasks_submitted >= self.workers * self.max_tasks_per_child:
+                logger.debug("Recycling worker pool.")
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            return future
+
+    def start(self) -> "WorkerPool":
+        """Starts and warms every worker now instead of on the first task."""
+        futures = [self.submit(_ping) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+        return self
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
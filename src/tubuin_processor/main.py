@@ -1,8 +1,14 @@
 import logging
 from pathlib import Path
 import time
-from typing import List, Dict, Optional, Tuple
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from collections import defaultdict
+import os
+import signal
+import tempfile
+import threading
 
 import typer
 import polars as pl
@@ -10,17 +16,49 @@ from rich.progress import Progress
 from enum import Enum
 
 # Import from our package
-from tubuin_processor.context import build_execution_context
+from tubuin_processor.batch import (
+    SUMMARY_FILENAME,
+    ReplayResult,
+    ReplayStatus,
+    assign_replay_ids,
+    discover_replay_dirs,
+    file_signature,
+    input_signature,
+    is_up_to_date,
+    load_summary,
+    now_iso,
+    settings_signature,
+    write_summary,
+)
+from tubuin_processor.context import build_execution_context, load_unit_defs_frame
 from tubuin_processor.core import output_transformer
 from tubuin_processor.core import output_generator
-from tubuin_processor.core.stats import UNAGGREGATED_STREAM_REGISTRY
+from tubuin_processor.core.stats import UNAGGREGATED_STREAM_REGISTRY, default_stat_names, required_inputs, with_dependencies
 from tubuin_processor.logging_config import setup_logging
-from tubuin_processor.core.ingestion import ingest_defs_csv, ingest_game_meta, load_mpk_files, list_recognized_aspects, load_unit_definitions
-from tubuin_processor.core.decoder import stream_decode_aspect
-from tubuin_processor.core.cache_manager import save_to_cache, load_from_cache
-from tubuin_processor.core.value_transformer import stream_transform_aspect
-from tubuin_processor.core.dataframe_creator import create_polars_dataframe_for_aspect
+from tubuin_processor.server import ReplayServer, ReplayWatcher, start_listeners
+from tubuin_processor.core.ingestion import ingest_defs_csv, ingest_game_meta, load_mpk_files, index_mpk_files, list_recognized_aspects, load_unit_definitions, AspectSource
+from tubuin_processor.core.decoder import DecodeEngine
+from tubuin_processor.core.columnar_decoder import concat_aspect_frames, resolve_projection, BatchOptions, IpcFrame, SpilledFrame, DEFAULT_BATCH_ROWS
+from tubuin_processor.core.sharding import AspectShard, plan_shards, INLINE_TASK_BYTES
+from tubuin_processor.core.stat_scheduler import DEFAULT_MAX_CONCURRENT_STATS, StatScheduler
+from tubuin_processor.core.worker_pool import WorkerPool, decode_shard, decode_shard_in_worker, decode_aspect_columnar, decode_aspect_rows
+from tubuin_processor.core.cache_manager import (
+    CacheKey,
+    CachePolicy,
+    StatResultCache,
+    _module_source_digest,
+    aspect_fingerprint,
+    find_legacy_cache_files,
+    frame_fingerprint,
+    inspect_cache,
+    load_cached_aspects,
+    prune_cache,
+    save_aspects_to_cache,
+    stat_fingerprint,
+    verify_cache,
+)
 from tubuin_processor.core.aggregator import perform_aggregations, STATS_REGISTRY
+from tubuin_processor.core.incremental import IncrementalReplay, IncrementalStatResults
 from tubuin_processor.core.output_generator import generate_output
 from tubuin_processor.core.output_strategies import (
     OutputStrategy,
@@ -28,8 +66,8 @@ from tubuin_processor.core.output_strategies import (
     STRATEGY_MAP
 )
 from tubuin_processor.schemas.unit_defs_schema import UnitDefsFile, UnitDef
-from tubuin_processor.schemas.aspects_raw import BaseAspectDataPointRaw
-from tubuin_processor.core.exceptions import ParserError, CacheValidationError
+from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP, BaseAspectDataPointRaw
+from tubuin_processor.core.exceptions import ParserError, CacheValidationError, CacheWriteError
 from tubuin_processor.utils.config_validator import validate_configurations
 
 
@@ -81,165 +119,163 @@ for name, stat in STATS_REGISTRY.items():
 
 
 # --- PARALLEL EXECUTION LOGIC ---
-def _parallel_decode_and_transform(aspect_name: str, raw_bytes: bytes, skip_on_error: bool):
-    """Worker function for parallel processing: Decodes and transforms a single aspect."""
-    raw_stream = stream_decode_aspect(aspect_name, raw_bytes, skip_on_error)
-    transformed_stream = stream_transform_aspect(aspect_name, raw_stream, skip_on_error)
-    return aspect_name, list(transformed_stream)
+def _as_dataframe(result):
+    """Loads a shipped or spilled aspect (the latter memory-mapped); passes DataFrames and None through."""
+    return result.load() if isinstance(result, (IpcFrame, SpilledFrame)) else result
 
 def _run_parallel_pipeline(
-    raw_mpk_data: Dict[str, bytes],
-    skip_on_error: bool
+    raw_mpk_data: Dict[str, AspectSource],
+    skip_on_error: bool,
+    engine: DecodeEngine = DecodeEngine.ROW,
+    batch_options: Optional[BatchOptions] = None,
+    pool: Optional[WorkerPool] = None,
+    show_progress: bool = True,
+    projections: Optional[Dict[str, Tuple[str, ...]]] = None
 ) -> Dict[str, pl.DataFrame]:
-    """Runs Steps 2-5 of the pipeline in parallel, sacrificing caching for performance."""
-    logger.warning("Running in parallel mode. Caching of intermediate raw data is disabled.")
-    
-    # Heuristic: only parallelize files over a certain size
-    SERIAL_PROCESSING_THRESHOLD_BYTES = 10 * 1024 # 10 KB
-    aspects_to_parallelize = {k: v for k, v in raw_mpk_data.items() if len(v) > SERIAL_PROCESSING_THRESHOLD_BYTES}
-    aspects_to_run_serially = {k: v for k, v in raw_mpk_data.items() if len(v) <= SERIAL_PROCESSING_THRESHOLD_BYTES}
-    
-    dataframes: Dict[str, pl.DataFrame] = {}
+    """
+    Runs Steps 2-5 of the pipeline in parallel. Pass a `pool` to reuse warm
+    workers across replays; otherwise a pool is created for this run only.
+    `projections` limits the columnar engine to the given columns per aspect.
+    """
+    if pool is None:
+        with WorkerPool() as own_pool:
+            return _run_parallel_pipeline(raw_mpk_data, skip_on_error, engine, batch_options, own_pool, show_progress, projections)
+
+    projections = projections or {}
+    # Split large aspects at row boundaries so no single aspect becomes the critical path.
+    workers = pool.workers
+    shard_plan = plan_shards(raw_mpk_data, workers)
+    shards_to_run_inline: List[AspectShard] = []
+    shards_to_parallelize: List[AspectShard] = []
+    for shards in shard_plan.values():
+        # A single worker cannot overlap with the parent, so it skips the process pool entirely.
+        run_inline = workers <= 1 or (len(shards) == 1 and len(shards[0]) <= INLINE_TASK_BYTES)
+        (shards_to_run_inline if run_inline else shards_to_parallelize).extend(shards)
+
+    results_by_aspect: Dict[str, Dict[int, Any]] = defaultdict(dict)
 
     # Run small aspects serially to avoid process overhead
-    if aspects_to_run_serially:
-        logger.info(f"Processing {len(aspects_to_run_serially)} small aspects serially...")
-        for name, data in aspects_to_run_serially.items():
-            _, transformed_models = _parallel_decode_and_transform(name, data, skip_on_error)
-            dataframes[name] = create_polars_dataframe_for_aspect(name, transformed_models)
-
-    # Run large aspects in parallel
-    if aspects_to_parallelize:
-        logger.info(f"Processing {len(aspects_to_parallelize)} large aspects in parallel...")
-        with Progress() as progress:
-            task = progress.add_task("[cyan]Decoding & Transforming...", total=len(aspects_to_parallelize))
-            with ProcessPoolExecutor() as executor:
-                # Submit decode & transform tasks first
-                tf_futures = {executor.submit(_parallel_decode_and_transform, name, data, skip_on_error): name for name, data in aspects_to_parallelize.items()}
-                transformed_data = {}
-                for future in as_completed(tf_futures):
-                    name, models = future.result()
-                    transformed_data[name] = models
-                    progress.update(task, advance=1)
-
-            # Now create DataFrames (can also be parallelized if CPU intensive)
-            task_df = progress.add_task("[green]Creating DataFrames...", total=len(transformed_data))
-            for name, models in transformed_data.items():
-                dataframes[name] = create_polars_dataframe_for_aspect(name, models)
-                progress.update(task_df, advance=1)
-                
+    if shards_to_run_inline:
+        logger.info(f"Processing {len(shards_to_run_inline)} aspects serially...")
+        for shard in shards_to_run_inline:
+            name, index, result = decode_shard(shard, skip_on_error, engine, batch_options, projections.get(shard.aspect_name))
+            results_by_aspect[name][index] = result
+
+    # Run shards of large aspects in parallel; workers build the DataFrames themselves.
+    if shards_to_parallelize:
+        logger.info(f"Processing {len(shards_to_parallelize)} shards of {len({s.aspect_name for s in shards_to_parallelize})} large aspects in parallel on {workers} workers...")
+        with Progress(disable=not show_progress) as progress:
+            task = progress.add_task("[cyan]Decoding & Transforming...", total=len(shards_to_parallelize))
+            futures = [
+                pool.submit(decode_shard_in_worker, shard, skip_on_error, engine, batch_options, projections.get(shard.aspect_name))
+                for shard in shards_to_parallelize
+            ]
+            for future in as_completed(futures):
+                name, index, result = future.result()
+                results_by_aspect[name][index] = result
+                progress.update(task, advance=1)
+
+    # Stitch shards back together in order
+    dataframes: Dict[str, pl.DataFrame] = {}
+    for name, results in results_by_aspect.items():
+        frames = [df for df in (_as_dataframe(results[index]) for index in sorted(results)) if df is not None]
+        if frames:
+            dataframes[name] = concat_aspect_frames(frames)
+
     return dataframes
 
 
 # --- SERIAL EXECUTION LOGIC ---
 def _run_serial_pipeline(
-    raw_mpk_data: Dict[str, bytes],
-    cache_dir: str,
-    replay_id: str,
-    use_cache: bool,
-    force_reprocess: bool,
-    skip_on_error: bool
+    raw_mpk_data: Dict[str, AspectSource],
+    skip_on_error: bool,
+    engine: DecodeEngine = DecodeEngine.ROW,
+    batch_options: Optional[BatchOptions] = None,
+    projections: Optional[Dict[str, Tuple[str, ...]]] = None
 ) -> Dict[str, pl.DataFrame]:
-    """Runs Steps 2-5 of the pipeline sequentially, enabling caching."""
-    logger.info("Running in serial mode. Caching is enabled.")
-
-    # Step 2 & 3: Try loading from cache first
-    raw_data_by_aspect = None
-    if use_cache and not force_reprocess:
-        try:
-            raw_data_by_aspect = load_from_cache(cache_dir, replay_id)
-        except (CacheValidationError, ParserError) as e:
-            logger.warning(f"Could not use cache: {e}. Reprocessing from raw files.")
-
-    if raw_data_by_aspect is None:
-        # If cache miss or force reprocess, perform decoding (Step 2)
-        logger.info("Performing serial decoding for all aspects...")
-        raw_data_by_aspect = {
-            name: list(stream_decode_aspect(name, data, skip_on_error))
-            for name, data in raw_mpk_data.items()
-        }
-        # And save to cache (Step 3)
-        if use_cache:
-            save_to_cache(raw_data_by_aspect, cache_dir, replay_id)
-
-    # Step 4: Transformation
-    logger.info("Performing serial value transformation...")
-    transformed_data = {
-        name: list(stream_transform_aspect(name, iter(models), skip_on_error))
-        for name, models in raw_data_by_aspect.items()
-    }
-    
-    # Step 5: DataFrame Creation
-    logger.info("Performing serial DataFrame creation...")
-    dataframes = {
-        name: create_polars_dataframe_for_aspect(name, models)
-        for name, models in transformed_data.items()
-    }
-
+    """Runs Steps 2-5 of the pipeline sequentially in this process."""
+    logger.info(f"Running in serial mode with the {engine.value} engine.")
+    projections = projections or {}
+    dataframes = {}
+    for name, source in raw_mpk_data.items():
+        if engine == DecodeEngine.COLUMNAR:
+            result = decode_aspect_columnar(name, source, skip_on_error, batch_options, columns=projections.get(name))
+        else:
+            result = decode_aspect_rows(name, source, skip_on_error)
+        if (df := _as_dataframe(result)) is not None:
+            dataframes[name] = df
     return dataframes
 
 
-@app.command()
-def run(
-    replay_id: str = typer.Argument(..., help="A unique identifier for the replay."),
-    input_dirs: List[str] = typer.Option(..., "--input-dir", "-i", help="Input directory. Can be used multiple times."),
-    cache_dir: str = typer.Option(..., "--cache-dir", "-c", help="Directory for intermediate cached data."),
-    output_dir: str = typer.Option(..., "--output-dir", "-o", help="Directory for the final compressed output."),
-    output_format: OutputFormat = typer.Option(OutputFormat.MPK_GZIP, "--output-format", "-f", help="The format for the final output.", case_sensitive=False),
-    stats_to_run: Optional[List[str]] = typer.Option(
-        [], "--stat", "-s",
-        help="Stat to compute and output. Can be used multiple times. If none are provided, default stats are computed.",
-        callback=_validate_stats_callback,
-        show_default=False
-    ),
-    unaggregated_streams_to_run: Optional[List[str]] = typer.Option(
-        [], "--stream", "-u",
-        help="Unaggregated stream to output (e.g., 'unit_positions'). Can be used multiple times. If none, only 'command_log' is output by default.",
-        callback=_validate_streams_callback,
-        show_default=False
-    ),
-    serial: bool = typer.Option(
-        False, 
-        "--serial", 
-        help="Run in single-threaded mode. Disables parallelism but enables caching and simplifies debugging."
-    ),
-    no_cache: bool = typer.Option(False, help="Disable using the cache (only effective in serial mode)."),
-    force_reprocess: bool = typer.Option(False, help="Force reprocessing, ignoring existing cache (only effective in serial mode)."),
-    skip_on_error: bool = typer.Option(False, help="Skip individual records that fail validation instead of halting."),
-    run_demo_aggregation: bool = typer.Option(False, help="Run illustrative aggregation logic instead of production logic."),
-    log_level: str = typer.Option("INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)."),
-    dry_run: bool = typer.Option(False, help="Validate config and list input files without processing."),
-    unit_defs_path: Optional[Path] = typer.Option(
-        None, 
-        "--unit-defs", 
-        "-ud", 
-        help="Path to a custom unitdefs.json file. If not provided, a default file will be used.",
-        exists=True, # Typer will validate that the file exists if a path is given
-        dir_okay=False,
-        resolve_path=True,
-    ),
-):
+# --- SINGLE-REPLAY PIPELINE ---
+@dataclass(frozen=True)
+class PipelineOptions:
+    """Settings that apply to every replay of a `run` or `batch` invocation."""
+    output_format: OutputFormat = OutputFormat.MPK_GZIP
+    stats_to_run: Tuple[str, ...] = ()
+    unaggregated_streams_to_run: Tuple[str, ...] = ()
+    serial: bool = False
+    use_cache: bool = True
+    force_reprocess: bool = False
+    skip_on_error: bool = False
+    engine: DecodeEngine = DecodeEngine.ROW
+    use_mmap: bool = False
+    batch_rows: Optional[int] = None
+    max_memory: Optional[int] = None
+    stat_timeout: Optional[float] = None
+    incremental: bool = False
+    # Cache limits and stat concurrency do not affect outputs, so they are left out of the batch settings signature.
+    cache_policy: CachePolicy = field(default=CachePolicy(), repr=False, compare=False)
+    stat_workers: Optional[int] = field(default=None, repr=False, compare=False)
+    lazy_stats: bool = field(default=False, repr=False, compare=False)
+
+
+def _cache_policy(max_size_mb: Optional[int], max_age_days: Optional[float]) -> CachePolicy:
+    return CachePolicy(
+        max_bytes=max_size_mb * 1024 * 1024 if max_size_mb is not None else None,
+        max_age_seconds=max_age_days * 86400 if max_age_days is not None else None,
+    )
+
+
+def process_replay(
+    replay_id: str,
+    input_dirs: List[str],
+    cache_dir: str,
+    output_dir: str,
+    options: PipelineOptions,
+    unit_defs_path: Optional[Path] = None,
+    unit_defs_df: Optional[pl.DataFrame] = None,
+    pool: Optional[WorkerPool] = None,
+    show_progress: bool = True,
+    dry_run: bool = False,
+) -> Dict[str, float]:
     """
-    Runs the complete Message Pack parsing pipeline for a given replay.
+    Runs Steps 1-8 for one replay and returns the duration of each stage in
+    seconds. Raises `ParserError` (or any unexpected exception) on failure.
+    `unit_defs_df` and `pool` let batch runs share work across replays.
     """
-    total_start_time = time.perf_counter()
-    setup_logging(log_level)
-    
+    timings: Dict[str, float] = {}
+    engine = options.engine
+    unaggregated_streams_to_run = list(options.unaggregated_streams_to_run)
+    if not unaggregated_streams_to_run:
+        unaggregated_streams_to_run = ["unit_events", "unit_positions", "start_pos", "team_stats", "damage_log"]
+        logger.info("No specific unaggregated streams requested via -u/--stream. Defaulting to 'command_log'.")
+
+    spill_tmp_dir: Optional[tempfile.TemporaryDirectory] = None
     try:
-        logger.info("--- [Step 0] Configuration Validation ---")
-        validate_configurations()
-        
-        if not unaggregated_streams_to_run:
-            unaggregated_streams_to_run = ["unit_events", "unit_positions", "start_pos", "team_stats", "damage_log"]
-            logger.info("No specific unaggregated streams requested via -u/--stream. Defaulting to 'command_log'.")
-        
-
-        assert(isinstance(stats_to_run, List))
-
         logger.info("--- [Step 1] File Ingestion ---")
+        stage_start_time = time.perf_counter()
+
+        # Only the aspects read by the requested stats and streams are ingested and decoded
+        required = required_inputs(options.stats_to_run or default_stat_names(), unaggregated_streams_to_run)
+        aspects_to_ingest = None if required is None else set(required)
+        if aspects_to_ingest is not None:
+            logger.info(f"Requested stats and streams read: {sorted(aspects_to_ingest)}")
 
-        # Ingest all .mpk aspect files
-        raw_mpk_data = load_mpk_files(input_dirs)
+        # Ingest the .mpk aspect files, either fully or as memory-mappable handles
+        raw_mpk_data: Dict[str, AspectSource] = dict(
+            index_mpk_files(input_dirs, aspects_to_ingest) if options.use_mmap else load_mpk_files(input_dirs, aspects_to_ingest)
+        )
         if not raw_mpk_data:
             raise ParserError("Step 1 Ingestion Error: No MPK files were loaded.")
         logger.info(f"Ingested {len(raw_mpk_data)} aspect files.")
@@ -253,50 +289,123 @@ def run(
     
         logger.info("--- [Pre-Step] Loading Context Data ---")
         # Build context using the ingested defs_map_df
-        context_dataframes = build_execution_context(unit_defs_path, defs_map_df)
+        context_dataframes = build_execution_context(unit_defs_path, defs_map_df, unit_defs_df)
+        timings["ingestion"] = time.perf_counter() - stage_start_time
 
         if dry_run:
             logger.info("Dry run requested. Found the following aspects:")
             for aspect_name, raw_bytes in raw_mpk_data.items():
                 logger.info(f"  - {aspect_name} ({len(raw_bytes) / 1024:.2f} KB)")
             logger.info("Dry run complete. No data processed.")
-            return
+            return timings
 
         # --- ROUTING LOGIC: Choose between serial and parallel execution ---
         dataframes: Dict[str, pl.DataFrame]
         stage_start_time = time.perf_counter()
         
-        if serial:
-            dataframes = _run_serial_pipeline(raw_mpk_data, cache_dir, replay_id, not no_cache, force_reprocess, skip_on_error)
+        batch_options = None
+        if options.batch_rows is not None or options.max_memory is not None:
+            if engine != DecodeEngine.COLUMNAR:
+                logger.info("Batched decoding requested. Using the columnar engine.")
+                engine = DecodeEngine.COLUMNAR
+            os.makedirs(cache_dir, exist_ok=True)
+            spill_tmp_dir = tempfile.TemporaryDirectory(prefix="spill-", dir=cache_dir, ignore_cleanup_errors=True)
+            batch_options = BatchOptions(
+                batch_rows=options.batch_rows or DEFAULT_BATCH_ROWS,
+                max_memory_bytes=options.max_memory * 1024 * 1024 if options.max_memory is not None else None,
+                spill_dir=spill_tmp_dir.name,
+            )
+
+        # The columnar engine only materializes the columns the requested stats read. Rows dropped by
+        # --skip-on-error depend on every column, so that mode always decodes whole aspects.
+        projections: Dict[str, Tuple[str, ...]] = {}
+        if engine == DecodeEngine.COLUMNAR and required is not None and not options.skip_on_error:
+            for name in raw_mpk_data:
+                if (projection := resolve_projection(name, required.get(name))) is not None:
+                    projections[name] = projection
+            if projections:
+                logger.info(f"Decoding only the required columns of {sorted(projections)}.")
+
+        # Step 3: Aspects with a valid cached frame skip Steps 2-5 entirely. In incremental
+        # mode, the replay's own state replaces the cache and only appended rows are decoded.
+        cached_dataframes: Dict[str, pl.DataFrame] = {}
+        cache_keys: Dict[str, CacheKey] = {}
+        incremental: Optional[IncrementalReplay] = None
+        if options.incremental:
+            incremental = IncrementalReplay.load(cache_dir, replay_id)
+            aspects_to_decode = incremental.resume(raw_mpk_data, projections, options.skip_on_error, restart=options.force_reprocess)
+        elif options.use_cache:
+            # Keys depend only on each aspect's bytes and schema, so identical inputs share entries across replays.
+            cache_keys = {name: CacheKey.for_source(name, source, projections.get(name)) for name, source in raw_mpk_data.items()}
+            if not options.force_reprocess:
+                cached_dataframes = load_cached_aspects(cache_dir, cache_keys)
+                logger.info(f"Loaded {len(cached_dataframes)} of {len(raw_mpk_data)} aspects from cache.")
+        if incremental is None:
+            aspects_to_decode = {name: source for name, source in raw_mpk_data.items() if name not in cached_dataframes}
+
+        if options.serial:
+            decoded_dataframes = _run_serial_pipeline(aspects_to_decode, options.skip_on_error, engine, batch_options, projections)
         else:
-            dataframes = _run_parallel_pipeline(raw_mpk_data, skip_on_error)
-            
+            decoded_dataframes = _run_parallel_pipeline(
+                aspects_to_decode, options.skip_on_error, engine, batch_options, pool, show_progress, projections
+            )
+
+        if incremental is not None:
+            dataframes = incremental.append(decoded_dataframes)
+        else:
+            # Frames decoded with --skip-on-error may lack rows a strict run would reject, so they are not cached.
+            if options.use_cache and not options.skip_on_error:
+                try:
+                    save_aspects_to_cache(decoded_dataframes, cache_dir, cache_keys, options.cache_policy)
+                except CacheWriteError as e:
+                    logger.warning(f"Could not write cache: {e}")
+
+            dataframes = {
+                name: cached_dataframes[name] if name in cached_dataframes else decoded_dataframes[name]
+                for name in raw_mpk_data
+                if name in cached_dataframes or name in decoded_dataframes
+            }
         dataframes.update(context_dataframes)
 
-        logger.info(f"Main processing (Steps 2-5) complete in {time.perf_counter() - stage_start_time:.2f}s.")
+        # Stat results are cached under the same conditions as the aspects they are computed from.
+        stat_result_cache = None
+        if incremental is not None:
+            context_fingerprints = {name: frame_fingerprint(df) for name, df in context_dataframes.items()}
+            stat_result_cache = IncrementalStatResults(incremental, dataframes, context_fingerprints)
+        elif options.use_cache and not options.skip_on_error:
+            input_fingerprints = {name: f"{key.content_hash}.{key.fingerprint}" for name, key in cache_keys.items()}
+            input_fingerprints.update((name, frame_fingerprint(df)) for name, df in context_dataframes.items())
+            stat_result_cache = StatResultCache(cache_dir, input_fingerprints, options.cache_policy, refresh=options.force_reprocess)
+
+        timings["decoding"] = time.perf_counter() - stage_start_time
+        logger.info(f"Main processing (Steps 2-5) complete in {timings['decoding']:.2f}s.")
 
         # --- Steps 6 - 8 are always serial ---
         logger.info("--- [Step 6] Data Aggregation ---")
         stage_start_time = time.perf_counter()
         aggregated_stats, unaggregated_streams = perform_aggregations(
             dataframes_by_aspect=dataframes, 
-            stats_to_compute=stats_to_run,
-            unaggregated_streams_to_compute=unaggregated_streams_to_run
-            # unaggregated_streams_to_compute=unaggregated_streams_to_run
+            stats_to_compute=list(options.stats_to_run),
+            unaggregated_streams_to_compute=unaggregated_streams_to_run,
+            result_cache=stat_result_cache,
+            scheduler=StatScheduler(options.stat_workers, options.stat_timeout, options.lazy_stats),
         )
-        logger.info(f"Stage complete in {time.perf_counter() - stage_start_time:.2f}s.")
+        if incremental is not None:
+            incremental.save()
+        timings["aggregation"] = time.perf_counter() - stage_start_time
+        logger.info(f"Stage complete in {timings['aggregation']:.2f}s.")
 
         logger.info("--- [Step 7] Output Transformation ---")
         stage_start_time = time.perf_counter()
-        stats_to_run = stats_to_run if stats_to_run is not None else []
         transformed_agg, transformed_unagg = output_transformer.apply_output_transformations(
             aggregated_stats, unaggregated_streams
         )
-        logger.info(f"Stage complete in {time.perf_counter() - stage_start_time:.2f}s.")
+        timings["output_transformation"] = time.perf_counter() - stage_start_time
+        logger.info(f"Stage complete in {timings['output_transformation']:.2f}s.")
         
         logger.info("--- [Step 8] Final Output Generation ---")
         stage_start_time = time.perf_counter()
-        strategy_instance = STRATEGY_MAP[output_format]()
+        strategy_instance = STRATEGY_MAP[options.output_format]()
         generate_output(
             strategy=strategy_instance,
             transformed_aggregated_data=transformed_agg,
@@ -306,7 +415,136 @@ def run(
             output_directory=output_dir,
             replay_id=replay_id
         )
-        logger.info(f"Stage complete in {time.perf_counter() - stage_start_time:.2f}s.")
+        timings["output"] = time.perf_counter() - stage_start_time
+        logger.info(f"Stage complete in {timings['output']:.2f}s.")
+    finally:
+        # Spilled aspects are memory-mapped until the outputs are written.
+        if spill_tmp_dir is not None:
+            spill_tmp_dir.cleanup()
+
+    return timings
+
+
+@app.command()
+def run(
+    replay_id: str = typer.Argument(..., help="A unique identifier for the replay."),
+    input_dirs: List[str] = typer.Option(..., "--input-dir", "-i", help="Input directory. Can be used multiple times."),
+    cache_dir: str = typer.Option(..., "--cache-dir", "-c", help="Directory for intermediate cached data."),
+    output_dir: str = typer.Option(..., "--output-dir", "-o", help="Directory for the final compressed output."),
+    output_format: OutputFormat = typer.Option(OutputFormat.MPK_GZIP, "--output-format", "-f", help="The format for the final output.", case_sensitive=False),
+    stats_to_run: Optional[List[str]] = typer.Option(
+        [], "--stat", "-s",
+        help="Stat to compute and output. Can be used multiple times. If none are provided, default stats are computed.",
+        callback=_validate_stats_callback,
+        show_default=False
+    ),
+    unaggregated_streams_to_run: Optional[List[str]] = typer.Option(
+        [], "--stream", "-u",
+        help="Unaggregated stream to output (e.g., 'unit_positions'). Can be used multiple times. If none, only 'command_log' is output by default.",
+        callback=_validate_streams_callback,
+        show_default=False
+    ),
+    serial: bool = typer.Option(
+        False, 
+        "--serial", 
+        help="Run in single-threaded mode. Disables parallelism and simplifies debugging."
+    ),
+    no_cache: bool = typer.Option(False, help="Disable the cache of decoded aspects and stat results."),
+    force_reprocess: bool = typer.Option(False, help="Force reprocessing, ignoring (and then refreshing) the existing cache."),
+    cache_max_size: Optional[int] = typer.Option(
+        None, "--cache-max-size", min=1,
+        help="Cache size limit in MB. Least recently used entries are evicted after each write."
+    ),
+    cache_max_age: Optional[float] = typer.Option(
+        None, "--cache-max-age", min=0,
+        help="Evict cache entries not used for this many days."
+    ),
+    skip_on_error: bool = typer.Option(False, help="Skip individual records that fail validation instead of halting."),
+    engine: DecodeEngine = typer.Option(
+        DecodeEngine.ROW, "--engine", "-e",
+        help="Decode engine for Steps 2-5. 'columnar' decodes straight into DataFrames without per-row models.",
+        case_sensitive=False
+    ),
+    use_mmap: bool = typer.Option(
+        False, "--mmap",
+        help="Memory-map aspect files instead of reading them up front. Workers receive file handles, not payloads."
+    ),
+    batch_rows: Optional[int] = typer.Option(
+        None, "--batch-rows", min=1,
+        help=f"Decode aspects in batches of this many rows (default {DEFAULT_BATCH_ROWS} when --max-memory is set). Implies --engine columnar."
+    ),
+    max_memory: Optional[int] = typer.Option(
+        None, "--max-memory", min=1,
+        help="Per-aspect memory budget in MB for decoded batches. Larger aspects are spilled to disk (under the cache dir) and memory-mapped. Implies --engine columnar."
+    ),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", "-w", min=1,
+        help="Number of worker processes in parallel mode. Defaults to the number of usable CPUs."
+    ),
+    stat_workers: Optional[int] = typer.Option(
+        None, "--stat-workers", min=1,
+        help=f"Maximum number of stats computed at once (default: {DEFAULT_MAX_CONCURRENT_STATS} or the CPU count, if lower). Each stat also uses Polars' own thread pool."
+    ),
+    stat_timeout: Optional[float] = typer.Option(
+        None, "--stat-timeout", min=0,
+        help="Give up on any stat still running after this many seconds. Stats depending on it are skipped."
+    ),
+    lazy_stats: bool = typer.Option(
+        False, "--lazy-stats",
+        help="Collect all lazy stats in one Polars query plan, so the scans and filters they share run once."
+    ),
+    max_tasks_per_child: Optional[int] = typer.Option(
+        None, "--max-tasks-per-child", min=1,
+        help="Replace each worker process after this many tasks to release memory. Unlimited by default."
+    ),
+    incremental: bool = typer.Option(
+        False, "--incremental",
+        help="Decode only the rows appended to the aspect files since the last --incremental run of this replay, and update its stats from them where possible."
+    ),
+    run_demo_aggregation: bool = typer.Option(False, help="Run illustrative aggregation logic instead of production logic."),
+    log_level: str = typer.Option("INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)."),
+    dry_run: bool = typer.Option(False, help="Validate config and list input files without processing."),
+    unit_defs_path: Optional[Path] = typer.Option(
+        None, 
+        "--unit-defs", 
+        "-ud", 
+        help="Path to a custom unitdefs.json file. If not provided, a default file will be used.",
+        exists=True, # Typer will validate that the file exists if a path is given
+        dir_okay=False,
+        resolve_path=True,
+    ),
+):
+    """
+    Runs the complete Message Pack parsing pipeline for a given replay.
+    """
+    total_start_time = time.perf_counter()
+    setup_logging(log_level)
+    
+    try:
+        logger.info("--- [Step 0] Configuration Validation ---")
+        validate_configurations()
+
+        assert(isinstance(stats_to_run, List))
+        options = PipelineOptions(
+            output_format=output_format,
+            stats_to_run=tuple(stats_to_run),
+            unaggregated_streams_to_run=tuple(unaggregated_streams_to_run or ()),
+            serial=serial,
+            use_cache=not no_cache,
+            force_reprocess=force_reprocess,
+            skip_on_error=skip_on_error,
+            engine=engine,
+            use_mmap=use_mmap,
+            batch_rows=batch_rows,
+            max_memory=max_memory,
+            cache_policy=_cache_policy(cache_max_size, cache_max_age),
+            stat_workers=stat_workers,
+            stat_timeout=stat_timeout,
+            lazy_stats=lazy_stats,
+            incremental=incremental,
+        )
+        with WorkerPool(workers, max_tasks_per_child) as pool:
+            process_replay(replay_id, input_dirs, cache_dir, output_dir, options, unit_defs_path, pool=pool, dry_run=dry_run)
 
     except ParserError as e:
         logger.critical(f"A fatal parser error occurred: {e}", exc_info=False)
@@ -321,6 +559,306 @@ def run(
     logger.info(f"--- Pipeline finished successfully for Replay ID: {replay_id} in {total_time:.2f} seconds ---")
 
 
+# --- BATCH EXECUTION ---
+def _batch_settings_signature(options: PipelineOptions, output_dir: str, unit_defs_path: Optional[Path]) -> str:
+    """
+    Fingerprints what a replay's outputs depend on besides its input files: the
+    options, output directory and unit definitions, plus the code producing the
+    outputs, so that outputs written by an older version are not up to date.
+    The code is the output strategy's schema version, the output modules (with
+    their encoders and contracts), and the aspect and requested stat fingerprints.
+    """
+    strategy = STRATEGY_MAP[options.output_format]
+    stat_names = with_dependencies(options.stats_to_run or default_stat_names())
+    stream_modules = sorted({func.__module__ for func in UNAGGREGATED_STREAM_REGISTRY.values()})
+    code = (
+        strategy.schema_version,
+        _module_source_digest(strategy.__module__),
+        _module_source_digest(output_transformer.__name__),
+        [aspect_fingerprint(name) for name in sorted(ASPECT_TO_RAW_SCHEMA_MAP)],
+        [stat_fingerprint(STATS_REGISTRY[name]) for name in stat_names if name in STATS_REGISTRY],
+        [_module_source_digest(module) for module in stream_modules],
+    )
+    return settings_signature((options, str(Path(output_dir).resolve()), file_signature(unit_defs_path), code))
+
+
+def _process_batch_replay(
+    replay_id: str,
+    replay_dir: Path,
+    input_sig: str,
+    settings_sig: str,
+    cache_dir: str,
+    output_dir: str,
+    options: PipelineOptions,
+    unit_defs_df: pl.DataFrame,
+    pool: WorkerPool,
+) -> ReplayResult:
+    """Processes one replay of a batch, turning failures into a FAILED result."""
+    start_time = time.perf_counter()
+    result = ReplayResult(replay_id, str(replay_dir), ReplayStatus.OK, input_signature=input_sig, settings_signature=settings_sig)
+    try:
+        timings = process_replay(
+            replay_id, [str(replay_dir)], cache_dir, output_dir, options,
+            unit_defs_df=unit_defs_df, pool=pool, show_progress=False,
+        )
+        result.stages = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        result.outputs = STRATEGY_MAP[options.output_format].output_paths(output_dir, replay_id)
+    except Exception as e:
+        logger.error(f"Replay '{replay_id}' failed: {e}", exc_info=not isinstance(e, ParserError))
+        result.status, result.error = ReplayStatus.FAILED, f"{type(e).__name__}: {e}"
+    result.seconds = round(time.perf_counter() - start_time, 3)
+    result.finished_at = now_iso()
+    return result
+
+
+@app.command(name="batch")
+def cli_batch(
+    replay_dirs: Optional[List[str]] = typer.Argument(None, help="Replay directories or glob patterns (e.g. 'replays/*'). Each directory's name is its replay ID."),
+    manifest: Optional[Path] = typer.Option(
+        None, "--manifest", "-m",
+        help="File listing one replay directory or glob per line. Relative entries are resolved against the manifest's directory.",
+        exists=True, dir_okay=False, resolve_path=True,
+    ),
+    cache_dir: str = typer.Option(..., "--cache-dir", "-c", help="Directory for cached aspect DataFrames and spilled aspects."),
+    output_dir: str = typer.Option(..., "--output-dir", "-o", help="Directory for the final outputs of every replay."),
+    output_format: OutputFormat = typer.Option(OutputFormat.MPK_GZIP, "--output-format", "-f", help="The format for the final output.", case_sensitive=False),
+    stats_to_run: Optional[List[str]] = typer.Option(
+        [], "--stat", "-s",
+        help="Stat to compute and output. Can be used multiple times. If none are provided, default stats are computed.",
+        callback=_validate_stats_callback,
+        show_default=False
+    ),
+    unaggregated_streams_to_run: Optional[List[str]] = typer.Option(
+        [], "--stream", "-u",
+        help="Unaggregated stream to output. Can be used multiple times.",
+        callback=_validate_streams_callback,
+        show_default=False
+    ),
+    skip_on_error: bool = typer.Option(False, help="Skip individual records that fail validation instead of halting."),
+    no_cache: bool = typer.Option(False, help="Disable the cache of decoded aspects and stat results."),
+    cache_max_size: Optional[int] = typer.Option(None, "--cache-max-size", min=1, help="Cache size limit in MB. Least recently used entries are evicted after each write."),
+    cache_max_age: Optional[float] = typer.Option(None, "--cache-max-age", min=0, help="Evict cache entries not used for this many days."),
+    engine: DecodeEngine = typer.Option(DecodeEngine.COLUMNAR, "--engine", "-e", help="Decode engine for Steps 2-5.", case_sensitive=False),
+    use_mmap: bool = typer.Option(False, "--mmap", help="Memory-map aspect files instead of reading them up front."),
+    batch_rows: Optional[int] = typer.Option(None, "--batch-rows", min=1, help="Decode aspects in batches of this many rows. Implies --engine columnar."),
+    max_memory: Optional[int] = typer.Option(None, "--max-memory", min=1, help="Per-aspect memory budget in MB for decoded batches. Implies --engine columnar."),
+    jobs: int = typer.Option(2, "--jobs", "-j", min=1, help="Number of replays processed concurrently. Their aspects share one worker pool."),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", min=1, help="Number of worker processes shared by all replays. Defaults to the number of usable CPUs."),
+    stat_workers: Optional[int] = typer.Option(None, "--stat-workers", min=1, help="Maximum number of stats computed at once per replay."),
+    stat_timeout: Optional[float] = typer.Option(None, "--stat-timeout", min=0, help="Give up on any stat still running after this many seconds."),
+    lazy_stats: bool = typer.Option(False, "--lazy-stats", help="Collect all lazy stats in one Polars query plan."),
+    max_tasks_per_child: Optional[int] = typer.Option(None, "--max-tasks-per-child", min=1, help="Replace each worker process after this many tasks to release memory."),
+    force: bool = typer.Option(False, "--force", help="Reprocess replays even if their outputs are up to date."),
+    summary_path: Optional[Path] = typer.Option(None, "--summary", help=f"Where to write the status/timing summary. Defaults to <output-dir>/{SUMMARY_FILENAME}."),
+    unit_defs_path: Optional[Path] = typer.Option(
+        None, "--unit-defs", "-ud",
+        help="Path to a custom unitdefs.json file. If not provided, a default file will be used.",
+        exists=True, dir_okay=False, resolve_path=True,
+    ),
+    log_level: str = typer.Option("WARNING", help="Logging level (DEBUG, INFO, WARNING, ERROR)."),
+):
+    """
+    Processes many replays in one invocation. Replays run concurrently and their
+    aspects are decoded by one shared pool of warm workers. Replays whose inputs
+    and settings are unchanged since the last successful batch are skipped.
+    """
+    batch_start_time = time.perf_counter()
+    setup_logging(log_level)
+    summary_path = summary_path or Path(output_dir) / SUMMARY_FILENAME
+
+    try:
+        validate_configurations()
+        replays = assign_replay_ids(discover_replay_dirs(replay_dirs or [], manifest))
+        if not replays:
+            raise ParserError("No replay directories matched the given paths, globs or manifest.")
+
+        assert(isinstance(stats_to_run, List))
+        options = PipelineOptions(
+            output_format=output_format,
+            stats_to_run=tuple(stats_to_run),
+            unaggregated_streams_to_run=tuple(unaggregated_streams_to_run or ()),
+            use_cache=not no_cache,
+            skip_on_error=skip_on_error,
+            engine=engine,
+            use_mmap=use_mmap,
+            batch_rows=batch_rows,
+            max_memory=max_memory,
+            cache_policy=_cache_policy(cache_max_size, cache_max_age),
+            stat_workers=stat_workers,
+            stat_timeout=stat_timeout,
+            lazy_stats=lazy_stats,
+        )
+        settings_sig = _batch_settings_signature(options, output_dir, unit_defs_path)
+        # Unit definitions are identical for every replay, so they are parsed once.
+        unit_defs_df = load_unit_defs_frame(unit_defs_path)
+    except ParserError as e:
+        logger.critical(f"A fatal parser error occurred: {e}", exc_info=False)
+        raise typer.Exit(code=1)
+
+    previous = load_summary(summary_path)
+    other_records = {replay_id: record for replay_id, record in previous.items() if replay_id not in replays}
+    results: Dict[str, ReplayResult] = {}
+    pending: Dict[str, Tuple[Path, str]] = {}
+    for replay_id, replay_dir in replays.items():
+        input_sig = input_signature(replay_dir)
+        record = previous.get(replay_id)
+        if not force and is_up_to_date(record, input_sig, settings_sig):
+            results[replay_id] = ReplayResult(
+                replay_id, str(replay_dir), ReplayStatus.SKIPPED,
+                input_signature=input_sig, settings_signature=settings_sig,
+                outputs=record["outputs"], finished_at=now_iso(),
+            )
+        else:
+            pending[replay_id] = (replay_dir, input_sig)
+    print(f"{len(replays)} replays found: {len(pending)} to process, {len(results)} up to date.")
+
+    with WorkerPool(workers, max_tasks_per_child) as pool, Progress() as progress:
+        task = progress.add_task("[cyan]Processing replays...", total=len(pending))
+        # Replays run on threads: their heavy lifting happens in the shared worker pool and in Polars.
+        with ThreadPoolExecutor(max_workers=jobs) as replay_executor:
+            futures = [
+                replay_executor.submit(
+                    _process_batch_replay, replay_id, replay_dir, input_sig, settings_sig,
+                    cache_dir, output_dir, options, unit_defs_df, pool,
+                )
+                for replay_id, (replay_dir, input_sig) in pending.items()
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result.replay_id] = result
+                # Rewritten after every replay so an interrupted batch can resume.
+                write_summary(summary_path, results, time.perf_counter() - batch_start_time, other_records)
+                progress.update(task, advance=1)
+
+    ordered_results = {replay_id: results[replay_id] for replay_id in replays}
+    totals = write_summary(summary_path, ordered_results, time.perf_counter() - batch_start_time, other_records)
+    print(
+        f"Processed {totals['ok']} replays ({totals['failed']} failed, {totals['skipped']} skipped) "
+        f"in {totals['elapsed_seconds']:.1f}s: {totals['replays_per_minute']:.1f} replays/minute. Summary: {summary_path}"
+    )
+    if totals["failed"]:
+        raise typer.Exit(code=1)
+
+
+# --- DAEMON ---
+@app.command(name="serve")
+def cli_serve(
+    cache_dir: str = typer.Option(..., "--cache-dir", "-c", help="Directory for cached aspect DataFrames and spilled aspects."),
+    output_dir: str = typer.Option(..., "--output-dir", "-o", help="Directory for the final outputs of every replay."),
+    port: Optional[int] = typer.Option(None, "--port", "-p", min=0, max=65535, help="Accept jobs over HTTP on 127.0.0.1 at this port (0 picks a free port)."),
+    socket_path: Optional[Path] = typer.Option(None, "--socket", help="Accept jobs over HTTP on this Unix socket."),
+    watch_dirs: Optional[List[Path]] = typer.Option(
+        [], "--watch", help="Directory whose new replay folders are processed automatically. Can be used multiple times.",
+        file_okay=False, resolve_path=True,
+    ),
+    watch_interval: float = typer.Option(2.0, "--watch-interval", min=0.1, help="Seconds between polls of the watched directories."),
+    output_format: OutputFormat = typer.Option(OutputFormat.MPK_GZIP, "--output-format", "-f", help="The format for the final output.", case_sensitive=False),
+    stats_to_run: Optional[List[str]] = typer.Option(
+        [], "--stat", "-s",
+        help="Stat to compute and output. Can be used multiple times. If none are provided, default stats are computed.",
+        callback=_validate_stats_callback,
+        show_default=False
+    ),
+    unaggregated_streams_to_run: Optional[List[str]] = typer.Option(
+        [], "--stream", "-u",
+        help="Unaggregated stream to output. Can be used multiple times.",
+        callback=_validate_streams_callback,
+        show_default=False
+    ),
+    skip_on_error: bool = typer.Option(False, help="Skip individual records that fail validation instead of halting."),
+    no_cache: bool = typer.Option(False, help="Disable the cache of decoded aspects and stat results."),
+    cache_max_size: Optional[int] = typer.Option(None, "--cache-max-size", min=1, help="Cache size limit in MB. Least recently used entries are evicted after each write."),
+    cache_max_age: Optional[float] = typer.Option(None, "--cache-max-age", min=0, help="Evict cache entries not used for this many days."),
+    engine: DecodeEngine = typer.Option(DecodeEngine.COLUMNAR, "--engine", "-e", help="Decode engine for Steps 2-5.", case_sensitive=False),
+    use_mmap: bool = typer.Option(False, "--mmap", help="Memory-map aspect files instead of reading them up front."),
+    jobs: int = typer.Option(2, "--jobs", "-j", min=1, help="Number of replays processed concurrently. Their aspects share one worker pool."),
+    max_queue: int = typer.Option(64, "--max-queue", min=1, help="Number of jobs that may wait for processing. Further submissions are refused until there is room."),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", min=1, help="Number of worker processes shared by all replays. Defaults to the number of usable CPUs."),
+    stat_workers: Optional[int] = typer.Option(None, "--stat-workers", min=1, help="Maximum number of stats computed at once per replay."),
+    stat_timeout: Optional[float] = typer.Option(None, "--stat-timeout", min=0, help="Give up on any stat still running after this many seconds."),
+    lazy_stats: bool = typer.Option(False, "--lazy-stats", help="Collect all lazy stats in one Polars query plan."),
+    max_tasks_per_child: Optional[int] = typer.Option(None, "--max-tasks-per-child", min=1, help="Replace each worker process after this many tasks to release memory."),
+    summary_path: Optional[Path] = typer.Option(None, "--summary", help=f"Where to record processed replays. Defaults to <output-dir>/{SUMMARY_FILENAME}."),
+    unit_defs_path: Optional[Path] = typer.Option(
+        None, "--unit-defs", "-ud",
+        help="Path to a custom unitdefs.json file. If not provided, a default file will be used.",
+        exists=True, dir_okay=False, resolve_path=True,
+    ),
+    log_level: str = typer.Option("INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)."),
+):
+    """
+    Runs as a daemon that processes replays submitted over HTTP (on localhost or
+    a Unix socket) or found in watched directories. Unit definitions and the
+    worker pool stay warm between replays. Stop with Ctrl+C or SIGTERM.
+    """
+    setup_logging(log_level)
+    summary_path = summary_path or Path(output_dir) / SUMMARY_FILENAME
+    if port is None and socket_path is None and not watch_dirs:
+        logger.critical("Nothing to serve: give --port, --socket or --watch.")
+        raise typer.Exit(code=1)
+
+    try:
+        validate_configurations()
+        assert(isinstance(stats_to_run, List))
+        options = PipelineOptions(
+            output_format=output_format,
+            stats_to_run=tuple(stats_to_run),
+            unaggregated_streams_to_run=tuple(unaggregated_streams_to_run or ()),
+            use_cache=not no_cache,
+            skip_on_error=skip_on_error,
+            engine=engine,
+            use_mmap=use_mmap,
+            cache_policy=_cache_policy(cache_max_size, cache_max_age),
+            stat_workers=stat_workers,
+            stat_timeout=stat_timeout,
+            lazy_stats=lazy_stats,
+        )
+        settings_sig = _batch_settings_signature(options, output_dir, unit_defs_path)
+        unit_defs_df = load_unit_defs_frame(unit_defs_path)
+    except ParserError as e:
+        logger.critical(f"A fatal parser error occurred: {e}", exc_info=False)
+        raise typer.Exit(code=1)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    with WorkerPool(workers, max_tasks_per_child) as pool:
+        # Workers are started up front so that the first job does not pay for their start-up.
+        pool.start()
+
+        def process(replay_id: str, replay_dir: Path, input_sig: str) -> ReplayResult:
+            return _process_batch_replay(
+                replay_id, replay_dir, input_sig, settings_sig, cache_dir, output_dir, options, unit_defs_df, pool
+            )
+
+        replay_server = ReplayServer(process, settings_sig, summary_path, jobs=jobs, max_queue=max_queue)
+        watcher = ReplayWatcher(replay_server, list(watch_dirs or []), watch_interval).start() if watch_dirs else None
+        try:
+            listeners = start_listeners(replay_server, port, socket_path)
+        except (OSError, ParserError) as e:
+            logger.critical(f"Could not start listening: {e}")
+            replay_server.close()
+            raise typer.Exit(code=1)
+        for _, address in listeners:
+            print(f"Accepting jobs on {address}")
+        for watch_dir in watch_dirs or []:
+            print(f"Watching {watch_dir} for new replays")
+
+        try:
+            while not stop.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            pass
+        print("Shutting down: finishing running jobs...")
+        for listener, _ in listeners:
+            listener.shutdown()
+            listener.server_close()
+        if socket_path is not None and socket_path.exists():
+            socket_path.unlink()
+        if watcher is not None:
+            watcher.stop()
+        replay_server.close()
+
+
 @app.command(name="list-aspects")
 def cli_list_aspects():
     """Lists all aspect names recognized by the current schemas."""
@@ -344,5 +882,72 @@ def cli_list_streams():
     for stream_name in sorted(UNAGGREGATED_STREAM_REGISTRY.keys()):
         typer.echo(f"  - {stream_name}")
 
+
+# --- CACHE MAINTENANCE ---
+cache_app = typer.Typer(help="Inspect, prune and verify the aspect and stat result cache.", no_args_is_help=True)
+app.add_typer(cache_app, name="cache")
+
+
+def _format_mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+@cache_app.command(name="inspect")
+def cli_cache_inspect(
+    cache_dir: str = typer.Option(..., "--cache-dir", "-c", help="The cache directory."),
+    show_entries: bool = typer.Option(False, "--entries", help="List every entry, least recently used first."),
+):
+    """Shows the cache's size per aspect and stat, and how many entries are stale."""
+    entries = inspect_cache(cache_dir)
+    per_name: Dict[str, List[Any]] = defaultdict(lambda: [0, 0, 0])
+    for entry in entries:
+        counts = per_name[f"{entry.section}/{entry.name}"]
+        counts[0] += 1
+        counts[1] += entry.size
+        counts[2] += entry.stale
+    typer.echo(f"{len(entries)} entries, {_format_mb(sum(e.size for e in entries))} in {cache_dir}")
+    for name, (count, size, stale) in sorted(per_name.items()):
+        typer.echo(f"  - {name:<45} {count:>5} entries {_format_mb(size):>10}   {stale} stale")
+    if show_entries:
+        for entry in entries:
+            last_access = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.last_access))
+            typer.echo(f"{last_access}  {_format_mb(entry.size):>10}  {entry.entry_id}{'  (stale)' if entry.stale else ''}")
+    legacy_files = find_legacy_cache_files(cache_dir)
+    if legacy_files:
+        typer.echo(f"{len(legacy_files)} legacy .mpkcache files can be removed with 'tube cache prune'.")
+
+
+@cache_app.command(name="prune")
+def cli_cache_prune(
+    cache_dir: str = typer.Option(..., "--cache-dir", "-c", help="The cache directory."),
+    max_size: Optional[int] = typer.Option(None, "--max-size", min=0, help="Evict least recently used entries until the cache is at most this many MB."),
+    max_age: Optional[float] = typer.Option(None, "--max-age", min=0, help="Evict entries not used for this many days."),
+    stale: bool = typer.Option(False, "--stale", help="Remove entries written under an outdated schema or pipeline version."),
+):
+    """Evicts entries by size, age or staleness, and removes leftover temp and legacy cache files."""
+    removed = prune_cache(cache_dir, _cache_policy(max_size, max_age), remove_stale=stale)
+    for entry_id in removed:
+        typer.echo(f"Removed {entry_id}")
+    typer.echo(f"Removed {len(removed)} files.")
+
+
+@cache_app.command(name="verify")
+def cli_cache_verify(
+    cache_dir: str = typer.Option(..., "--cache-dir", "-c", help="The cache directory."),
+    fix: bool = typer.Option(False, "--fix", help="Remove unreadable entries and reconcile the index with the files on disk."),
+):
+    """Checks that every entry is readable and matches the index."""
+    problems = verify_cache(cache_dir, fix=fix)
+    for entry_id, problem in problems:
+        typer.echo(f"{entry_id}: {problem}")
+    if not problems:
+        typer.echo("Cache OK.")
+    elif fix:
+        typer.echo(f"Fixed {len(problems)} problems.")
+    else:
+        typer.echo(f"Found {len(problems)} problems. Re-run with --fix to repair them.")
+        raise typer.Exit(code=1)
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
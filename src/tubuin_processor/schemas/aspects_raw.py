@@ -15,6 +15,8 @@ from tubuin_processor.config.enums import (
     UnitEventsEnum,
 )
 
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
 
 class BaseAspectDataPointRaw(BaseModel):
     @classmethod
@@ -32,7 +34,7 @@ class BaseAspectDataPointRaw(BaseModel):
             )
         raw_data_dict = dict(zip(field_names, positional_values))
         try:
-            return cls.model_validate(raw_data_dict)
+            model = cls.model_validate(raw_data_dict)
         except ValidationError as e:
             # --- IMPROVED ERROR HANDLING ---
             # Construct a detailed error message that includes the problematic row data.
@@ -42,6 +44,13 @@ class BaseAspectDataPointRaw(BaseModel):
                 f"Pydantic Errors: {e}"
             )
             raise SchemaValidationError(error_message) from e
+        # Integer columns are Int64 in every DataFrame, so wider ints are invalid here too.
+        for name, value in model:
+            if isinstance(value, int) and not INT64_MIN <= value <= INT64_MAX:
+                raise SchemaValidationError(
+                    f"Data Error for {cls.__name__}: Field '{name}' value {value!r} does not fit in Int64."
+                )
+        return model
 
 
 class Commands_log_Schema_Raw(BaseAspectDataPointRaw):
@@ -150,6 +150,7 @@ unit_economic_contribution_binned_contract = {
             "transform": "cast",
             "to_type": "UInt32",
             "null_encoding": 0,
+            "encoding": "delta",  # rows are sorted by bin
         },
         "units_alive_in_bin": {
             "transform": "cast",
@@ -189,6 +190,7 @@ unit_economic_contribution_binned_contract = {
     },
     "table_options": {
         "layout": "columnar",
+        "encoding": "auto",
     },
 }
 
@@ -198,6 +200,7 @@ damage_log_contract = {
         "frame": {
             "transform": "cast",
             "to_type": "Int32",  # frame can be large, but use Int32 signed or UInt32 as needed
+            "encoding": "delta",  # damage events arrive in frame order
         },
         "unit_id": {
             "transform": "cast",
@@ -211,6 +214,7 @@ damage_log_contract = {
         "victim_unit_id": {
             "transform": "cast",
             "to_type": "Int32",  # likely IDs require 32-bit unsigned/int
+            "encoding": "frame_of_reference",
         },
         "victim_def_id": {
             "transform": "cast",
@@ -220,6 +224,7 @@ damage_log_contract = {
             "transform": "cast",
             "to_type": "UInt16",
             "null_encoding": -1,  # sentinel for missing attacker
+            "encoding": "frame_of_reference",
         },
         "attacker_def_id": {
             "transform": "cast",
@@ -234,6 +239,7 @@ damage_log_contract = {
             "transform": "cast",
             "to_type": "Int32",
             "null_encoding": -1,
+            "encoding": "frame_of_reference",
         },
         "damage": {
             "transform": "cast",
@@ -258,6 +264,8 @@ damage_log_contract = {
     },
     "table_options": {
         "layout": "columnar",
+        # team and def IDs take few distinct values, so they are dictionary-encoded
+        "encoding": "auto",
     },
 }
 
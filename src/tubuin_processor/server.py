@@ -0,0 +1,387 @@
+"""
+The `tube serve` daemon: a long-running process that processes replays as
+jobs, so that each replay no longer pays for interpreter startup, imports,
+stats registration, unit definitions parsing and worker pool warm-up.
+
+Jobs are submitted over HTTP, either on localhost or on a Unix socket, or are
+found by polling watched directories for new replay folders. They wait in a
+bounded queue for one of a fixed number of job threads. When the queue is
+full, submissions are refused (HTTP 503) rather than piling up; watched
+folders are simply picked up again on a later poll.
+
+Finished jobs are recorded in a batch summary (see `batch.py`), so replays
+whose inputs, settings and code are unchanged since they were last processed,
+by the daemon or by `tube batch`, and whose outputs still exist, are skipped
+unless forced.
+
+HTTP API (the same on TCP and on the Unix socket; bodies are JSON):
+    POST /jobs        {"input_dir": ..., "replay_id": ..., "force": false}
+                      -> 202 and the job, or 503 when the queue is full
+    GET  /jobs        -> every job still held in memory
+    GET  /jobs/<id>   -> one job
+    GET  /health      -> queue depth and job counts
+"""
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from tubuin_processor.batch import (
+    ReplayResult,
+    ReplayStatus,
+    input_signature,
+    is_up_to_date,
+    load_summary,
+    now_iso,
+    write_summary,
+)
+from tubuin_processor.core.exceptions import ParserError
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept in memory for `GET /jobs`; older ones are only in the summary.
+MAX_FINISHED_JOBS = 1000
+
+# Processes one replay: (replay_id, replay_dir, input_signature) -> result.
+ProcessFunction = Callable[[str, Path, str], ReplayResult]
+
+
+class QueueFullError(ParserError):
+    """Raised when a job is submitted while the job queue is full."""
+    pass
+
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class Job:
+    """One submitted replay. `result` is set once the job is done."""
+    job_id: str
+    replay_id: str
+    input_dir: str
+    state: JobState = JobState.QUEUED
+    submitted_at: str = field(default_factory=now_iso)
+    result: Optional[ReplayResult] = None
+
+
+class ReplayServer:
+    """
+    The job queue and the threads that work through it. `process` does the
+    actual work and is given the warm unit definitions and worker pool by the
+    caller; submissions are thread-safe.
+    """
+
+    def __init__(
+        self,
+        process: ProcessFunction,
+        settings_sig: str,
+        summary_path: Path,
+        jobs: int = 1,
+        max_queue: int = 64,
+    ):
+        self.process = process
+        self.settings_sig = settings_sig
+        self.summary_path = summary_path
+        self.max_queue = max_queue
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=max_queue)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # A replay is never processed by two jobs at once, as they would write the same outputs.
+        self._replay_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._previous = load_summary(summary_path)
+        self._results: Dict[str, ReplayResult] = {}
+        self._started = time.perf_counter()
+        self._closing = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"tube-serve-job-{i}", daemon=True) for i in range(jobs)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, replay_dir: Path, replay_id: Optional[str] = None, force: bool = False) -> Job:
+        """
+        Queues a replay and returns its job. A replay that is already queued
+        returns the queued job, and an up-to-date replay returns a job that is
+        already done and SKIPPED. Raises `QueueFullError` when the queue is full.
+        """
+        replay_dir = replay_dir.resolve()
+        replay_id = replay_id or replay_dir.name
+        if not replay_dir.is_dir():
+            raise ParserError(f"Replay directory not found: {replay_dir}")
+
+        input_sig = input_signature(replay_dir)  # Scans the directory, so not under the lock.
+        with self._lock:
+            if self._closing:
+                raise ParserError("The server is shutting down.")
+            for job in self._jobs.values():
+                if job.replay_id == replay_id and job.input_dir == str(replay_dir) and job.state == JobState.QUEUED:
+                    return job
+            job = Job(str(next(self._job_ids)), replay_id, str(replay_dir))
+            record = self._record(replay_id)
+            if not force and is_up_to_date(record, input_sig, self.settings_sig):
+                job.state = JobState.DONE
+                job.result = ReplayResult(
+                    replay_id, str(replay_dir), ReplayStatus.SKIPPED,
+                    input_signature=input_sig, settings_signature=self.settings_sig,
+                    outputs=record["outputs"], finished_at=now_iso(),
+                )
+            else:
+                try:
+                    self._queue.put_nowait(job)
+                except queue.Full:
+                    raise QueueFullError(f"The job queue is full ({self.max_queue} jobs). Try again later.")
+            self._jobs[job.job_id] = job
+            self._trim_jobs()
+        logger.info(f"Job {job.job_id}: replay '{replay_id}' {job.state.value}.")
+        return job
+
+    def job(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {
+            "status": "closing" if self._closing else "ok",
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "running": states.count(JobState.RUNNING),
+            "job_threads": len(self._threads),
+            "uptime_seconds": round(time.perf_counter() - self._started, 3),
+        }
+
+    def close(self) -> None:
+        """Stops taking jobs, cancels queued ones and waits for running ones to finish."""
+        with self._lock:
+            self._closing = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _record(self, replay_id: str) -> Optional[Dict[str, Any]]:
+        if replay_id in self._results:
+            return asdict(self._results[replay_id])
+        return self._previous.get(replay_id)
+
+    def _trim_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in (JobState.DONE, JobState.CANCELLED)]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                job.state = JobState.CANCELLED if self._closing else JobState.RUNNING
+            if job.state == JobState.CANCELLED:
+                continue
+            replay_dir = Path(job.input_dir)
+            with self._replay_locks[job.replay_id]:
+                try:
+                    # Signed when the job starts, so files changed while it waited are accounted for.
+                    result = self.process(job.replay_id, replay_dir, input_signature(replay_dir))
+                except Exception as e:
+                    logger.error(f"Job {job.job_id} failed: {e}", exc_info=e)
+                    result = ReplayResult(
+                        job.replay_id, job.input_dir, ReplayStatus.FAILED,
+                        error=f"{type(e).__name__}: {e}", finished_at=now_iso(),
+                    )
+            with self._lock:
+                job.result, job.state = result, JobState.DONE
+                self._results[job.replay_id] = result
+                other_records = {replay_id: record for replay_id, record in self._previous.items() if replay_id not in self._results}
+                write_summary(self.summary_path, self._results, time.perf_counter() - self._started, other_records)
+            logger.info(f"Job {job.job_id}: replay '{job.replay_id}' {result.status.value} in {result.seconds:.3f}s.")
+
+
+class ReplayWatcher:
+    """
+    Polls directories for replay folders (their direct subdirectories) and
+    submits each folder once its files have stopped changing, i.e. have the
+    same signature on two consecutive polls. Folders changed after being
+    submitted are submitted again.
+    """
+
+    def __init__(self, server: ReplayServer, watch_dirs: List[Path], interval: float = 2.0):
+        self.server = server
+        self.watch_dirs = watch_dirs
+        self.interval = interval
+        self._last_seen: Dict[Path, str] = {}
+        self._submitted: Dict[Path, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> List[Job]:
+        """Checks every watched directory once and returns the jobs submitted."""
+        jobs: List[Job] = []
+        for replay_dir in self._replay_dirs():
+            sig = input_signature(replay_dir)
+            if self._submitted.get(replay_dir) == sig:
+                continue
+            if self._last_seen.get(replay_dir) != sig:
+                self._last_seen[replay_dir] = sig
+                continue
+            try:
+                jobs.append(self.server.submit(replay_dir))
+            except QueueFullError:
+                logger.debug(f"Job queue full; will submit {replay_dir} on a later poll.")
+                continue
+            except ParserError as e:
+                logger.warning(f"Could not submit watched replay {replay_dir}: {e}")
+            self._submitted[replay_dir] = sig
+        return jobs
+
+    def start(self) -> "ReplayWatcher":
+        self._thread = threading.Thread(target=self._run, name="tube-serve-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except OSError as e:
+                logger.warning(f"Polling watched directories failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _replay_dirs(self) -> List[Path]:
+        replay_dirs: List[Path] = []
+        for watch_dir in self.watch_dirs:
+            try:
+                entries = sorted(os.scandir(watch_dir), key=lambda e: e.name)
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                # Folders still empty are not replays yet.
+                if entry.is_dir() and not entry.name.startswith(".") and any(os.scandir(entry.path)):
+                    replay_dirs.append(Path(entry.path).resolve())
+        return replay_dirs
+
+
+# --- HTTP ---
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "tube-serve"
+
+    @property
+    def replay_server(self) -> ReplayServer:
+        return self.server.replay_server  # type: ignore[attr-defined]
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._reply(200, self.replay_server.health())
+        elif self.path == "/jobs":
+            self._reply(200, {"jobs": [asdict(job) for job in self.replay_server.jobs()]})
+        elif self.path.startswith("/jobs/"):
+            job = self.replay_server.job(self.path[len("/jobs/"):])
+            if job is None:
+                self._reply(404, {"error": "Unknown job."})
+            else:
+                self._reply(200, asdict(job))
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}."})
+
+    def do_POST(self) -> None:
+        if self.path != "/jobs":
+            self._reply(404, {"error": f"Unknown path {self.path}."})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            input_dir = body["input_dir"]
+            job = self.replay_server.submit(
+                Path(os.path.expanduser(input_dir)), body.get("replay_id"), bool(body.get("force", False))
+            )
+        except QueueFullError as e:
+            self._reply(503, {"error": str(e)}, {"Retry-After": "1"})
+        except (ValueError, KeyError, TypeError, AttributeError, ParserError) as e:
+            self._reply(400, {"error": f"Invalid job: {e}"})
+        else:
+            self._reply(202, asdict(job))
+
+    def _reply(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _TcpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socket, "AF_UNIX"):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def start_listeners(
+    replay_server: ReplayServer, port: Optional[int] = None, socket_path: Optional[Path] = None
+) -> List[Tuple[socketserver.BaseServer, str]]:
+    """
+    Starts the HTTP listeners on background threads and returns each with its
+    address. TCP listens on 127.0.0.1 only; `port` 0 picks a free port. A
+    stale socket at `socket_path` is replaced; anything else there is an error.
+    """
+    listeners: List[Tuple[socketserver.BaseServer, str]] = []
+    if port is not None:
+        tcp_server = _TcpServer(("127.0.0.1", port), _RequestHandler)
+        listeners.append((tcp_server, f"http://127.0.0.1:{tcp_server.server_address[1]}"))
+    if socket_path is not None:
+        if not hasattr(socket, "AF_UNIX"):
+            raise ParserError("Unix sockets are not supported on this platform. Use --port instead.")
+        try:
+            mode = socket_path.lstat().st_mode
+        except FileNotFoundError:
+            mode = None
+        if mode is not None:
+            if not stat.S_ISSOCK(mode):
+                raise ParserError(f"Refusing to replace {socket_path}: it exists and is not a socket.")
+            socket_path.unlink()  # A stale socket left by an earlier server.
+        unix_server = _UnixServer(str(socket_path), _RequestHandler)
+        listeners.append((unix_server, f"unix:{socket_path}"))
+    for listener, _ in listeners:
+        listener.replay_server = replay_server  # type: ignore[attr-defined]
+        threading.Thread(target=listener.serve_forever, name="tube-serve-http", daemon=True).start()
+    return listeners
@@ -1,12 +1,21 @@
 import logging
+from typing import Tuple
 from tubuin_processor.schemas.aspects_raw import ASPECT_TO_RAW_SCHEMA_MAP
 from tubuin_processor.schemas.aspects import ASPECT_TO_CLEAN_SCHEMA_MAP
-from tubuin_processor.config.dynamic_config_builder import DEQUANTIZATION_CONFIG, ASPECT_ENUM_MAPPINGS
+from tubuin_processor.config.dynamic_config_builder import DEQUANTIZATION_CONFIG, ASPECT_ENUM_MAPPINGS, TRANSFORM_PLANS
+from tubuin_processor.context import CONTEXT_FRAME_NAMES
+from tubuin_processor.core.encoders.columnar_encoder import COLUMN_ENCODINGS
+from tubuin_processor.core.stats import DERIVED_TABLES, STATS_REGISTRY, UNAGGREGATED_STREAM_INPUTS
+from tubuin_processor.schemas.output_contracts import OUTPUT_CONTRACTS
 
 logger = logging.getLogger(__name__)
 
 def validate_configurations():
-    """Checks that all major config dictionaries share the same set of aspect keys."""
+    """
+    Checks that all major config dictionaries share the same set of aspect keys,
+    that the inputs declared by stats and streams exist, and that output
+    contracts select known column encodings.
+    """
     raw_keys = set(ASPECT_TO_RAW_SCHEMA_MAP.keys())
     clean_keys = set(ASPECT_TO_CLEAN_SCHEMA_MAP.keys())
     dequant_keys = set(DEQUANTIZATION_CONFIG.keys())
@@ -17,4 +26,51 @@ def validate_configurations():
     assert dequant_keys.issubset(all_schema_keys), f"Keys in DEQUANTIZATION_CONFIG not found in schemas: {dequant_keys - all_schema_keys}"
     assert enum_keys.issubset(all_schema_keys), f"Keys in ASPECT_ENUM_MAPPINGS not found in schemas: {enum_keys - all_schema_keys}"
 
-    logger.info("Configuration validation successful: All schema and config keys are consistent.")
\ No newline at end of file
+    for aspect_name, plan in TRANSFORM_PLANS.items():
+        raw_fields = set(ASPECT_TO_RAW_SCHEMA_MAP[aspect_name].model_fields)
+        clean_fields = set(ASPECT_TO_CLEAN_SCHEMA_MAP[aspect_name].model_fields)
+        unknown_scaled = set(plan.scales) - raw_fields
+        unknown_enums = {clean for clean, _ in plan.enums.values()} - clean_fields
+        assert not unknown_scaled, f"Dequantized fields of '{aspect_name}' not found in raw schema: {unknown_scaled}"
+        assert not unknown_enums, f"Enum fields of '{aspect_name}' not found in clean schema: {unknown_enums}"
+
+    declared_inputs = {f"stat '{name}'": stat.inputs for name, stat in STATS_REGISTRY.items()}
+    declared_inputs.update((f"stream '{name}'", inputs) for name, inputs in UNAGGREGATED_STREAM_INPUTS.items())
+    declared_inputs.update((f"derived table '{name}'", table.inputs) for name, table in DERIVED_TABLES.items())
+    for owner, inputs in declared_inputs.items():
+        for frame_name, columns in (inputs or {}).items():
+            if frame_name in DERIVED_TABLES:
+                unknown_columns = set(columns or ()) - set(DERIVED_TABLES[frame_name].schema)
+                assert not unknown_columns, f"Input columns of {owner} not found in derived table '{frame_name}': {unknown_columns}"
+                continue
+            assert frame_name in clean_keys or frame_name in CONTEXT_FRAME_NAMES, f"Input '{frame_name}' of {owner} is not a known aspect, context frame or derived table."
+            if frame_name in clean_keys and columns is not None:
+                unknown_columns = set(columns) - set(ASPECT_TO_CLEAN_SCHEMA_MAP[frame_name].model_fields)
+                assert not unknown_columns, f"Input columns of {owner} not found in the '{frame_name}' clean schema: {unknown_columns}"
+    for name, table in DERIVED_TABLES.items():
+        assert not set(table.inputs) & set(DERIVED_TABLES), f"Derived table '{name}' can only be built from aspects and context frames."
+
+    for name, stat in STATS_REGISTRY.items():
+        unknown_dependencies = set(stat.depends_on) - set(STATS_REGISTRY)
+        assert not unknown_dependencies, f"Stat '{name}' depends on unknown stats: {unknown_dependencies}"
+        if stat.merge is not None:
+            assert stat.inputs is not None and not stat.depends_on and not set(stat.inputs) & set(DERIVED_TABLES), (
+                f"Stat '{name}' has a merge function, so it must declare its inputs, read no derived tables and depend on no stats."
+            )
+    for name in STATS_REGISTRY:
+        _assert_no_dependency_cycle(name, ())
+
+    for name, contract in OUTPUT_CONTRACTS.items():
+        encodings = {column: options.get("encoding") for column, options in contract.get("columns", {}).items()}
+        encodings["table_options"] = contract.get("table_options", {}).get("encoding")
+        unknown_encodings = {owner: encoding for owner, encoding in encodings.items() if encoding not in (None, *COLUMN_ENCODINGS)}
+        assert not unknown_encodings, f"Unknown encodings in the '{name}' output contract: {unknown_encodings}. Choose from {COLUMN_ENCODINGS}."
+
+    logger.info("Configuration validation successful: All schema and config keys are consistent.")
+
+
+def _assert_no_dependency_cycle(stat_name: str, path: Tuple[str, ...]) -> None:
+    """Follows `depends_on` from a stat and fails if it leads back to a stat on the current path."""
+    assert stat_name not in path, f"Stat dependency cycle: {' -> '.join(path + (stat_name,))}"
+    for dependency in STATS_REGISTRY[stat_name].depends_on:
+        _assert_no_dependency_cycle(dependency, path + (stat_name,))
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from tubuin_processor.batch import (
+    ReplayResult,
+    ReplayStatus,
+    assign_replay_ids,
+    discover_replay_dirs,
+    input_signature,
+    is_up_to_date,
+    load_summary,
+    write_summary,
+)
+from tubuin_processor.core.exceptions import ParserError
+
+
+@pytest.fixture
+def replay_tree(tmp_path):
+    for name in ("r1", "r2", "r3"):
+        (tmp_path / "replays" / name).mkdir(parents=True)
+        (tmp_path / "replays" / name / "unit_events.mpk").write_bytes(b"\x90")
+    return tmp_path
+
+
+def test_discover_replay_dirs_from_globs_and_manifest(replay_tree):
+    manifest = replay_tree / "manifest.txt"
+    manifest.write_text("# nightly\nreplays/r3\n\nreplays/r1  # duplicate of the glob\n")
+    found = discover_replay_dirs([str(replay_tree / "replays" / "r[12]")], manifest)
+    assert [p.name for p in found] == ["r1", "r2", "r3"]
+
+
+def test_assign_replay_ids_rejects_duplicate_names(tmp_path):
+    (tmp_path / "a" / "r1").mkdir(parents=True)
+    (tmp_path / "b" / "r1").mkdir(parents=True)
+    with pytest.raises(ParserError, match="Duplicate replay ID 'r1'"):
+        assign_replay_ids([tmp_path / "a" / "r1", tmp_path / "b" / "r1"])
+
+
+def test_up_to_date_requires_matching_inputs_settings_and_outputs(replay_tree, tmp_path):
+    replay_dir = replay_tree / "replays" / "r1"
+    input_sig = input_signature(replay_dir)
+    summary_path = tmp_path / "out" / "batch_summary.json"
+    output = tmp_path / "out" / "r1_master.mpk.gz"
+    output.parent.mkdir()
+    output.write_bytes(b"")
+    result = ReplayResult(
+        "r1", str(replay_dir), ReplayStatus.OK, input_signature=input_sig, settings_signature="s1", outputs=[str(output)]
+    )
+    totals = write_summary(summary_path, {"r1": result}, elapsed_seconds=30.0, other_records={"old": {"status": "ok"}})
+
+    assert totals["ok"] == 1 and totals["replays_per_minute"] == 2.0
+    assert set(json.loads(summary_path.read_text())["replays"]) == {"r1", "old"}
+    previous = load_summary(summary_path)["r1"]
+    assert is_up_to_date(previous, input_sig, "s1")
+    assert not is_up_to_date(previous, input_sig, "s2")
+    # Records without outputs (e.g. from older summaries) never count as up to date.
+    assert not is_up_to_date({**previous, "outputs": []}, input_sig, "s1")
+    output.unlink()
+    assert not is_up_to_date(previous, input_sig, "s1")
+    output.write_bytes(b"")
+
+    stat = os.stat(replay_dir / "unit_events.mpk")
+    os.utime(replay_dir / "unit_events.mpk", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert not is_up_to_date(previous, input_signature(replay_dir), "s1")
+
+
+def test_settings_signature_changes_with_the_output_schema_version(monkeypatch, tmp_path):
+    from tubuin_processor.core.output_strategies import OutputFormat, STRATEGY_MAP
+    from tubuin_processor.main import PipelineOptions, _batch_settings_signature
+
+    options = PipelineOptions(output_format=OutputFormat.COLUMNAR_ZST)
+    before = _batch_settings_signature(options, str(tmp_path), None)
+    assert _batch_settings_signature(options, str(tmp_path), None) == before
+    monkeypatch.setattr(STRATEGY_MAP[OutputFormat.COLUMNAR_ZST], "schema_version", "0.0-older")
+    assert _batch_settings_signature(options, str(tmp_path), None) != before
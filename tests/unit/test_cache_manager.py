@@ -0,0 +1,213 @@
+from functools import partial
+import inspect
+
+import msgpack
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from tubuin_processor.config.dynamic_config_builder import TransformPlan
+from tubuin_processor.core import cache_manager
+from tubuin_processor.core.aggregator import perform_aggregations
+from tubuin_processor.core.cache_manager import (
+    CacheKey,
+    CachePolicy,
+    StatResultCache,
+    aspect_fingerprint,
+    inspect_cache,
+    load_cached_aspects,
+    prune_cache,
+    save_aspects_to_cache,
+    verify_cache,
+)
+from tubuin_processor.core.columnar_decoder import decode_aspect_to_frame
+from tubuin_processor.core.ingestion import index_mpk_files
+from tubuin_processor.core.stats import STATS_REGISTRY
+from tubuin_processor.core.stats import merging
+from tubuin_processor.core.stats.types import Stat
+
+
+@pytest.fixture
+def unit_events_bytes() -> bytes:
+    rows = [[frame, frame, 101, 0, 10, 20, 30, None, None, None, 1 + frame % 3] for frame in range(100)]
+    return b"".join(msgpack.packb(row) for row in rows)
+
+
+@pytest.fixture
+def unit_events_df(unit_events_bytes):
+    return decode_aspect_to_frame("unit_events", unit_events_bytes)
+
+
+def _cache_files(cache_dir):
+    return sorted(p.name for p in (cache_dir / "aspects" / "unit_events").iterdir())
+
+
+def _save_replays(cache_dir, unit_events_bytes, unit_events_df, count):
+    """Caches `count` distinct inputs, one at a time, and returns their keys."""
+    keys = []
+    for i in range(count):
+        key = {"unit_events": CacheKey.for_source("unit_events", unit_events_bytes + bytes([i]))}
+        save_aspects_to_cache({"unit_events": unit_events_df}, str(cache_dir), key)
+        keys.append(key)
+    return keys
+
+
+def test_cached_frames_round_trip_memory_mapped(unit_events_bytes, unit_events_df, tmp_path):
+    keys = {"unit_events": CacheKey.for_source("unit_events", unit_events_bytes)}
+    save_aspects_to_cache({"unit_events": unit_events_df}, str(tmp_path), keys)
+    hits = load_cached_aspects(str(tmp_path), keys)
+    assert_frame_equal(hits["unit_events"], unit_events_df)
+    assert (hits["unit_events"]["event_type"] == unit_events_df["event_type"]).all()
+
+    other_input = {"unit_events": CacheKey.for_source("unit_events", unit_events_bytes[:-13])}
+    assert load_cached_aspects(str(tmp_path), other_input) == {}
+
+
+def test_keys_are_content_addressed(unit_events_bytes, tmp_path):
+    """The same bytes get the same key whether held in memory or memory-mapped, under any replay."""
+    for replay_id in ("replay-1", "replay-2"):
+        (tmp_path / replay_id).mkdir()
+        (tmp_path / replay_id / "unit_events.mpk").write_bytes(unit_events_bytes)
+    keys = {CacheKey.for_source("unit_events", index_mpk_files([str(tmp_path / r)])["unit_events"]) for r in ("replay-1", "replay-2")}
+    assert keys == {CacheKey.for_source("unit_events", unit_events_bytes)}
+
+
+def test_schema_change_only_invalidates_its_aspect(unit_events_bytes, unit_events_df, tmp_path, monkeypatch):
+    damage_fingerprint = aspect_fingerprint("damage_log")
+    keys = {"unit_events": CacheKey.for_source("unit_events", unit_events_bytes)}
+    save_aspects_to_cache({"unit_events": unit_events_df}, str(tmp_path), keys)
+
+    monkeypatch.setitem(cache_manager.TRANSFORM_PLANS, "unit_events", TransformPlan("unit_events", scales={"x": 10.0}))
+    aspect_fingerprint.cache_clear()
+    try:
+        assert aspect_fingerprint("damage_log") == damage_fingerprint
+        new_keys = {"unit_events": CacheKey.for_source("unit_events", unit_events_bytes)}
+        assert new_keys != keys
+        assert load_cached_aspects(str(tmp_path), new_keys) == {}
+        # Writing the new version replaces the stale entry for the same input.
+        save_aspects_to_cache({"unit_events": unit_events_df}, str(tmp_path), new_keys)
+        assert _cache_files(tmp_path) == [new_keys["unit_events"].filename]
+    finally:
+        aspect_fingerprint.cache_clear()
+
+
+def test_unreadable_cache_file_is_a_miss(unit_events_bytes, unit_events_df, tmp_path):
+    keys = {"unit_events": CacheKey.for_source("unit_events", unit_events_bytes)}
+    save_aspects_to_cache({"unit_events": unit_events_df}, str(tmp_path), keys)
+    (tmp_path / "aspects" / "unit_events" / keys["unit_events"].filename).write_bytes(b"not arrow")
+    assert load_cached_aspects(str(tmp_path), keys) == {}
+
+
+def test_projected_entries_are_served_and_replaced_by_full_frames(unit_events_bytes, unit_events_df, tmp_path):
+    columns = ("frame", "unit_id")
+    key = CacheKey.for_source("unit_events", unit_events_bytes, columns)
+    save_aspects_to_cache({"unit_events": unit_events_df.select(columns)}, str(tmp_path), {"unit_events": key})
+    assert_frame_equal(load_cached_aspects(str(tmp_path), {"unit_events": key})["unit_events"], unit_events_df.select(columns))
+    assert load_cached_aspects(str(tmp_path), {"unit_events": key.projected(None)}) == {}
+
+    full_key = key.projected(None)
+    save_aspects_to_cache({"unit_events": unit_events_df}, str(tmp_path), {"unit_events": full_key})
+    assert _cache_files(tmp_path) == [full_key.filename]
+    other_key = key.projected(["unit_id", "event_type"])
+    hits = load_cached_aspects(str(tmp_path), {"unit_events": other_key})
+    assert_frame_equal(hits["unit_events"], unit_events_df.select("unit_id", "event_type"))
+
+
+def test_index_tracks_size_and_evicts_least_recently_used(unit_events_bytes, unit_events_df, tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(cache_manager.time, "time", lambda: next(clock))
+    keys = _save_replays(tmp_path, unit_events_bytes, unit_events_df, 3)
+    entries = inspect_cache(str(tmp_path))
+    assert [e.entry_id for e in entries] == [f"aspects/unit_events/{k['unit_events'].filename}" for k in keys]
+    entry_size = entries[0].size
+    assert entry_size == (tmp_path / entries[0].entry_id).stat().st_size
+
+    # Reading the oldest entry makes the second one the least recently used.
+    load_cached_aspects(str(tmp_path), keys[0])
+    policy = CachePolicy(max_bytes=3 * entry_size)
+    save_aspects_to_cache(
+        {"unit_events": unit_events_df}, str(tmp_path),
+        {"unit_events": CacheKey.for_source("unit_events", unit_events_bytes + b"new")}, policy,
+    )
+    assert keys[1]["unit_events"].filename not in _cache_files(tmp_path)
+    assert keys[0]["unit_events"].filename in _cache_files(tmp_path)
+    assert len(inspect_cache(str(tmp_path))) == 3
+
+
+def test_prune_by_age_and_legacy_files(unit_events_bytes, unit_events_df, tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000, 100))
+    monkeypatch.setattr(cache_manager.time, "time", lambda: next(clock))
+    keys = _save_replays(tmp_path, unit_events_bytes, unit_events_df, 2)
+    (tmp_path / "replay_qualified_data.mpkcache").write_bytes(b"old")
+
+    removed = prune_cache(str(tmp_path), CachePolicy(max_age_seconds=150))
+    assert removed == ["replay_qualified_data.mpkcache", f"aspects/unit_events/{keys[0]['unit_events'].filename}"]
+    assert _cache_files(tmp_path) == [keys[1]["unit_events"].filename]
+
+
+def test_verify_reports_and_fixes_problems(unit_events_bytes, unit_events_df, tmp_path):
+    keys = _save_replays(tmp_path, unit_events_bytes, unit_events_df, 2)
+    assert verify_cache(str(tmp_path)) == []
+    corrupt_id = f"aspects/unit_events/{keys[0]['unit_events'].filename}"
+    (tmp_path / corrupt_id).write_bytes(b"not arrow")
+    (tmp_path / "index.json").unlink()
+
+    problems = verify_cache(str(tmp_path))
+    assert [entry_id for entry_id, problem in problems if problem.startswith("unreadable")] == [corrupt_id]
+    verify_cache(str(tmp_path), fix=True)
+    assert verify_cache(str(tmp_path)) == []
+    assert _cache_files(tmp_path) == [keys[1]["unit_events"].filename]
+
+
+_stat_calls = []
+
+
+def _count_rows(dataframes, column="frame"):
+    _stat_calls.append(column)
+    return dataframes["unit_events"].select(pl.col(column).count())
+
+
+def test_stat_results_are_only_recomputed_when_inputs_or_stat_change(unit_events_df, tmp_path, monkeypatch):
+    calls = _stat_calls
+    calls.clear()
+    monkeypatch.setitem(STATS_REGISTRY, "row_count", Stat(partial(_count_rows, column="frame"), "Counts rows."))
+    inputs = {"unit_events": unit_events_df}
+
+    def run(input_fingerprints):
+        stats, _ = perform_aggregations(inputs, ["row_count"], [], StatResultCache(str(tmp_path), input_fingerprints))
+        return stats["row_count"]
+
+    first = run({"unit_events": "a"})
+    assert_frame_equal(run({"unit_events": "a"}), first)
+    assert len(calls) == 1
+    run({"unit_events": "b"})
+    assert len(calls) == 2
+
+    # New parameters change the stat's fingerprint and replace its stale result.
+    monkeypatch.setitem(STATS_REGISTRY, "row_count", Stat(partial(_count_rows, column="unit_id"), "Counts rows."))
+    run({"unit_events": "a"})
+    assert calls == ["frame", "frame", "unit_id"]
+    assert len(list((tmp_path / "stats" / "row_count").iterdir())) == 2
+
+
+def test_stats_reading_derived_tables_are_keyed_by_their_sources():
+    stat = Stat(_count_rows, "", inputs={"unit_lifespans": ("unit_id",)})
+    key = StatResultCache("unused", {"unit_events": "a", "team_stats": "a"}).key_for("lifespan_count", stat)
+    assert key == StatResultCache("unused", {"unit_events": "a", "team_stats": "b"}).key_for("lifespan_count", stat)
+    assert key != StatResultCache("unused", {"unit_events": "b", "team_stats": "a"}).key_for("lifespan_count", stat)
+
+
+def test_stat_fingerprints_cover_imported_package_modules(monkeypatch):
+    uses_merging, other = STATS_REGISTRY["resources_by_player"], STATS_REGISTRY["army_value_timeline"]
+    before = cache_manager.stat_fingerprint(uses_merging), cache_manager.stat_fingerprint(other)
+    getsource = inspect.getsource
+    monkeypatch.setattr(inspect, "getsource", lambda obj: getsource(obj) + ("# changed" if obj is merging else ""))
+    cache_manager.stat_fingerprint.cache_clear()
+    cache_manager._module_source_digest.cache_clear()
+    try:
+        # Changing a shared helper only invalidates the stats importing it.
+        assert cache_manager.stat_fingerprint(uses_merging) != before[0]
+        assert cache_manager.stat_fingerprint(other) == before[1]
+    finally:
+        cache_manager.stat_fingerprint.cache_clear()
+        cache_manager._module_source_digest.cache_clear()
@@ -0,0 +1,215 @@
+import msgpack
+import pytest
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from tubuin_processor.core.columnar_decoder import (
+    BatchOptions,
+    IpcFrame,
+    SpilledFrame,
+    concat_aspect_frames,
+    decode_aspect_in_batches,
+    decode_aspect_to_frame,
+    iter_aspect_batches,
+    resolve_projection,
+)
+from tubuin_processor.core.dataframe_creator import create_polars_dataframe_for_aspect
+from tubuin_processor.core.decoder import stream_decode_aspect
+from tubuin_processor.core.exceptions import SchemaValidationError, TransformationError
+from tubuin_processor.core.value_transformer import stream_transform_aspect
+
+
+def _pack_rows(rows) -> bytes:
+    return b"".join(msgpack.packb(row) for row in rows)
+
+
+def _row_engine_frame(aspect_name: str, raw_bytes: bytes, skip_on_error: bool = False) -> pl.DataFrame:
+    """Runs the reference row-by-row pipeline (Steps 2, 4 and 5)."""
+    raw_models = stream_decode_aspect(aspect_name, raw_bytes, skip_on_error)
+    clean_models = list(stream_transform_aspect(aspect_name, raw_models, skip_on_error))
+    return create_polars_dataframe_for_aspect(aspect_name, clean_models)
+
+
+@pytest.fixture
+def sample_unit_events() -> bytes:
+    """Rows of varying length, as emitted by the game for unit_events."""
+    return _pack_rows([
+        [30, 1, 101, 0, 10, 20, 30, None, None, None, 1],
+        [60, 1, 101, 0, 12, 20, 33, None, None, None, 2, None, None],
+        [90, 2, 102, 1, 50, 0, 50, 1, 101, 0, 3, None, None, 1, 4],
+    ])
+
+
+@pytest.fixture
+def sample_damage_log() -> bytes:
+    """Dequantized, nullable and boolean columns."""
+    return _pack_rows([
+        [30, 1, 0, 2, 102, 1, 101, 7, 500, 1234, False, 50, 0, 50],
+        [31, 1, None, 2, 102, None, None, 7, 501, 5, True, 50, 0, 50],
+    ])
+
+
+@pytest.mark.parametrize("fixture_name, aspect_name", [
+    ("sample_unit_events", "unit_events"),
+    ("sample_damage_log", "damage_log"),
+])
+def test_columnar_engine_matches_row_engine(request, fixture_name, aspect_name):
+    raw_bytes = request.getfixturevalue(fixture_name)
+    assert_frame_equal(decode_aspect_to_frame(aspect_name, raw_bytes), _row_engine_frame(aspect_name, raw_bytes))
+
+
+def test_columnar_engine_coerces_integral_floats_like_row_engine():
+    """team_stats counters sometimes arrive as integral floats, e.g. `3.0`."""
+    row = [float(v) for v in range(39)]
+    raw_bytes = _pack_rows([row, list(range(39))])
+    result = decode_aspect_to_frame("team_stats", raw_bytes)
+    assert_frame_equal(result, _row_engine_frame("team_stats", raw_bytes))
+    assert result["metal_used"].to_list() == [0.2, 0.2]
+
+
+def test_columnar_engine_raises_on_invalid_row():
+    raw_bytes = _pack_rows([[30, 1, 0, 2, 102, 1, 101, 7, 500, "bad", False, 50, 0, 50]])
+    with pytest.raises(SchemaValidationError, match="damage"):
+        decode_aspect_to_frame("damage_log", raw_bytes)
+
+
+def test_columnar_engine_skips_invalid_rows_and_enums():
+    raw_bytes = _pack_rows([
+        [30, 1, 101, 0, 10, 20, 30, None, None, None, 1],
+        [31, "bad", 101, 0, 10, 20, 30, None, None, None, 1],
+        [32, 3, 101, 0, 10, 20, 30, None, None, None, 999],
+    ])
+    with pytest.raises(SchemaValidationError, match="unit_id"):
+        decode_aspect_to_frame("unit_events", raw_bytes)
+    with pytest.raises(TransformationError, match="event_type"):
+        decode_aspect_to_frame("unit_events", _pack_rows([[32, 3, 101, 0, 10, 20, 30, None, None, None, 999]]))
+
+    result = decode_aspect_to_frame("unit_events", raw_bytes, skip_on_error=True)
+    assert result["frame"].to_list() == [30]
+    assert result["event_type"].cast(pl.Utf8).to_list() == ["CREATED"]
+
+
+@pytest.mark.parametrize("decode", [decode_aspect_to_frame, _row_engine_frame])
+def test_invalid_optional_enum_fails_the_row_in_both_engines(decode):
+    """commands_log.cmd_name is optional, but an unknown command is still an invalid row."""
+    raw_bytes = _pack_rows([
+        [30, 1, 101, 5, 1, 0, None, 0, 0, 0],
+        [31, 1, 101, 5, 999999, 0, None, 0, 0, 0],
+        [32, 1, 101, 5, None, 0, None, 0, 0, 0],
+    ])
+    with pytest.raises(TransformationError, match="row 1"):
+        decode("commands_log", raw_bytes)
+
+    result = decode("commands_log", raw_bytes, skip_on_error=True)
+    assert result["frame"].to_list() == [30, 32]
+    assert result["cmd_name"].cast(pl.Utf8).to_list() == ["BUILD", None]
+    assert_frame_equal(result, decode_aspect_to_frame("commands_log", raw_bytes, skip_on_error=True))
+
+
+def test_columnar_engine_skips_over_long_rows_like_row_engine():
+    row = [30, 1, 0, 2, 102, 1, 101, 7, 500, 1234, False, 50, 0, 50]
+    raw_bytes = _pack_rows([row, row + [0], row])
+    result = decode_aspect_to_frame("damage_log", raw_bytes, skip_on_error=True)
+    assert result.height == 2
+    assert_frame_equal(result, _row_engine_frame("damage_log", raw_bytes, skip_on_error=True))
+
+    # A batch of only over-long rows still has every column, and no rows.
+    empty = decode_aspect_to_frame("damage_log", _pack_rows([row + [0]]), skip_on_error=True)
+    assert empty.columns == result.columns and empty.height == 0
+
+
+@pytest.mark.parametrize("decode", [decode_aspect_to_frame, _row_engine_frame])
+@pytest.mark.parametrize("value", [2**63, 2**64 - 1])
+def test_out_of_range_ints_are_validation_failures_in_both_engines(decode, value):
+    row = [30, 1, 0, 2, 102, 1, 101, 7, 500, 1234, False, 50, 0, 50]
+    bad = list(row)
+    bad[1] = value
+    raw_bytes = _pack_rows([row, bad, row])
+    with pytest.raises(SchemaValidationError, match="Int64"):
+        decode("damage_log", raw_bytes)
+
+    result = decode("damage_log", raw_bytes, skip_on_error=True)
+    assert result.height == 2
+    assert_frame_equal(result, decode_aspect_to_frame("damage_log", _pack_rows([row, row])))
+
+
+@pytest.mark.parametrize("fixture_name, aspect_name, columns", [
+    ("sample_unit_events", "unit_events", {"event_type", "frame", "unit_team_id"}),
+    ("sample_damage_log", "damage_log", {"damage", "victim_pos_x"}),
+    ("many_unit_events", "unit_events", {"unit_id", "frame"}),
+])
+def test_projected_decode_matches_full_decode(request, fixture_name, aspect_name, columns):
+    raw_bytes = request.getfixturevalue(fixture_name)
+    projection = resolve_projection(aspect_name, columns)
+    assert set(projection) == columns
+    expected = decode_aspect_to_frame(aspect_name, raw_bytes).select(projection)
+    assert_frame_equal(decode_aspect_to_frame(aspect_name, raw_bytes, columns=projection), expected)
+    batched = decode_aspect_in_batches(aspect_name, raw_bytes, BatchOptions(batch_rows=2), columns=projection)
+    assert_frame_equal(batched, expected)
+
+
+def test_projection_skips_unused_values():
+    assert resolve_projection("unit_events", None) is None
+    assert resolve_projection("unit_events", decode_aspect_to_frame("unit_events", b"").columns) is None
+    raw_bytes = _pack_rows([
+        [30, 1, 101, 0, 10, 20, 30, None, None, None, 1],
+        [31, "bad", 101, 0, 10, 20, 30, None, None, None, 999],
+    ])
+    result = decode_aspect_to_frame("unit_events", raw_bytes, columns=resolve_projection("unit_events", {"frame"}))
+    assert result.columns == ["frame"]
+    assert result["frame"].to_list() == [30, 31]
+
+    # Over-long rows are still dropped when only some of their values are read.
+    row = [30, 1, 0, 2, 102, 1, 101, 7, 500, 1234, False, 50, 0, 50]
+    raw_bytes = _pack_rows([row, row + [0]])
+    projection = resolve_projection("damage_log", {"damage"})
+    result = decode_aspect_to_frame("damage_log", raw_bytes, skip_on_error=True, columns=projection)
+    assert_frame_equal(result, decode_aspect_to_frame("damage_log", raw_bytes, skip_on_error=True).select(projection))
+
+
+@pytest.fixture
+def many_unit_events() -> bytes:
+    return _pack_rows([
+        [frame, frame % 7, 101, 0, 10, 20, 30, None, None, None, 1 + frame % 3]
+        for frame in range(1000)
+    ])
+
+
+def test_iter_aspect_batches_yields_bounded_batches(many_unit_events):
+    batches = list(iter_aspect_batches("unit_events", many_unit_events, batch_rows=300))
+    assert [b.height for b in batches] == [300, 300, 300, 100]
+    assert list(iter_aspect_batches("unit_events", b"", batch_rows=300))[0].is_empty()
+
+
+def test_batched_decode_matches_single_shot_and_spills(many_unit_events, tmp_path):
+    expected = decode_aspect_to_frame("unit_events", many_unit_events)
+
+    in_memory = decode_aspect_in_batches("unit_events", many_unit_events, BatchOptions(batch_rows=300))
+    assert_frame_equal(in_memory, expected)
+
+    spilled = decode_aspect_in_batches(
+        "unit_events", many_unit_events,
+        BatchOptions(batch_rows=300, max_memory_bytes=1, spill_dir=str(tmp_path)),
+    )
+    assert isinstance(spilled, SpilledFrame)
+    assert [str(p) for p in tmp_path.iterdir()] == [spilled.path]
+    loaded = spilled.load()
+    assert_frame_equal(loaded, expected)
+    # Re-categorized columns must still interoperate with other frames.
+    assert (loaded["event_type"] == expected["event_type"]).all()
+
+
+def test_batched_decode_reports_absolute_row_numbers(many_unit_events):
+    raw_bytes = many_unit_events + _pack_rows([[1000, "bad", 101, 0, 10, 20, 30, None, None, None, 1]])
+    with pytest.raises(SchemaValidationError) as excinfo:
+        decode_aspect_in_batches("unit_events", raw_bytes, BatchOptions(batch_rows=300))
+    assert "row 1000" in str(excinfo.value.__notes__)
+
+
+def test_ipc_frame_round_trips_clean_frames(sample_unit_events):
+    df = decode_aspect_to_frame("unit_events", sample_unit_events)
+    shipped = IpcFrame.from_frame("unit_events", df)
+    loaded = shipped.load()
+    assert_frame_equal(loaded, df)
+    assert (loaded["event_type"] == df["event_type"]).all()
+    assert_frame_equal(concat_aspect_frames([loaded, df]).head(3), df)
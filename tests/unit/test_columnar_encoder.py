@@ -0,0 +1,97 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from tubuin_processor.core.encoders.columnar_encoder import _series_to_bytes
+
+
+def _u32(*values):
+    return np.asarray(values, dtype="uint32").tobytes()
+
+
+def test_list_of_primitives():
+    series = pl.Series("ids", [[1, 2], None, [], [3]], dtype=pl.List(pl.Int16))
+    blobs, schema = _series_to_bytes(series)
+    # Null and empty lists hold no elements.
+    assert blobs == {"ids_offs": _u32(0, 2, 2, 2, 3), "ids_data": np.asarray([1, 2, 3], dtype="int16").tobytes()}
+    assert schema == [{"name": "ids", "dtype": "List(Int16)", "data_key": "ids_data", "offsets_key": "ids_offs"}]
+
+    floats = pl.Series("v", [[1.5, None]], dtype=pl.List(pl.Float32))
+    assert _series_to_bytes(floats)[0]["v_data"] == np.asarray([1.5, np.nan], dtype="float32").tobytes()
+    with pytest.raises(ValueError, match="list has None in non-float inner Int16"):
+        _series_to_bytes(pl.Series("ids", [[1, None]], dtype=pl.List(pl.Int16)))
+
+
+def test_list_of_structs():
+    dtype = pl.List(pl.Struct({"value": pl.Float64, "name": pl.Utf8}))
+    series = pl.Series("units", [[{"value": 7.0, "name": "a"}, None], None, [{"value": 8.0, "name": "bc"}]], dtype=dtype)
+    # Slicing checks that offsets are relative to the slice's own elements.
+    blobs, schema = _series_to_bytes(pl.concat([series.head(1), series]).slice(1))
+    assert blobs["units_list_offs"] == _u32(0, 2, 2, 3)
+    # A null struct element contributes a null to every field.
+    assert blobs["units__value_bin"] == np.asarray([7.0, np.nan, 8.0]).tobytes()
+    assert blobs["units__name_offs"] == _u32(0, 1, 1, 3)
+    assert blobs["units__name_data"] == b"abc"
+    assert [entry["name"] for entry in schema[0]["struct_fields"]] == ["units__value", "units__name"]
+
+
+def test_utf8_column():
+    series = pl.Series("player_name", ["x", "ab", None, "héllo", "🙂", ""])
+    blobs, schema = _series_to_bytes(series.slice(1))
+    # Offsets count UTF-8 bytes; null strings are empty.
+    assert blobs == {
+        "player_name_offs": _u32(0, 2, 2, 8, 12, 12),
+        "player_name_data": "abhéllo🙂".encode(),
+    }
+    assert schema == [{"name": "player_name", "dtype": "Utf8", "data_key": "player_name_data", "offsets_key": "player_name_offs"}]
+    assert _series_to_bytes(pl.Series("s", [None], dtype=pl.Utf8))[0] == {"s_offs": _u32(0, 0), "s_data": b""}
+
+
+def test_dictionary_encoding():
+    series = pl.Series("weapon", ["laser", None, "gauss", "laser"])
+    blobs, schema = _series_to_bytes(series, "dictionary")
+    # The dictionary is sorted; null strings are empty, as in the plain encoding.
+    assert blobs == {
+        "weapon__dict_offs": _u32(0, 0, 5, 10),
+        "weapon__dict_data": b"gausslaser",
+        "weapon_codes": np.asarray([2, 0, 1, 2], dtype="uint8").tobytes(),
+    }
+    assert schema == [
+        {
+            "name": "weapon",
+            "dtype": "Utf8",
+            "encoding": "dictionary",
+            "data_key": "weapon_codes",
+            "codes_dtype": "UInt8",
+            "dictionary": {"name": "weapon__dict", "dtype": "Utf8", "data_key": "weapon__dict_data", "offsets_key": "weapon__dict_offs"},
+        }
+    ]
+
+    wide = pl.Series("unit_id", list(range(300)) * 2, dtype=pl.Int32)
+    assert _series_to_bytes(wide, "dictionary")[1][0]["codes_dtype"] == "UInt16"
+    # "auto" keeps columns plain unless they have few distinct values and shrink.
+    assert "encoding" not in _series_to_bytes(wide, "auto")[1][0]
+    team_ids = pl.Series("team_id", [3, 1, 3, 3] * 10, dtype=pl.Int64)
+    blobs, schema = _series_to_bytes(team_ids, "auto")
+    assert blobs["team_id__dict_bin"] == np.asarray([1, 3], dtype="int64").tobytes()
+    assert schema[0]["codes_dtype"] == "UInt8" and len(blobs["team_id_codes"]) == 40
+    # Floats are never dictionary-encoded.
+    assert _series_to_bytes(pl.Series("x", [1.0, 1.0]), "dictionary")[1][0] == {"name": "x", "dtype": "Float64", "data_key": "x_bin"}
+
+
+def test_delta_and_frame_of_reference_encodings():
+    frames = pl.Series("frame", [300, 300, 310, 565], dtype=pl.Int32)
+    blobs, schema = _series_to_bytes(frames, "delta")
+    # Sorted columns store unsigned differences from the previous row, narrowed to fit.
+    assert blobs == {"frame_delta": np.asarray([0, 0, 10, 255], dtype="uint8").tobytes()}
+    assert schema == [{"name": "frame", "dtype": "Int32", "encoding": "delta", "data_key": "frame_delta", "storage_dtype": "UInt8", "base": 300}]
+    assert _series_to_bytes(frames.reverse(), "delta")[1][0]["storage_dtype"] == "Int16"
+
+    ids = pl.Series("unit_id", [-1, 70000, 69990], dtype=pl.Int64)
+    blobs, schema = _series_to_bytes(ids, "frame_of_reference")
+    assert blobs == {"unit_id_for": np.asarray([0, 70001, 69991], dtype="uint32").tobytes()}
+    assert schema[0]["base"] == -1 and schema[0]["storage_dtype"] == "UInt32"
+
+    # Columns the encodings cannot represent stay plain.
+    for series in (pl.Series("x", [0.5]), pl.Series("n", [], dtype=pl.Int32), pl.Series("u", [0, 2**64 - 1], dtype=pl.UInt64)):
+        assert "encoding" not in _series_to_bytes(series, "delta")[1][0]
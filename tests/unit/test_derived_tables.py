@@ -0,0 +1,47 @@
+import polars as pl
+
+from tubuin_processor.core.aggregator import perform_aggregations
+from tubuin_processor.core.stats import STATS_REGISTRY, required_inputs
+from tubuin_processor.core.stats.derived_tables import DERIVED_TABLES, build_derived_tables
+from tubuin_processor.core.stats.types import Stat
+
+UNIT_EVENTS = pl.DataFrame(
+    {
+        "frame": [10, 5, 40, 60, 20, 30],
+        "unit_id": [1, 1, 1, 1, 2, 3],
+        "unit_def_id": [7, 7, 7, 7, 8, 9],
+        "unit_team_id": [0, 0, 1, 1, 1, 2],
+        "event_type": ["FINISHED", "CREATED", "GIVEN", "DESTROYED", "CREATED", "DESTROYED"],
+    }
+)
+UNIT_POSITIONS = pl.DataFrame({"frame": [0, 0, 30, 30], "unit_id": [2, 1, 2, 1], "x": [1, 2, 3, 4], "y": [0, 0, 0, 0]})
+
+
+def test_unit_lifespans():
+    tables = build_derived_tables(["unit_lifespans"], {"unit_events": UNIT_EVENTS})
+    assert tables["unit_lifespans"].to_dicts() == [
+        # Unit 1 was given away, but it is counted for the team it was finished for.
+        {"unit_id": 1, "unit_def_id": 7, "unit_team_id": 0, "created_frame": 5, "finished_frame": 10, "death_frame": 60},
+        {"unit_id": 2, "unit_def_id": 8, "unit_team_id": 1, "created_frame": 20, "finished_frame": None, "death_frame": None},
+        {"unit_id": 3, "unit_def_id": 9, "unit_team_id": 2, "created_frame": None, "finished_frame": None, "death_frame": 30},
+    ]
+
+
+def test_unit_positions_by_unit_and_missing_inputs():
+    tables = build_derived_tables(["unit_lifespans", "unit_positions_by_unit"], {"unit_positions": UNIT_POSITIONS})
+    assert tables["unit_positions_by_unit"].select("unit_id", "frame").rows() == [(1, 0), (1, 30), (2, 0), (2, 30)]
+    assert tables["unit_lifespans"].is_empty()
+    assert tables["unit_lifespans"].schema == pl.Schema(DERIVED_TABLES["unit_lifespans"].schema)
+
+
+def test_stats_read_declared_derived_tables(monkeypatch):
+    def deaths(dataframes):
+        assert "unit_positions_by_unit" not in dataframes
+        return dataframes["unit_lifespans"].filter(pl.col("death_frame").is_not_null()).select("unit_id")
+
+    monkeypatch.setitem(STATS_REGISTRY, "deaths", Stat(deaths, "", inputs={"unit_lifespans": ("unit_id", "death_frame")}))
+    # Derived tables are decoded as the inputs they are built from.
+    assert required_inputs(["deaths"], []) == {"unit_events": set(DERIVED_TABLES["unit_lifespans"].inputs["unit_events"])}
+
+    stats, _ = perform_aggregations({"unit_events": UNIT_EVENTS}, ["deaths"], [])
+    assert stats["deaths"]["unit_id"].to_list() == [1, 3]
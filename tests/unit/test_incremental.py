@@ -0,0 +1,69 @@
+import msgpack
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from tubuin_processor.core.aggregator import perform_aggregations
+from tubuin_processor.core.columnar_decoder import decode_aspect_to_frame
+from tubuin_processor.core.incremental import IncrementalReplay, IncrementalStatResults
+from tubuin_processor.core.stats import STATS_REGISTRY
+from tubuin_processor.core.stats.merging import merge_sums
+from tubuin_processor.core.stats.types import Stat
+
+ROWS = b"".join(msgpack.packb([frame, frame, 101, frame % 2, 10, 20, 30, None, None, None, 1]) for frame in range(100))
+
+_seen_rows = []
+
+
+def _rows_per_team(dataframes):
+    _seen_rows.append(dataframes["unit_events"].height)
+    return dataframes["unit_events"].group_by("unit_team_id").len().sort("unit_team_id")
+
+
+def _refresh(cache_dir, data, stat_names=("rows_per_team",)):
+    """One `--incremental` run over `data` as the current contents of the aspect file."""
+    replay = IncrementalReplay.load(str(cache_dir), "live")
+    to_decode = replay.resume({"unit_events": data}, {}, skip_on_error=False)
+    decoded = {name: decode_aspect_to_frame(name, source) for name, source in to_decode.items()}
+    dataframes = replay.append(decoded)
+    stats, _ = perform_aggregations(dataframes, list(stat_names), [], IncrementalStatResults(replay, dataframes, {}))
+    replay.save()
+    return len(to_decode.get("unit_events", b"")), dataframes, stats
+
+
+def test_only_appended_rows_are_decoded_and_merged(tmp_path, monkeypatch):
+    _seen_rows.clear()
+    monkeypatch.setitem(STATS_REGISTRY, "rows_per_team", Stat(_rows_per_team, "", merge=merge_sums(["unit_team_id"], "unit_team_id")))
+    full = decode_aspect_to_frame("unit_events", ROWS)
+
+    # The file ends in a partial row, which is left for the next run.
+    decoded_bytes, dataframes, _ = _refresh(tmp_path, ROWS[:500])
+    first_bytes = decoded_bytes
+    assert first_bytes < 500 and _seen_rows == [dataframes["unit_events"].height]
+
+    decoded_bytes, dataframes, stats = _refresh(tmp_path, ROWS)
+    assert decoded_bytes == len(ROWS) - first_bytes
+    assert_frame_equal(dataframes["unit_events"], full)
+    # The stat only saw the appended rows, and its merged result matches a full computation.
+    assert _seen_rows[1] == 100 - _seen_rows[0]
+    assert_frame_equal(stats["rows_per_team"], _rows_per_team({"unit_events": full}))
+
+    # Nothing new: nothing is decoded or computed.
+    decoded_bytes, _, stats = _refresh(tmp_path, ROWS)
+    assert decoded_bytes == 0 and len(_seen_rows) == 3
+    assert stats["rows_per_team"]["len"].to_list() == [50, 50]
+
+
+def test_rewritten_files_and_unmergeable_stats_start_over(tmp_path, monkeypatch):
+    _seen_rows.clear()
+    monkeypatch.setitem(STATS_REGISTRY, "rows_per_team", Stat(_rows_per_team, ""))
+    _refresh(tmp_path, ROWS[:600])
+    _refresh(tmp_path, ROWS)
+    # Without `merge`, the stat is recomputed over the full frame.
+    assert _seen_rows[1] == 100
+
+    # A different file under the same path is decoded from scratch.
+    other = b"".join(msgpack.packb([frame, frame, 7, 2, 0, 0, 0, None, None, None, 1]) for frame in range(10))
+    decoded_bytes, dataframes, stats = _refresh(tmp_path, other)
+    assert decoded_bytes == len(other) and dataframes["unit_events"].height == 10
+    assert stats["rows_per_team"].to_dicts() == [{"unit_team_id": 2, "len": 10}]
+    assert len(list(tmp_path.glob("incremental/live/unit_events.*.arrow"))) == 1
@@ -0,0 +1,61 @@
+import mmap
+import pickle
+
+import msgpack
+from polars.testing import assert_frame_equal
+
+from tubuin_processor.core.columnar_decoder import decode_aspect_to_frame
+from tubuin_processor.core.ingestion import AspectFileRef, index_mpk_files, load_mpk_files, open_aspect_source
+
+
+def _write_aspect(path, rows) -> bytes:
+    data = b"".join(msgpack.packb(row) for row in rows)
+    path.write_bytes(data)
+    return data
+
+
+def test_index_mpk_files_returns_picklable_refs(tmp_path):
+    data = _write_aspect(tmp_path / "start_pos.mpk", [[1, "p1", "armcom", 5, 0, 0, 0]])
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    refs = index_mpk_files([str(tmp_path)])
+
+    assert list(refs) == ["start_pos"]
+    ref = refs["start_pos"]
+    assert (ref.offset, len(ref)) == (0, len(data))
+    assert pickle.loads(pickle.dumps(ref)) == ref
+    with open_aspect_source(ref) as mapped:
+        assert mapped.read() == data
+
+
+def test_mapped_ref_decodes_like_loaded_bytes(tmp_path):
+    rows = [[i, 1, 101, 0, 10, 20, 30, None, None, None, 1] for i in range(100)]
+    _write_aspect(tmp_path / "unit_events.mpk", rows)
+
+    loaded = load_mpk_files([str(tmp_path)])["unit_events"]
+    ref = index_mpk_files([str(tmp_path)])["unit_events"]
+    with open_aspect_source(ref) as mapped:
+        from_mmap = decode_aspect_to_frame("unit_events", mapped)
+
+    assert_frame_equal(from_mmap, decode_aspect_to_frame("unit_events", loaded))
+
+
+def test_ref_with_unaligned_offset_maps_only_its_range(tmp_path):
+    offset = mmap.ALLOCATIONGRANULARITY + 3
+    payload = b"payload"
+    path = tmp_path / "blob.mpk"
+    path.write_bytes(b"x" * offset + payload + b"trailing")
+
+    with AspectFileRef("blob", str(path), offset, len(payload)).open_mapped() as mapped:
+        assert mapped.read() == payload
+    with AspectFileRef("blob", str(path), offset, 0).open_mapped() as mapped:
+        assert mapped.read() == b""
+
+
+def test_only_requested_aspects_are_ingested(tmp_path):
+    _write_aspect(tmp_path / "start_pos.mpk", [[1, "p1", "armcom", 5, 0, 0, 0]])
+    _write_aspect(tmp_path / "team_stats.mpk", [[0] * 40])
+
+    assert list(load_mpk_files([str(tmp_path)], {"team_stats", "unit_defs"})) == ["team_stats"]
+    assert list(index_mpk_files([str(tmp_path)], {"team_stats"})) == ["team_stats"]
+    assert sorted(load_mpk_files([str(tmp_path)])) == ["start_pos", "team_stats"]
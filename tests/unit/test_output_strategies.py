@@ -0,0 +1,50 @@
+import struct
+
+import polars as pl
+import pytest
+
+from tubuin_processor.core.output_strategies import (
+    HybridMessagePackZstStrategy,
+    _get_struct_format_string,
+    _pack_row_major,
+)
+
+ROW_MAJOR = {"table": {"layout": "row-major-mixed", "null_encoding": 0}}
+
+
+def _pack_rows_with_struct(df):
+    """The row-by-row packing `_pack_row_major` replaces."""
+    packer = struct.Struct(_get_struct_format_string(df.dtypes))
+    return b"".join(packer.pack(*row) for row in df.iter_rows()), packer.size
+
+
+def test_pack_row_major_matches_struct_packing():
+    df = pl.DataFrame(
+        {
+            "i8": pl.Series([-128, 0, 127], dtype=pl.Int8),
+            "u8": pl.Series([0, 1, 255], dtype=pl.UInt8),
+            "i16": pl.Series([-32768, 5, 32767], dtype=pl.Int16),
+            "u16": pl.Series([0, 7, 65535], dtype=pl.UInt16),
+            "i32": pl.Series([-(2**31), 9, 2**31 - 1], dtype=pl.Int32),
+            "u32": pl.Series([0, 11, 2**32 - 1], dtype=pl.UInt32),
+            "i64": pl.Series([-(2**63), 13, 2**63 - 1], dtype=pl.Int64),
+            "u64": pl.Series([0, 15, 2**64 - 1], dtype=pl.UInt64),
+            "f32": pl.Series([-1.5, float("inf"), 3.4e38], dtype=pl.Float32),
+            "f64": pl.Series([float("nan"), -0.0, 1e-300], dtype=pl.Float64),
+        }
+    )
+    assert _pack_row_major(df) == _pack_rows_with_struct(df)
+    # A sliced frame packs only its own rows.
+    assert _pack_row_major(df.slice(1, 2)) == _pack_rows_with_struct(df.slice(1, 2))
+    assert _pack_row_major(df.clear()) == (b"", 42)
+
+    with pytest.raises(TypeError, match="Unsupported dtype"):
+        _pack_row_major(pl.DataFrame({"flag": [True]}))
+
+
+def test_row_major_streams_apply_null_encoding():
+    df = pl.DataFrame({"frame": pl.Series([1, 2], dtype=pl.UInt32), "x": pl.Series([None, -3], dtype=pl.Int16)})
+    schema, blobs = HybridMessagePackZstStrategy()._build_payloads({"unit_positions": (df, ROW_MAJOR)})
+    assert blobs["unit_positions"]["default"] == struct.pack("<Ih", 1, 0) + struct.pack("<Ih", 2, -3)
+    assert schema["unit_positions"]["row_byte_stride"] == 6
+    assert schema["unit_positions"]["byte_size"] == 12
@@ -0,0 +1,134 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tubuin_processor.batch import ReplayResult, ReplayStatus, load_summary
+from tubuin_processor.core.exceptions import ParserError
+from tubuin_processor.server import JobState, QueueFullError, ReplayServer, ReplayWatcher, start_listeners
+
+
+class _FakeProcess:
+    """Records processed replays; blocks while `gate` is clear."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, replay_id, replay_dir, input_sig):
+        self.gate.wait(5)
+        self.calls.append(replay_id)
+        output = replay_dir.parent / f"{replay_id}.out"
+        output.write_bytes(b"")
+        return ReplayResult(
+            replay_id, str(replay_dir), ReplayStatus.OK, input_signature=input_sig, settings_signature="s",
+            outputs=[str(output)],
+        )
+
+
+def _replay(root, name):
+    (root / name).mkdir(parents=True)
+    (root / name / "unit_events.mpk").write_bytes(b"\x90")
+    return root / name
+
+
+def _wait_done(server, job):
+    for _ in range(500):
+        if server.job(job.job_id).state == JobState.DONE:
+            return server.job(job.job_id)
+        threading.Event().wait(0.01)
+    raise AssertionError(f"Job {job.job_id} did not finish.")
+
+
+def test_jobs_are_queued_with_backpressure_and_up_to_date_replays_skipped(tmp_path):
+    process = _FakeProcess()
+    process.gate.clear()
+    server = ReplayServer(process, "s", tmp_path / "summary.json", jobs=1, max_queue=1)
+    try:
+        running = server.submit(_replay(tmp_path, "r1"))
+        while server.job(running.job_id).state != JobState.RUNNING:
+            threading.Event().wait(0.01)
+        queued = server.submit(_replay(tmp_path, "r2"))
+        # A queued replay is not queued twice, and a full queue refuses new replays.
+        assert server.submit(tmp_path / "r2") is queued
+        with pytest.raises(QueueFullError):
+            server.submit(_replay(tmp_path, "r3"))
+
+        process.gate.set()
+        assert _wait_done(server, queued).result.status == ReplayStatus.OK
+        assert set(load_summary(tmp_path / "summary.json")) == {"r1", "r2"}
+        assert server.submit(tmp_path / "r1").result.status == ReplayStatus.SKIPPED
+        assert _wait_done(server, server.submit(tmp_path / "r1", force=True)).result.status == ReplayStatus.OK
+        # A replay whose output was deleted is processed again.
+        (tmp_path / "r2.out").unlink()
+        assert _wait_done(server, server.submit(tmp_path / "r2")).result.status == ReplayStatus.OK
+        assert process.calls == ["r1", "r2", "r1", "r2"]
+    finally:
+        server.close()
+
+
+def test_watcher_submits_replay_folders_once_they_stop_changing(tmp_path):
+    process = _FakeProcess()
+    server = ReplayServer(process, "s", tmp_path / "summary.json")
+    watcher = ReplayWatcher(server, [tmp_path / "watch"])
+    try:
+        (tmp_path / "watch" / "empty").mkdir(parents=True)
+        replay_dir = _replay(tmp_path / "watch", "r1")
+        assert watcher.poll() == []
+        (replay_dir / "unit_positions.mpk").write_bytes(b"\x90")
+        assert watcher.poll() == []
+        jobs = watcher.poll()
+        assert [job.replay_id for job in jobs] == ["r1"]
+        _wait_done(server, jobs[0])
+        assert watcher.poll() == []
+    finally:
+        server.close()
+
+
+def test_http_api(tmp_path):
+    server = ReplayServer(_FakeProcess(), "s", tmp_path / "summary.json")
+    (listener, address), = start_listeners(server, port=0)
+
+    def request(path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        try:
+            with urllib.request.urlopen(urllib.request.Request(address + path, data=data)) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    try:
+        status, job = request("/jobs", {"input_dir": str(_replay(tmp_path, "r1"))})
+        assert status == 202 and job["replay_id"] == "r1"
+        _wait_done(server, server.job(job["job_id"]))
+        status, job = request(f"/jobs/{job['job_id']}")
+        assert status == 200 and job["state"] == "done" and job["result"]["status"] == "ok"
+        assert request("/jobs", {"input_dir": str(tmp_path / "missing")})[0] == 400
+        assert request("/jobs/999")[0] == 404
+        assert request("/health")[1]["status"] == "ok"
+    finally:
+        listener.shutdown()
+        listener.server_close()
+        server.close()
+
+
+def test_unix_listener_only_replaces_stale_sockets(tmp_path):
+    server = ReplayServer(_FakeProcess(), "s", tmp_path / "summary.json")
+    socket_path = tmp_path / "tube.sock"
+    try:
+        socket_path.write_text("not a socket")
+        with pytest.raises(ParserError, match="not a socket"):
+            start_listeners(server, socket_path=socket_path)
+        assert socket_path.read_text() == "not a socket"
+
+        socket_path.unlink()
+        for _ in range(2):  # The second start replaces the first one's socket.
+            (listener, address), = start_listeners(server, socket_path=socket_path)
+            listener.shutdown()
+            listener.server_close()
+            assert socket_path.is_socket()
+    finally:
+        server.close()
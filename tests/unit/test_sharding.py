@@ -0,0 +1,77 @@
+import msgpack
+import pytest
+from polars.testing import assert_frame_equal
+
+from tubuin_processor.core.columnar_decoder import concat_aspect_frames, decode_aspect_to_frame
+from tubuin_processor.core.decoder import DecodeEngine
+from tubuin_processor.core.exceptions import TransformationError
+from tubuin_processor.core.ingestion import index_mpk_files, open_aspect_source
+from tubuin_processor.core.sharding import (
+    MIN_SHARD_BYTES,
+    find_row_boundaries,
+    plan_shards,
+    shard_aspect,
+    target_shard_bytes,
+)
+from tubuin_processor.core.worker_pool import decode_shard
+
+
+@pytest.fixture
+def unit_events_bytes() -> bytes:
+    rows = [[frame, frame, 101, 0, 10, 20, 30, None, None, None, 1 + frame % 3] for frame in range(5000)]
+    return b"".join(msgpack.packb(row) for row in rows)
+
+
+def _decode_shards(shards):
+    frames = []
+    for shard in shards:
+        with open_aspect_source(shard.source) as raw_data:
+            frames.append(decode_aspect_to_frame(shard.aspect_name, raw_data, row_offset=shard.row_offset))
+    return concat_aspect_frames(frames)
+
+
+def test_target_shard_bytes_adapts_to_workers_and_size():
+    assert target_shard_bytes(100, 8) == MIN_SHARD_BYTES
+    assert target_shard_bytes(64 * 1024 * 1024, 8) == 4 * 1024 * 1024
+    assert target_shard_bytes(64 * 1024 * 1024, 16) == 2 * 1024 * 1024
+
+
+def test_row_boundaries_fall_on_row_starts(unit_events_bytes):
+    cuts = find_row_boundaries("unit_events", unit_events_bytes, 10_000)
+    assert cuts[0] == (0, 0)
+    assert len(cuts) > 3
+    for offset, row_index in cuts[1:]:
+        # Each shard must start with the row whose `frame` equals its row index.
+        first_row = msgpack.Unpacker(raw=False)
+        first_row.feed(unit_events_bytes[offset:])
+        assert next(first_row)[0] == row_index
+
+
+def test_sharded_decode_matches_whole_aspect(unit_events_bytes, tmp_path):
+    expected = decode_aspect_to_frame("unit_events", unit_events_bytes)
+
+    shards = shard_aspect("unit_events", unit_events_bytes, 10_000)
+    assert len(shards) > 3
+    assert_frame_equal(_decode_shards(shards), expected)
+
+    (tmp_path / "unit_events.mpk").write_bytes(unit_events_bytes)
+    file_shards = shard_aspect("unit_events", index_mpk_files([str(tmp_path)])["unit_events"], 10_000)
+    assert [len(s) for s in file_shards] == [len(s) for s in shards]
+    assert_frame_equal(_decode_shards(file_shards), expected)
+
+
+@pytest.mark.parametrize("engine", list(DecodeEngine))
+def test_sharded_decode_reports_absolute_row_numbers(engine):
+    rows = [[frame, frame, 101, 0, 10, 20, 30, None, None, None, 1] for frame in range(5000)]
+    rows[3000][-1] = 999  # not a UnitEventsEnum value
+    shards = shard_aspect("unit_events", b"".join(msgpack.packb(row) for row in rows), 10_000)
+    bad_shard = next(shard for shard in reversed(shards) if shard.row_offset <= 3000)
+    assert bad_shard.row_offset > 0
+
+    with pytest.raises(TransformationError, match=r"\(row 3000\)"):
+        decode_shard(bad_shard, skip_on_error=False, engine=engine, batch_options=None)
+
+
+def test_plan_shards_keeps_aspects_whole_for_one_worker(unit_events_bytes):
+    plan = plan_shards({"unit_events": unit_events_bytes}, workers=1)
+    assert len(plan["unit_events"]) == 1
@@ -0,0 +1,105 @@
+import threading
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from tubuin_processor.core.aggregator import perform_aggregations
+from tubuin_processor.core.stat_scheduler import StatScheduler, StatStatus
+from tubuin_processor.core.stats import STATS_REGISTRY
+from tubuin_processor.core.stats.types import Stat
+
+INPUTS = {"team_stats": pl.DataFrame({"team_id": [0, 1, 1], "metal_used": [1.0, 2.0, 3.0]})}
+
+
+def _metal_by_team(dataframes):
+    return dataframes["team_stats"].group_by("team_id").agg(pl.col("metal_used").sum()).sort("team_id")
+
+
+def _top_team(dataframes):
+    return dataframes["metal_by_team"].sort("metal_used", descending=True).head(1)
+
+
+def _fail(dataframes):
+    raise ValueError("boom")
+
+
+def test_stats_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(dataframes):
+        barrier.wait()  # Only returns once both stats are running at the same time.
+        return dataframes["team_stats"]
+
+    results, runs = StatScheduler(max_workers=2).run({"a": Stat(meet, ""), "b": Stat(meet, "")}, INPUTS)
+    assert {run.status for run in runs.values()} == {StatStatus.OK}
+    assert_frame_equal(results["a"], INPUTS["team_stats"])
+
+
+def test_dependents_receive_results_and_are_skipped_on_failure():
+    stats = {
+        "top_team": Stat(_top_team, "", depends_on=("metal_by_team",)),
+        "metal_by_team": Stat(_metal_by_team, ""),
+        "broken": Stat(_fail, ""),
+        "after_broken": Stat(_top_team, "", depends_on=("broken",)),
+    }
+    results, runs = StatScheduler(max_workers=1).run(stats, INPUTS)
+    assert results["top_team"].to_dicts() == [{"team_id": 1, "metal_used": 5.0}]
+    assert runs["broken"].status == StatStatus.FAILED and "boom" in runs["broken"].error
+    assert runs["after_broken"].status == StatStatus.SKIPPED
+    assert runs["metal_by_team"].seconds > 0 and runs["metal_by_team"].result_bytes > 0
+
+    # Cached results satisfy dependencies without being recomputed.
+    cached = {"metal_by_team": results["metal_by_team"]}
+    _, runs = StatScheduler().run({name: stats[name] for name in ("top_team", "metal_by_team")}, INPUTS, cached)
+    assert runs["metal_by_team"].status == StatStatus.CACHED and runs["top_team"].status == StatStatus.OK
+
+
+def test_slow_stats_time_out_without_blocking_the_rest():
+    release = threading.Event()
+
+    def hang(dataframes):
+        release.wait(5)
+
+    stats = {"hang": Stat(hang, ""), "after_hang": Stat(_top_team, "", depends_on=("hang",)), "fast": Stat(_metal_by_team, "")}
+    try:
+        results, runs = StatScheduler(max_workers=1, timeout=0.2).run(stats, INPUTS)
+    finally:
+        release.set()
+    assert [runs[name].status for name in stats] == [StatStatus.TIMED_OUT, StatStatus.SKIPPED, StatStatus.OK]
+    assert "fast" in results and "hang" not in results
+
+
+def test_perform_aggregations_only_returns_requested_stats(monkeypatch):
+    monkeypatch.setitem(STATS_REGISTRY, "metal_by_team", Stat(_metal_by_team, ""))
+    monkeypatch.setitem(STATS_REGISTRY, "top_team", Stat(_top_team, "", depends_on=("metal_by_team",)))
+    stats, _ = perform_aggregations(INPUTS, ["top_team"], [])
+    assert list(stats) == ["top_team"]
+
+
+def _lazy_metal_by_team(dataframes):
+    return dataframes["team_stats"].group_by("team_id").agg(pl.col("metal_used").sum()).sort("team_id")
+
+
+def _lazy_broken(dataframes):
+    return dataframes["team_stats"].select(pl.col("missing"))
+
+
+def test_lazy_stats_are_collected_in_one_plan():
+    stats = {
+        "lazy": Stat(_lazy_metal_by_team, "", lazy=True),
+        "eager": Stat(_metal_by_team, ""),
+    }
+    results, runs = StatScheduler(lazy=True).run(stats, INPUTS)
+    assert [runs[name].status for name in stats] == [StatStatus.COLLECTED, StatStatus.OK]
+    assert_frame_equal(results["lazy"], results["eager"])
+
+    # Without lazy mode, lazy stats are collected on their own thread.
+    eager_results, runs = StatScheduler().run(stats, INPUTS)
+    assert runs["lazy"].status == StatStatus.OK
+    assert_frame_equal(eager_results["lazy"], results["lazy"])
+
+    # A failing plan does not take the others down with it.
+    stats["broken"] = Stat(_lazy_broken, "", lazy=True)
+    results, runs = StatScheduler(lazy=True).run(stats, INPUTS)
+    assert runs["broken"].status == StatStatus.FAILED
+    assert runs["lazy"].status == StatStatus.OK and "lazy" in results
@@ -0,0 +1,32 @@
+import polars as pl
+
+from tubuin_processor.core.stats import STATS_REGISTRY, required_inputs, with_dependencies
+from tubuin_processor.core.stats.types import Stat
+
+
+def _noop(dataframes):
+    return pl.DataFrame()
+
+
+def test_required_inputs_merges_declared_columns(monkeypatch):
+    monkeypatch.setitem(STATS_REGISTRY, "a", Stat(_noop, "", inputs={"team_stats": ("team_id", "metal_used")}))
+    monkeypatch.setitem(STATS_REGISTRY, "b", Stat(_noop, "", inputs={"team_stats": ("team_id", "energy_used"), "unit_defs": None}))
+
+    assert required_inputs(["a", "b"], []) == {"team_stats": {"team_id", "metal_used", "energy_used"}, "unit_defs": None}
+    # Streams pass whole aspects through, so they need every column.
+    assert required_inputs(["a"], ["team_stats", "command_log"]) == {"team_stats": None, "commands_log": None}
+
+
+def test_undeclared_inputs_require_everything(monkeypatch):
+    monkeypatch.setitem(STATS_REGISTRY, "a", Stat(_noop, "", inputs={"team_stats": ("team_id",)}))
+    monkeypatch.setitem(STATS_REGISTRY, "legacy", Stat(_noop, ""))
+
+    assert required_inputs(["a", "legacy"], []) is None
+
+
+def test_required_inputs_include_dependencies(monkeypatch):
+    monkeypatch.setitem(STATS_REGISTRY, "a", Stat(_noop, "", inputs={"team_stats": ("team_id",)}))
+    monkeypatch.setitem(STATS_REGISTRY, "b", Stat(_noop, "", inputs={"unit_events": ("frame",)}, depends_on=("a",)))
+
+    assert with_dependencies(["b"]) == ["b", "a"]
+    assert required_inputs(["b"], []) == {"unit_events": {"frame"}, "team_stats": {"team_id"}}
@@ -0,0 +1,126 @@
+import logging
+
+import pytest
+import polars as pl
+
+from tubuin_processor.core.exceptions import TransformationError
+from tubuin_processor.core.value_transformer import stream_transform_aspect, transform_aspect_frame
+from tubuin_processor.schemas.aspects_raw import Commands_log_Schema_Raw
+
+
+@pytest.fixture
+def raw_commands_log() -> pl.DataFrame:
+    """A raw commands_log frame with two unknown command ids."""
+    return pl.DataFrame({
+        "frame": [1, 2, 3, 4],
+        "teamId": [0, 0, 1, 1],
+        "unitId": [10, 11, 12, 13],
+        "cmd_id": [1, 2, 999, 998],
+        "cmd_name": [1, 2, 999, 998],
+        "cmd_tag": [0, 0, 0, 0],
+        "target_unit_id": [None, 5, None, None],
+        "x": [0, 0, 0, 0],
+        "y": [0, 0, 0, 0],
+        "z": [0, 0, 0, 0],
+    })
+
+
+def test_transform_aspect_frame_invalid_optional_enum_raises_or_skips(raw_commands_log):
+    with pytest.raises(TransformationError, match=r"row 2\).*cmd_name"):
+        transform_aspect_frame("commands_log", raw_commands_log)
+
+    result = transform_aspect_frame("commands_log", raw_commands_log, skip_on_error=True)
+    assert result.schema["cmd_name"] == pl.Categorical
+    assert result["cmd_name"].cast(pl.Utf8).to_list() == ["BUILD", "ATTACK"]
+
+
+def test_transform_aspect_frame_nulls_invalid_enum_map_values(raw_commands_log, caplog, monkeypatch):
+    """Optional fields declared with `enum_map` keep their values' rows, with null names."""
+    from tubuin_processor.config.dynamic_config_builder import TRANSFORM_PLANS, TransformPlan
+    from tubuin_processor.core import value_transformer
+
+    plan = TRANSFORM_PLANS["commands_log"]
+    lenient_plan = TransformPlan("commands_log", plan.scales, plan.enums, plan.enum_values, {"cmd_name"})
+    monkeypatch.setitem(value_transformer.TRANSFORM_PLANS, "commands_log", lenient_plan)
+    value_transformer._compile_frame_transform.cache_clear()
+    try:
+        with caplog.at_level(logging.WARNING):
+            result = transform_aspect_frame("commands_log", raw_commands_log)
+    finally:
+        value_transformer._compile_frame_transform.cache_clear()
+
+    assert result["cmd_name"].cast(pl.Utf8).to_list() == ["BUILD", "ATTACK", None, None]
+    # Invalid values are reported once per column, not once per row.
+    invalid_warnings = [r for r in caplog.records if "invalid enum value" in r.getMessage()]
+    assert len(invalid_warnings) == 1
+    assert "2 invalid enum value(s) for cmd_name" in invalid_warnings[0].getMessage()
+
+
+def test_stream_transform_aspect_invalid_optional_enum_raises_or_skips(monkeypatch):
+    """The row engine rejects unknown and undeclared enum values alike, as it did before plans."""
+    from tubuin_processor.config.dynamic_config_builder import TRANSFORM_PLANS, TransformPlan
+    from tubuin_processor.core import value_transformer
+
+    def raw_models():
+        return [Commands_log_Schema_Raw.from_list([i, 0, 10, 1, cmd_name, 0, None, 0, 0, 0])
+                for i, cmd_name in enumerate([1, 999999, 2, None])]
+
+    with pytest.raises(TransformationError, match=r"row 1\)"):
+        list(stream_transform_aspect("commands_log", iter(raw_models())))
+    result = list(stream_transform_aspect("commands_log", iter(raw_models()), skip_on_error=True))
+    assert [m.frame for m in result] == [0, 2, 3]
+    assert [m.cmd_name and m.cmd_name.name for m in result] == ["BUILD", "ATTACK", None]
+
+    # A member of the Enum outside the field's declared `enum` values is invalid too.
+    plan = TRANSFORM_PLANS["commands_log"]
+    narrowed_plan = TransformPlan("commands_log", plan.scales, plan.enums, {"cmd_name": frozenset({1})})
+    monkeypatch.setitem(value_transformer.TRANSFORM_PLANS, "commands_log", narrowed_plan)
+    result = list(stream_transform_aspect("commands_log", iter(raw_models()), skip_on_error=True))
+    assert [m.frame for m in result] == [0, 3]
+
+
+def test_transform_aspect_frame_dequantizes_columns():
+    raw_df = pl.DataFrame({
+        "frame": [1], "unit_id": [1], "unit_def_id": [2], "team_id": [0],
+        "x": [1], "y": [2], "z": [3], "vx": [1500], "vy": [-250], "vz": [0], "heading": [90],
+    })
+    result = transform_aspect_frame("unit_positions", raw_df)
+    assert result.row(0, named=True)["vx"] == 1.5
+    assert result.row(0, named=True)["vy"] == -0.25
+    assert result.schema["x"] == pl.Int64
+
+
+def test_transform_aspect_frame_required_enum_raises_or_skips():
+    raw_df = pl.DataFrame({
+        "frame": [1, 2], "unit_id": [1, 2], "unit_def_id": [3, 3], "team_id": [0, 0],
+        "event_type": [1, 77], "metal_make": [10, 10], "metal_use": [0, 0],
+        "energy_make": [0, 0], "energy_use": [5, 5],
+    })
+    with pytest.raises(TransformationError, match="event_type"):
+        transform_aspect_frame("unit_economy", raw_df)
+
+    result = transform_aspect_frame("unit_economy", raw_df, skip_on_error=True)
+    assert result["frame"].to_list() == [1]
+    assert result["metal_make"].to_list() == [1.0]
+
+
+def test_mixed_scale_plan_is_applied_per_field_on_both_paths(monkeypatch):
+    """A plan mixing /1000 and /10 fields must not collapse to a single divisor."""
+    from tubuin_processor.config.dynamic_config_builder import TransformPlan
+    from tubuin_processor.core import value_transformer
+    from tubuin_processor.schemas.aspects_raw import Unit_positions_Schema_Raw
+
+    mixed_plan = TransformPlan("unit_positions", scales={"vx": 1000.0, "vy": 10.0})
+    monkeypatch.setitem(value_transformer.TRANSFORM_PLANS, "unit_positions", mixed_plan)
+    value_transformer._compile_frame_transform.cache_clear()
+    try:
+        row = [1, 1, 2, 0, 1, 2, 3, 1500, -250, 0, 90]
+        raw_model = Unit_positions_Schema_Raw.from_list(list(row))
+        clean_model = next(value_transformer.stream_transform_aspect("unit_positions", iter([raw_model])))
+        raw_df = pl.DataFrame([dict(zip(Unit_positions_Schema_Raw.model_fields, row))])
+        frame_row = transform_aspect_frame("unit_positions", raw_df).row(0, named=True)
+    finally:
+        value_transformer._compile_frame_transform.cache_clear()
+
+    assert (clean_model.vx, clean_model.vy, clean_model.vz) == (1.5, -25.0, 0.0)
+    assert (frame_row["vx"], frame_row["vy"], frame_row["vz"]) == (1.5, -25.0, 0.0)
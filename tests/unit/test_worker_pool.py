@@ -0,0 +1,35 @@
+import msgpack
+import pytest
+from polars.testing import assert_frame_equal
+
+from tubuin_processor.core.columnar_decoder import IpcFrame, decode_aspect_to_frame
+from tubuin_processor.core.decoder import DecodeEngine
+from tubuin_processor.core.sharding import shard_aspect
+from tubuin_processor.core.worker_pool import WorkerPool, _ping, decode_shard_in_worker
+
+
+@pytest.fixture
+def unit_events_bytes() -> bytes:
+    rows = [[frame, frame, 101, 0, 10, 20, 30, None, None, None, 1 + frame % 3] for frame in range(2000)]
+    return b"".join(msgpack.packb(row) for row in rows)
+
+
+def test_pool_reuses_warm_workers_and_recycles_on_request():
+    with WorkerPool(workers=1) as pool:
+        first, second = (pool.submit(_ping).result() for _ in range(2))
+        assert first == second
+
+    with WorkerPool(workers=1, max_tasks_per_child=1) as pool:
+        first, second = (pool.submit(_ping).result() for _ in range(2))
+        assert first != second
+
+
+@pytest.mark.parametrize("engine", list(DecodeEngine))
+def test_workers_return_ipc_frames(unit_events_bytes, engine):
+    expected = decode_aspect_to_frame("unit_events", unit_events_bytes)
+    shard = shard_aspect("unit_events", unit_events_bytes, len(unit_events_bytes))[0]
+    with WorkerPool(workers=1) as pool:
+        name, index, result = pool.submit(decode_shard_in_worker, shard, False, engine, None).result()
+    assert (name, index) == ("unit_events", 0)
+    assert isinstance(result, IpcFrame)
+    assert_frame_equal(result.load(), expected)